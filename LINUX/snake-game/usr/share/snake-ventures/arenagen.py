@@ -0,0 +1,235 @@
+import os
+import random
+from collections import deque
+
+from levelpack import Arena, LevelPack, pack_walls, write_pack
+
+# Procedural arenas. A layout follows from the style, the seed and the board
+# size alone, so the same seed gives everybody the same arena (daily
+# challenges) and a finished arena can be cached on disk.
+GENERATOR_VERSION = 1   # Bump whenever a generator changes its output
+STYLES = ('maze', 'rooms', 'scatter')
+GENERATION_ATTEMPTS = 20
+SPAWN_RUNWAY = 4        # Free cells a spawn needs ahead of it
+MIN_OPEN_SHARE = 0.5    # Layouts that wall in more of the board are redone
+
+# Maze settings
+MAZE_CORRIDOR = 2       # Corridor width in cells; walls are one cell thick
+MAZE_BRAID = 0.6        # Share of dead ends opened up into loops
+
+# Room settings
+ROOM_MIN_SIZE = 7       # Rooms aren't split below this many cells across
+ROOM_DOOR = 3
+ROOM_EXTRA_DOOR = 0.3   # Chance of a second door, which makes loops
+
+# Scatter settings
+SCATTER_DENSITY = 0.12  # Share of the board covered by obstacles
+SCATTER_MAX_SIZE = 4    # Longest obstacle side
+SCATTER_CLEARING = 6    # Obstacle-free distance around the spawn areas
+
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         'snake-ventures', 'arenas')
+
+def neighbors(cell, width, height):
+    x, y = cell
+    for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+        if 0 <= nx < width and 0 <= ny < height:
+            yield nx, ny
+
+def reachable(walls, start, width, height):
+    # Open cells connected to start. Board edges count as walls; wrapping
+    # levels only ever connect more cells.
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for cell in neighbors(queue.popleft(), width, height):
+            if cell not in walls and cell not in seen:
+                seen.add(cell)
+                queue.append(cell)
+    return seen
+
+def open_run(walls, cell, direction, width, height):
+    x, y = cell
+    for _ in range(SPAWN_RUNWAY + 1):
+        if not (0 <= x < width and 0 <= y < height) or (x, y) in walls:
+            return False
+        x, y = x + direction[0], y + direction[1]
+    return True
+
+def find_spawn(walls, target, direction, width, height):
+    # Open cell closest to target with room to move ahead
+    cells = [(x, y) for y in range(height) for x in range(width)
+             if open_run(walls, (x, y), direction, width, height)]
+    if not cells:
+        return None
+    return min(cells, key=lambda cell: (abs(cell[0] - target[0]) + abs(cell[1] - target[1]), cell))
+
+def spawn_targets(width, height):
+    # One spawn on the left heading right and one on the right heading left
+    return (((width // 4, height // 2), (1, 0)),
+            ((width * 3 // 4, height // 2), (-1, 0)))
+
+def validate(walls, width, height):
+    # Spawns for a layout, or None when it has no room for a spawn or cells
+    # the snake could never reach
+    spawns = []
+    for target, direction in spawn_targets(width, height):
+        cell = find_spawn(walls, target, direction, width, height)
+        if cell is not None:
+            spawns.append((cell, direction))
+    if not spawns:
+        return None
+    if len(reachable(walls, spawns[0][0], width, height)) != width * height - len(walls):
+        return None
+    return spawns
+
+def keep_largest_region(walls, width, height):
+    # Walls in every pocket but the biggest open region
+    regions = []
+    seen = set()
+    for y in range(height):
+        for x in range(width):
+            if (x, y) not in walls and (x, y) not in seen:
+                region = reachable(walls, (x, y), width, height)
+                seen |= region
+                regions.append(region)
+    regions.sort(key=len)
+    for region in regions[:-1]:
+        walls |= region
+
+def maze(rng, width, height):
+    # Recursive backtracker over a lattice of corridor-wide cells, then some
+    # dead ends are knocked through so the snake isn't forced into them. The
+    # maze has no outer wall, leaving a free lane along the board edges.
+    pitch = MAZE_CORRIDOR + 1
+    columns, rows = (width - 1) // pitch, (height - 1) // pitch
+    left = (width - columns * pitch + 1) // 2
+    top = (height - rows * pitch + 1) // 2
+    walls = set()
+    for y in range(top, top + rows * pitch - 1):
+        for x in range(left, left + columns * pitch - 1):
+            if (x - left) % pitch == MAZE_CORRIDOR or (y - top) % pitch == MAZE_CORRIDOR:
+                walls.add((x, y))
+
+    def open_between(a, b):
+        # Clears the wall strip between two neighboring lattice cells
+        (ax, ay), (bx, by) = a, b
+        if ax != bx:
+            x = left + min(ax, bx) * pitch + MAZE_CORRIDOR
+            for y in range(top + ay * pitch, top + ay * pitch + MAZE_CORRIDOR):
+                walls.discard((x, y))
+        else:
+            y = top + min(ay, by) * pitch + MAZE_CORRIDOR
+            for x in range(left + ax * pitch, left + ax * pitch + MAZE_CORRIDOR):
+                walls.discard((x, y))
+
+    links = {}
+    start = (rng.randrange(columns), rng.randrange(rows)) if columns and rows else None
+    stack = [start] if start else []
+    visited = {start}
+    while stack:
+        cell = stack[-1]
+        options = [n for n in neighbors(cell, columns, rows) if n not in visited]
+        if not options:
+            stack.pop()
+            continue
+        nxt = rng.choice(options)
+        open_between(cell, nxt)
+        links.setdefault(cell, set()).add(nxt)
+        links.setdefault(nxt, set()).add(cell)
+        visited.add(nxt)
+        stack.append(nxt)
+
+    for cell in sorted(links):
+        if len(links[cell]) == 1 and rng.random() < MAZE_BRAID:
+            options = [n for n in neighbors(cell, columns, rows) if n not in links[cell]]
+            if options:
+                nxt = rng.choice(options)
+                open_between(cell, nxt)
+                links[cell].add(nxt)
+                links[nxt].add(cell)
+    return walls
+
+def rooms(rng, width, height):
+    # Splits the board in two again and again with one-cell walls, each with
+    # a door, so every room stays connected
+    walls = set()
+    pending = [(0, 0, width, height)]
+    while pending:
+        left, top, w, h = pending.pop()
+        vertical = w > h if w != h else rng.random() < 0.5
+        span = w if vertical else h
+        if span < ROOM_MIN_SIZE * 2 + 1:
+            continue
+        split = rng.randint(ROOM_MIN_SIZE, span - ROOM_MIN_SIZE - 1)
+        length = h if vertical else w
+        door_count = 2 if rng.random() < ROOM_EXTRA_DOOR else 1
+        doors = set()
+        for _ in range(door_count):
+            start = rng.randint(0, max(0, length - ROOM_DOOR))
+            doors.update(range(start, start + ROOM_DOOR))
+        for i in range(length):
+            if i not in doors:
+                walls.add((left + split, top + i) if vertical else (left + i, top + split))
+        if vertical:
+            pending += [(left, top, split, h), (left + split + 1, top, w - split - 1, h)]
+        else:
+            pending += [(left, top, w, split), (left, top + split + 1, w, h - split - 1)]
+    return walls
+
+def scatter(rng, width, height):
+    # Random blocks, kept away from where the snakes spawn
+    walls = set()
+    clearings = [target for target, _ in spawn_targets(width, height)]
+    goal = int(width * height * SCATTER_DENSITY)
+    attempts = 0
+    while len(walls) < goal and attempts < goal * 4:
+        attempts += 1
+        w = rng.randint(1, SCATTER_MAX_SIZE)
+        h = rng.randint(1, SCATTER_MAX_SIZE if w == 1 else 1)
+        x = rng.randrange(width - w + 1)
+        y = rng.randrange(height - h + 1)
+        if any(x - SCATTER_CLEARING <= cx < x + w + SCATTER_CLEARING and
+               y - SCATTER_CLEARING <= cy < y + h + SCATTER_CLEARING for cx, cy in clearings):
+            continue
+        walls.update((x + i, y + j) for j in range(h) for i in range(w))
+    return walls
+
+GENERATORS = {'maze': maze, 'rooms': rooms, 'scatter': scatter}
+
+def arena_name(style, seed):
+    return f'{style.title()} #{seed}'
+
+def generate(style, seed, width, height):
+    # Arena of exactly width x height cells. A layout that fails validation is
+    # redone from the next derived seed, so the result stays deterministic.
+    for attempt in range(GENERATION_ATTEMPTS):
+        rng = random.Random(f'{style}:{seed}:{width}x{height}:{attempt}')
+        walls = GENERATORS[style](rng, width, height)
+        keep_largest_region(walls, width, height)
+        if len(walls) > width * height * (1 - MIN_OPEN_SHARE):
+            continue
+        spawns = validate(walls, width, height)
+        if spawns:
+            return Arena(arena_name(style, seed), width, height, pack_walls(width, height, walls), spawns)
+    raise ValueError(f'could not generate a {style} arena for a {width}x{height} board')
+
+def cache_path(style, seed, width, height):
+    return os.path.join(CACHE_DIR, f'{style}-{seed}-{width}x{height}-v{GENERATOR_VERSION}.svlp')
+
+def load_generated(style, seed, width, height):
+    # Cached arena when there is one, else a freshly generated one, which is
+    # cached for next time. The cache is a one-level pack, so loading it is a
+    # plain memory-mapped read with no generation or validation.
+    path = cache_path(style, seed, width, height)
+    try:
+        with LevelPack(path) as pack:
+            return pack[0]
+    except (OSError, ValueError, IndexError):
+        pass  # Not cached yet, or a damaged file that gets replaced below
+    arena = generate(style, seed, width, height)
+    try:
+        write_pack(path, [arena])
+    except OSError:
+        pass  # Read-only home; the game works without the cache
+    return arena
@@ -0,0 +1,165 @@
+import sys
+
+from levelpack import Arena, DEFAULT_PACK, pack_walls, write_pack
+from arenagen import validate
+
+# Arena layouts shipped in the default level pack. Run this file to rebuild
+# levels/arenas.svlp after changing them.
+
+# Design size; fits the play area of the smallest window, so arenas are only
+# ever stretched, which keeps every corridor open
+ARENA_WIDTH = 36
+ARENA_HEIGHT = 24
+TIGHT_SPEED = 7    # Moves per second in the narrow layouts
+
+def fill(walls, x, y, width, height):
+    for cy in range(max(0, y), min(ARENA_HEIGHT, y + height)):
+        for cx in range(max(0, x), min(ARENA_WIDTH, x + width)):
+            walls.add((cx, cy))
+
+def clear(walls, x, y, width, height):
+    for cy in range(y, y + height):
+        for cx in range(x, x + width):
+            walls.discard((cx, cy))
+
+def pillars(spacing, size, offset):
+    walls = set()
+    for y in range(offset + spacing // 2, ARENA_HEIGHT - 1, spacing):
+        for x in range(offset + spacing // 2, ARENA_WIDTH - 1, spacing):
+            fill(walls, x, y, size, size)
+    return walls
+
+def bars(spacing, gap, vertical, mirror):
+    # Walls from alternating sides, each leaving a gap at the other end
+    walls = set()
+    length, across = (ARENA_HEIGHT, ARENA_WIDTH) if vertical else (ARENA_WIDTH, ARENA_HEIGHT)
+    for i, line in enumerate(range(spacing, across - spacing // 2, spacing)):
+        start = 0 if (i + mirror) % 2 == 0 else gap
+        for along in range(start, start + length - gap):
+            walls.add((line, along) if vertical else (along, line))
+    return walls
+
+def rooms(columns, rows, door):
+    walls = set()
+    xs = [ARENA_WIDTH * i // columns for i in range(1, columns)]
+    ys = [ARENA_HEIGHT * i // rows for i in range(1, rows)]
+    for x in xs:
+        fill(walls, x, 0, 1, ARENA_HEIGHT)
+    for y in ys:
+        fill(walls, 0, y, ARENA_WIDTH, 1)
+    # A door in the middle of every wall segment between two rooms
+    edges_x = [0] + xs + [ARENA_WIDTH]
+    edges_y = [0] + ys + [ARENA_HEIGHT]
+    for x in xs:
+        for top, bottom in zip(edges_y, edges_y[1:]):
+            clear(walls, x, (top + bottom - door) // 2, 1, door)
+    for y in ys:
+        for left, right in zip(edges_x, edges_x[1:]):
+            clear(walls, (left + right - door) // 2, y, door, 1)
+    return walls
+
+def rings(spacing, gap, turn):
+    # Nested rectangles, each opened on a different side
+    walls = set()
+    inset = spacing
+    side = 0
+    while ARENA_WIDTH - 2 * inset > gap + 2 and ARENA_HEIGHT - 2 * inset > gap + 2:
+        left, top = inset, inset
+        right, bottom = ARENA_WIDTH - inset - 1, ARENA_HEIGHT - inset - 1
+        fill(walls, left, top, right - left + 1, 1)
+        fill(walls, left, bottom, right - left + 1, 1)
+        fill(walls, left, top, 1, bottom - top + 1)
+        fill(walls, right, top, 1, bottom - top + 1)
+        middle_x = (left + right + 1 - gap) // 2
+        middle_y = (top + bottom + 1 - gap) // 2
+        opening = [(middle_x, top, gap, 1), (right, middle_y, 1, gap),
+                   (middle_x, bottom, gap, 1), (left, middle_y, 1, gap)][side % 4]
+        clear(walls, *opening)
+        side += turn
+        inset += spacing
+    return walls
+
+def cross(arm, thickness, hole):
+    walls = set()
+    cx, cy = ARENA_WIDTH // 2, ARENA_HEIGHT // 2
+    fill(walls, cx - arm, cy - thickness // 2, arm * 2, thickness)
+    fill(walls, cx - thickness // 2, cy - arm * 2 // 3, thickness, arm * 4 // 3)
+    if hole:
+        clear(walls, cx - hole, cy - hole, hole * 2, hole * 2)
+    return walls
+
+def diagonals(spacing, length, flip):
+    walls = set()
+    for start in range(-ARENA_HEIGHT, ARENA_WIDTH, spacing):
+        for step in range(0, ARENA_HEIGHT, length * 2):
+            for i in range(length):
+                x, y = start + step + i, step + i
+                if 0 <= x < ARENA_WIDTH and 0 <= y < ARENA_HEIGHT:
+                    walls.add((ARENA_WIDTH - 1 - x if flip else x, y))
+    return walls
+
+def spiral(spacing):
+    # One wall winding inwards, corridors spacing - 1 cells wide
+    walls = set()
+    x, y = spacing, spacing
+    across, down = ARENA_WIDTH - 2 * spacing - 1, ARENA_HEIGHT - 2 * spacing - 1
+    lengths = [across, down, across]
+    while lengths[-1] > 0:
+        lengths.append(lengths[-2] - spacing)
+    walls.add((x, y))
+    for turn, length in enumerate(lengths):
+        dx, dy = [(1, 0), (0, 1), (-1, 0), (0, -1)][turn % 4]
+        for _ in range(length):
+            x, y = x + dx, y + dy
+            walls.add((x, y))
+    return walls
+
+def layouts():
+    # (name, walls, speed), speed 0 keeps the difficulty's speed
+    for spacing in range(4, 13):
+        for size in (1, 2):
+            for offset in (0, 1):
+                if size < spacing - 2:
+                    yield f'Pillars {spacing}-{size}{"b" if offset else ""}', pillars(spacing, size, offset), 0
+    for spacing in range(3, 7):
+        for gap in range(2, 6):
+            for mirror in (0, 1):
+                speed = TIGHT_SPEED if spacing == 3 else 0
+                suffix = 'm' if mirror else ''
+                yield f'Serpent {spacing}-{gap}{suffix}', bars(spacing, gap, False, mirror), speed
+                yield f'Columns {spacing}-{gap}{suffix}', bars(spacing, gap, True, mirror), speed
+    for columns in range(2, 5):
+        for rows in (2, 3):
+            for door in range(1, 5):
+                yield f'Rooms {columns}x{rows}-{door}', rooms(columns, rows, door), 0
+    for spacing in (3, 4, 5):
+        for gap in (2, 3, 4):
+            for turn in (1, 2):
+                speed = TIGHT_SPEED if spacing == 3 else 0
+                yield f'Rings {spacing}-{gap}{"" if turn == 1 else "x"}', rings(spacing, gap, turn), speed
+    for arm in (6, 9, 12, 15):
+        for thickness in (1, 2):
+            for hole in (0, 2, 3):
+                yield f'Cross {arm}-{thickness}{f"o{hole}" if hole else ""}', cross(arm, thickness, hole), 0
+    for spacing in (6, 8, 10, 12):
+        for length in (2, 3):
+            for flip in (False, True):
+                yield f'Diagonal {spacing}-{length}{"r" if flip else ""}', diagonals(spacing, length, flip), 0
+    for spacing in (3, 4, 5):
+        yield f'Spiral {spacing}', spiral(spacing), TIGHT_SPEED if spacing == 3 else 0
+
+def build_arenas():
+    arenas = []
+    for name, walls, speed in layouts():
+        spawns = validate(walls, ARENA_WIDTH, ARENA_HEIGHT)
+        if spawns is None:
+            raise ValueError(f'arena {name!r} has cells the snake can never reach or no room for a spawn')
+        arenas.append(Arena(name, ARENA_WIDTH, ARENA_HEIGHT, pack_walls(ARENA_WIDTH, ARENA_HEIGHT, walls),
+                            spawns, speed))
+    return arenas
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PACK
+    arenas = build_arenas()
+    write_pack(path, arenas)
+    print(f'{len(arenas)} arenas written to {path}')
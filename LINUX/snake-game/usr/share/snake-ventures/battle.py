@@ -0,0 +1,220 @@
+try:
+    import numpy
+except ImportError:  # Battle royale needs NumPy; the other modes don't
+    numpy = None
+
+# Battle royale settings
+BATTLE_MAX_LENGTH = 256      # Ring buffer size per snake; longer snakes stop growing
+BATTLE_CELLS_PER_SNAKE = 150 # Board area per snake when no world size is given
+BATTLE_MIN_SIDE = 60
+FOOD_PER_SNAKE = 2           # Food kept on the board for every snake still alive
+BOT_LOOKAHEAD = 4            # Cells a bot looks ahead for food...
+BOT_TURN_CHANCE = 0.05       # ...and how often it turns for no reason
+DEATH_FOOD_SPACING = 2       # Every n-th cell of a dead snake turns into food
+
+# Direction index order, same as topology.DIRECTIONS
+DX = [0, 0, -1, 1]
+DY = [-1, 1, 0, 0]
+REVERSE = [1, 0, 3, 2]
+DIRECTIONS = list(zip(DX, DY))
+
+def battle_size(count):
+    # Square board with room to move for count snakes
+    side = max(BATTLE_MIN_SIDE, int((count * BATTLE_CELLS_PER_SNAKE) ** 0.5))
+    return (side, side)
+
+class Swarm:
+    # Many snakes on one board, stored as NumPy arrays so a tick costs a fixed
+    # number of array operations however many snakes there are. Bodies live in
+    # per-snake ring buffers, and a shared occupancy grid (snake index + 1 per
+    # cell, 0 when free) answers every collision with one lookup instead of
+    # scanning bodies. Snake 0 can be steered from outside; the rest are bots.
+    def __init__(self, width, height, count, wrap, seed=None, max_length=BATTLE_MAX_LENGTH):
+        self.width = width
+        self.height = height
+        self.count = count
+        self.wrap = wrap  # Easy wraps around the board edges, the others die there
+        self.capacity = max_length
+        self.rng = numpy.random.default_rng(seed)
+        self.owner = numpy.zeros(width * height, numpy.int32)
+        self.food = numpy.zeros(width * height, bool)
+        self.body = numpy.zeros((count, max_length), numpy.int32)
+        self.head_slot = numpy.zeros(count, numpy.int32)  # Ring buffer slot of the head
+        self.length = numpy.ones(count, numpy.int32)
+        self.direction = self.rng.integers(0, 4, count).astype(numpy.int8)
+        self.alive = numpy.ones(count, bool)
+        self.score = numpy.zeros(count, numpy.int32)
+        self.alive_count = count
+        self.indices = numpy.arange(count)
+        self.dx = numpy.array(DX, numpy.int32)
+        self.dy = numpy.array(DY, numpy.int32)
+        self.reverse = numpy.array(REVERSE, numpy.int8)
+        self.died = numpy.zeros(0, numpy.int64)  # Snakes that died in the last tick
+
+        # Every snake starts on its own free cell, away from the edges
+        margin = min(5, width // 4, height // 4)
+        cells = set()
+        while len(cells) < count:
+            xs = self.rng.integers(margin, width - margin, count)
+            ys = self.rng.integers(margin, height - margin, count)
+            cells.update((ys * width + xs).tolist())
+        starts = numpy.array(sorted(cells)[:count], numpy.int32)
+        self.rng.shuffle(starts)
+        self.body[:, 0] = starts
+        self.owner[starts] = self.indices + 1
+        self.refill_food()
+
+    def heads(self):
+        return self.body[self.indices, self.head_slot]
+
+    def head(self, index):
+        cell = int(self.body[index, self.head_slot[index]])
+        return (cell % self.width, cell // self.width)
+
+    def cells_of(self, index):
+        # Body cells of one snake, head first
+        slots = (self.head_slot[index] - numpy.arange(self.length[index])) % self.capacity
+        return self.body[index, slots]
+
+    def targets(self, heads, directions):
+        # Cell ahead of every head in the given directions, and whether the
+        # move leaves the board (always False when wrapping)
+        x = heads % self.width + self.dx[directions]
+        y = heads // self.width + self.dy[directions]
+        if self.wrap:
+            x %= self.width
+            y %= self.height
+            outside = numpy.zeros(len(heads), bool)
+        else:
+            outside = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+            numpy.clip(x, 0, self.width - 1, out=x)
+            numpy.clip(y, 0, self.height - 1, out=y)
+        return y * self.width + x, outside
+
+    def steer_bots(self, bots):
+        # One pass for all bots: every direction is scored at once, blocked
+        # moves are ruled out, food nearby pulls, going straight is preferred
+        heads = self.body[bots, self.head_slot[bots]]
+        current = self.direction[bots]
+        scores = numpy.zeros((4, len(bots)), numpy.float32)
+        for d in range(4):
+            directions = numpy.full(len(bots), d, numpy.int8)
+            cells, outside = self.targets(heads, directions)
+            blocked = outside | (self.owner[cells] != 0)
+            reach = cells
+            for step in range(BOT_LOOKAHEAD):
+                # Closer food counts for more
+                scores[d] += self.food[reach] * (BOT_LOOKAHEAD - step)
+                reach, off = self.targets(reach, directions)
+                reach = numpy.where(off, cells, reach)
+            scores[d] += (current == d) * 1.5
+            scores[d] -= blocked * 1000
+            scores[d] -= (self.reverse[current] == d) * 2000
+        scores += self.rng.random(scores.shape, numpy.float32) * (self.rng.random(len(bots)) < BOT_TURN_CHANCE) * 3
+        self.direction[bots] = scores.argmax(axis=0)
+
+    def step(self, steer_first=False):
+        # One tick for every living snake. Snake 0 keeps the direction set from
+        # outside unless steer_first, which hands it to the bots as well.
+        alive = numpy.flatnonzero(self.alive)
+        if not len(alive):
+            return
+        bots = alive if steer_first else alive[alive != 0]
+        if len(bots):
+            self.steer_bots(bots)
+
+        heads = self.body[alive, self.head_slot[alive]]
+        new, outside = self.targets(heads, self.direction[alive])
+        grows = self.food[new] & ~outside & (self.length[alive] < self.capacity)
+
+        # Tails move out of the way first, so snakes can follow each other closely
+        movers = alive[~grows]
+        tail_slots = (self.head_slot[movers] - self.length[movers] + 1) % self.capacity
+        self.owner[self.body[movers, tail_slots]] = 0
+
+        # Collisions: into a wall or any body, or two heads onto one cell
+        dead = outside | (self.owner[new] != 0)
+        order = numpy.argsort(new, kind='stable')
+        same = new[order][1:] == new[order][:-1]
+        dead[order[1:][same]] = True
+        dead[order[:-1][same]] = True
+
+        # Dead snakes leave a trail of food behind
+        self.died = alive[dead]
+        for index in self.died:
+            cells = self.cells_of(index)
+            cells = cells[self.owner[cells] == index + 1]  # Its tail may be freed already
+            self.owner[cells] = 0
+            self.food[cells[::DEATH_FOOD_SPACING]] = True
+        self.alive[self.died] = False
+        self.alive_count -= len(self.died)
+
+        # Everybody else moves on
+        survivors = alive[~dead]
+        new = new[~dead]
+        grew = survivors[grows[~dead]]
+        self.head_slot[survivors] = (self.head_slot[survivors] + 1) % self.capacity
+        self.body[survivors, self.head_slot[survivors]] = new
+        self.owner[new] = survivors + 1
+        self.length[grew] += 1
+        self.score[grew] += 1
+        self.food[new] = False
+        self.refill_food()
+
+    def refill_food(self):
+        missing = self.alive_count * FOOD_PER_SNAKE - int(self.food.sum())
+        if missing > 0:
+            cells = self.rng.integers(0, self.width * self.height, missing)
+            cells = cells[self.owner[cells] == 0]
+            self.food[cells] = True
+
+    def visible(self, view):
+        # Occupancy and food of the cells inside view (left, top, width,
+        # height), clipped to the board, plus the clipped area
+        left, top, width, height = view
+        left, top = max(0, left), max(0, top)
+        right = min(self.width, view[0] + width)
+        bottom = min(self.height, view[1] + height)
+        if right <= left or bottom <= top:
+            return None
+        grid = self.owner.reshape(self.height, self.width)[top:bottom, left:right]
+        food = self.food.reshape(self.height, self.width)[top:bottom, left:right]
+        return grid, food, (left, top)
+
+class SwarmSnake:
+    # One snake of a swarm behind the single-snake interface the game scenes
+    # use (head, direction, score)
+    def __init__(self, swarm, index, head_color, body_color):
+        self.swarm = swarm
+        self.index = index
+        self.head_color = head_color
+        self.body_color = body_color
+
+    def get_head_position(self):
+        return self.swarm.head(self.index)
+
+    @property
+    def direction(self):
+        return DIRECTIONS[self.swarm.direction[self.index]]
+
+    @direction.setter
+    def direction(self, direction):
+        self.swarm.direction[self.index] = DIRECTIONS.index(direction)
+
+    @property
+    def alive(self):
+        return bool(self.swarm.alive[self.index])
+
+    @property
+    def score(self):
+        return int(self.swarm.score[self.index])
+
+    @property
+    def length(self):
+        return int(self.swarm.length[self.index])
+
+def create_swarm(width, height, count, wrap, seed=None):
+    # None when NumPy is missing
+    if numpy is None:
+        return None
+    return Swarm(width, height, count, wrap, seed)
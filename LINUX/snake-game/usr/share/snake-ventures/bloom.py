@@ -0,0 +1,135 @@
+import pygame
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:  # Renderers fall back to the ring glow without NumPy
+    numpy = None
+
+# Bloom settings
+BLOOM_SCALE = 1 / 6           # Bright layer resolution relative to the window...
+BLOOM_MAX_SIZE = (320, 200)   # ...but never more than this, so the cost is fixed
+BLOOM_RADIUS = 3              # Box blur radius in bright layer pixels
+BLOOM_PASSES = 2              # Box blurs per axis; two already look Gaussian
+BLOOM_STRENGTH = 2.0          # Brightness of the blurred light added back
+BLOOM_TEXT_CACHE_SIZE = 32
+
+def box_blur(source, target, csum, radius=BLOOM_RADIUS):
+    # One box blur pass along the first axis via a running sum, so the cost
+    # doesn't depend on the radius. Light past the ends counts as black.
+    # csum needs one more row than source.
+    n = source.shape[0]
+    r = min(radius, (n - 1) // 2)
+    csum[0] = 0
+    numpy.cumsum(source, axis=0, out=csum[1:n + 1])
+    numpy.subtract(csum[2*r + 1:n + 1], csum[0:n - 2*r], out=target[r:n - r])
+    target[:r] = csum[r + 1:2*r + 1]
+    numpy.subtract(csum[n], csum[n - 2*r:n - r], out=target[n - r:])
+    target *= 1 / (r * 2 + 1)  # The window actually summed
+
+class BloomPass:
+    # Glow as a post-process: bright things are drawn into a small layer, which
+    # is blurred in NumPy through pygame.surfarray and added onto the frame
+    def __init__(self, window_size):
+        self.text_cache = OrderedDict()
+        self.resize(window_size)
+
+    def resize(self, window_size):
+        width, height = window_size
+        scale = min(BLOOM_SCALE, BLOOM_MAX_SIZE[0] / width, BLOOM_MAX_SIZE[1] / height)
+        self.scale = scale
+        self.window_size = window_size
+        self.size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        self.layer = pygame.Surface(self.size)
+        self.result = pygame.Surface(self.size)
+        self.bounds = None
+        self.text_cache.clear()
+
+        # Work buffers, allocated once per window size
+        w, h = self.size
+        self.buffer = numpy.zeros((w, h, 3), numpy.float32)
+        self.scratch = numpy.zeros((w, h, 3), numpy.float32)
+        self.csum = numpy.zeros((max(w, h) + 1, max(w, h), 3), numpy.float32)
+
+    def mark(self, rect):
+        # Blurring spreads light this far beyond what was drawn
+        spread = BLOOM_RADIUS * BLOOM_PASSES + 1
+        rect = pygame.Rect(rect).inflate(spread * 2, spread * 2)
+        if self.bounds is None:
+            self.layer.fill((0, 0, 0))
+            self.bounds = rect
+        else:
+            self.bounds.union_ip(rect)
+
+    def to_layer(self, point):
+        return (int(point[0] * self.scale), int(point[1] * self.scale))
+
+    def circle(self, color, center, radius):
+        center = self.to_layer(center)
+        radius = max(1, int(radius * self.scale))
+        self.mark((center[0] - radius, center[1] - radius, radius * 2, radius * 2))
+        pygame.draw.circle(self.layer, color[0:3], center, radius)
+
+    def rect(self, color, rect):
+        rect = pygame.Rect(rect)
+        x, y = self.to_layer(rect.topleft)
+        rect = pygame.Rect(x, y, max(1, int(rect.width * self.scale)), max(1, int(rect.height * self.scale)))
+        self.mark(rect)
+        self.layer.fill(color[0:3], rect)
+
+    def text(self, font, text, color, rect, alpha=None):
+        # rect is where the text sits in the window
+        key = (font, text, tuple(color))
+        image = self.text_cache.get(key)
+        if image is None:
+            full = font.render(text, True, color)
+            size = (max(1, int(full.get_width() * self.scale)), max(1, int(full.get_height() * self.scale)))
+            image = self.text_cache[key] = pygame.transform.smoothscale(full, size)
+            if len(self.text_cache) > BLOOM_TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        topleft = self.to_layer(rect.topleft)
+        self.mark((topleft, image.get_size()))
+        image.set_alpha(255 if alpha is None else alpha)
+        self.layer.blit(image, topleft)
+
+    def process(self):
+        # Blurs what was drawn since the last call. Returns the blurred layer,
+        # the part of it that holds light and where that part goes in the
+        # window, or None when nothing was drawn.
+        if self.bounds is None:
+            return None
+        area = self.bounds.clip(self.layer.get_rect())
+        self.bounds = None
+        if not area:
+            return None
+
+        # Only the area holding light is blurred; it already includes the spread
+        region = (slice(area.left, area.right), slice(area.top, area.bottom))
+        w, h = area.size
+        buffer = self.buffer[:w, :h]
+        scratch = self.scratch[:w, :h]
+        pixels = pygame.surfarray.pixels3d(self.layer)
+        buffer[...] = pixels[region]
+        del pixels  # Unlocks the layer
+        for _ in range(BLOOM_PASSES):
+            # Columns, then rows through a transposed view
+            box_blur(buffer, scratch, self.csum[:w + 1, :h])
+            box_blur(scratch.swapaxes(0, 1), buffer.swapaxes(0, 1), self.csum[:h + 1, :w])
+        buffer *= BLOOM_STRENGTH
+        numpy.minimum(buffer, 255, out=buffer)
+        pixels = pygame.surfarray.pixels3d(self.result)
+        numpy.copyto(pixels[region], buffer, casting='unsafe')
+        del pixels
+
+        scale = self.scale
+        target = pygame.Rect(int(area.x / scale), int(area.y / scale),
+                             int(area.width / scale) + 1, int(area.height / scale) + 1)
+        return self.result, area, target
+
+def create_bloom_pass(window_size):
+    # None when NumPy is missing
+    if numpy is None:
+        return None
+    return BloomPass(window_size)
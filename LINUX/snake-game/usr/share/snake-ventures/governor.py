@@ -0,0 +1,77 @@
+# Effect quality presets, cheapest first. The governor moves between them.
+#   glow_ring_step:     pixels between the concentric glow circles (fewer rings when larger)
+#   glow_scale:         resolution of the glow layer relative to the window
+#   glow_layers:        most glow copies drawn behind the GAME OVER text
+#   outline_rings:      rings in the hover outline of menu items
+#   animation_interval: frames between title animation updates (and redraws)
+QUALITY_LEVELS = [
+    {'glow_ring_step': 8, 'glow_scale': 0.25, 'glow_layers': 1, 'outline_rings': 1, 'animation_interval': 3},
+    {'glow_ring_step': 6, 'glow_scale': 0.5, 'glow_layers': 1, 'outline_rings': 1, 'animation_interval': 2},
+    {'glow_ring_step': 4, 'glow_scale': 0.5, 'glow_layers': 2, 'outline_rings': 2, 'animation_interval': 1},
+    {'glow_ring_step': 2, 'glow_scale': 1, 'glow_layers': 3, 'outline_rings': 3, 'animation_interval': 1}
+]
+
+# Governor tuning
+SMOOTHING = 0.1          # Weight of the newest frame in the moving average
+DOWNGRADE_AT = 0.85      # Drop quality when frames use more than this share of the budget...
+UPGRADE_AT = 0.5         # ...and only raise it again below this share
+DOWNGRADE_FRAMES = 15    # Consecutive slow frames before dropping a level
+UPGRADE_FRAMES = 120     # Consecutive fast frames before raising a level
+MAX_UPGRADE_FRAMES = 3600
+FLAP_WINDOW = 300        # A drop this soon after a raise doubles the wait for the next raise
+
+class FrameGovernor:
+    # Watches how long each frame's work takes against a time budget and picks
+    # the effect quality level. The gap between DOWNGRADE_AT and UPGRADE_AT,
+    # plus the consecutive-frame counts, keep it from flapping between levels.
+    def __init__(self, budget_ms, levels=QUALITY_LEVELS):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level = len(levels) - 1  # Start at full quality
+        self.average = None
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.upgrade_frames = UPGRADE_FRAMES
+        self.frames_since_upgrade = None
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def record(self, frame_ms):
+        # Returns True when the quality level changed
+        if self.average is None:
+            self.average = frame_ms
+        else:
+            self.average += (frame_ms - self.average) * SMOOTHING
+        if self.frames_since_upgrade is not None:
+            self.frames_since_upgrade += 1
+
+        if self.average > self.budget_ms * DOWNGRADE_AT:
+            self.slow_frames += 1
+            self.fast_frames = 0
+        elif self.average < self.budget_ms * UPGRADE_AT:
+            self.fast_frames += 1
+            self.slow_frames = 0
+        else:
+            self.slow_frames = 0
+            self.fast_frames = 0
+
+        if self.slow_frames >= DOWNGRADE_FRAMES and self.level > 0:
+            if self.frames_since_upgrade is not None and self.frames_since_upgrade < FLAP_WINDOW:
+                # The last raise didn't hold; be more careful next time
+                self.upgrade_frames = min(MAX_UPGRADE_FRAMES, self.upgrade_frames * 2)
+            self.change_level(-1)
+            return True
+        if self.fast_frames >= self.upgrade_frames and self.level < len(self.levels) - 1:
+            self.change_level(1)
+            self.frames_since_upgrade = 0
+            return True
+        return False
+
+    def change_level(self, step):
+        self.level += step
+        # Measure the new level from scratch
+        self.average = None
+        self.slow_frames = 0
+        self.fast_frames = 0
@@ -0,0 +1,77 @@
+import heapq
+import itertools
+
+# Item kinds
+FOOD_ITEM = 'food'      # Grows the snake by one, always on the board
+SPEED_ITEM = 'speed'    # The snake moves faster for a while
+SHRINK_ITEM = 'shrink'  # Drops part of the tail
+BONUS_ITEM = 'bonus'    # Extra points
+POWER_UPS = (SPEED_ITEM, SHRINK_ITEM, BONUS_ITEM)
+
+class Item:
+    __slots__ = ('kind', 'cell', 'expires')
+
+    def __init__(self, kind, cell, expires):
+        self.kind = kind
+        self.cell = cell
+        self.expires = expires  # Tick the item disappears at, or None to stay
+
+class ItemMap:
+    # Items keyed by their cell, so checking what the head landed on is one
+    # dict lookup however many items there are. Lifetimes sit in a heap
+    # ordered by expiry; an item that was eaten first keeps its heap entry,
+    # which is skipped when it comes up instead of being searched for.
+    def __init__(self):
+        self.items = {}
+        self.counts = dict.fromkeys((FOOD_ITEM,) + POWER_UPS, 0)
+        self.timers = []
+        self.order = itertools.count()  # Keeps equal expiry ticks in insertion order
+        self.changes = None  # Set to a list to record (cell, kind or None) for every change
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, cell):
+        return cell in self.items
+
+    def get(self, cell):
+        return self.items.get(cell)
+
+    def values(self):
+        return self.items.values()
+
+    def add(self, kind, cell, expires=None):
+        # Replaces whatever was on cell
+        self.take(cell)
+        item = self.items[cell] = Item(kind, cell, expires)
+        self.counts[kind] += 1
+        if self.changes is not None:
+            self.changes.append((cell, kind))
+        if expires is not None:
+            heapq.heappush(self.timers, (expires, next(self.order), item))
+        return item
+
+    def take(self, cell):
+        # Removes and returns the item on cell, or None
+        item = self.items.pop(cell, None)
+        if item is not None:
+            self.counts[item.kind] -= 1
+            if self.changes is not None:
+                self.changes.append((cell, None))
+        return item
+
+    def expire(self, now):
+        # Removes the items whose time is up and returns them
+        expired = []
+        timers = self.timers
+        while timers and timers[0][0] <= now:
+            item = heapq.heappop(timers)[2]
+            if self.items.get(item.cell) is item:
+                self.take(item.cell)
+                expired.append(item)
+        return expired
+
+    def clear(self):
+        self.items.clear()
+        self.counts = dict.fromkeys(self.counts, 0)
+        self.timers.clear()
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from scores import DATA_DIR, REPLAY_DIR
+
+# Scores not yet taken by the leaderboard, kept across runs
+OUTBOX_PATH = os.path.join(DATA_DIR, 'leaderboard-outbox.json')
+
+# Sync settings
+POOL_SIZE = 2          # Keep-alive connections: one for scores, one for replay uploads
+BATCH_SIZE = 100       # Most scores sent in one request
+BATCH_DELAY = 1.0      # Seconds a score waits for others to share its request
+TIMEOUT = 10.0         # Seconds for one request
+RETRY_BASE = 1.0       # First wait after a failure; doubles with each failure in a row
+RETRY_MAX = 300.0      # Longest wait between attempts
+UPLOAD_ATTEMPTS = 3    # Tries for one replay file
+CLOSE_TIMEOUT = 3.0    # Seconds the game waits on exit for a last attempt
+
+CLOSE = object()  # Tells the sync thread to finish
+
+class ConnectionPool:
+    # Keep-alive HTTP connections to one server, shared by the sync threads.
+    # A connection goes back to the pool after each request, so a steady
+    # trickle of scores costs no new TCP (or TLS) handshakes.
+    def __init__(self, url, size=POOL_SIZE, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'expected an http:// or https:// URL, got {url!r}')
+        self.type = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()  # Most recently used first, the likeliest to still be open
+        self.slots = threading.BoundedSemaphore(size)
+        self.opened = 0  # Connections made so far, for the report
+
+    def request(self, method, path, body=None, headers={}):
+        # (status, body); raises OSError or http.client.HTTPException when
+        # the server can't be reached or the connection broke
+        with self.slots:
+            for fresh in (False, True):
+                try:
+                    connection = self.idle.get_nowait() if not fresh else None
+                except queue.Empty:
+                    connection = None
+                reused = connection is not None
+                if connection is None:
+                    connection = self.type(self.host, self.port, timeout=self.timeout)
+                try:
+                    connection.request(method, self.path + path, body, headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    if reused:
+                        continue  # The server may have dropped an idle connection; once more on a new one
+                    raise
+                self.opened += not reused
+                if response.will_close:
+                    connection.close()
+                else:
+                    self.idle.put(connection)
+                return response.status, data
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+class LeaderboardClient:
+    # Sends finished games to the central leaderboard. submit() only queues
+    # the score: a thread of its own batches them into one request each
+    # BATCH_DELAY, and a second one uploads the replays the server asks for,
+    # so a game over never waits on the network. While the server can't be
+    # reached the scores wait in OUTBOX_PATH, retried with a growing delay,
+    # and go out with the first request that gets through.
+    def __init__(self, url, kiosk=None, outbox=OUTBOX_PATH, replay_dir=REPLAY_DIR):
+        self.pool = ConnectionPool(url)
+        self.kiosk = kiosk or socket.gethostname()
+        self.outbox = outbox
+        self.replay_dir = replay_dir
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()  # Guards pending between the sync thread and close()
+        self.pending = self.load_outbox()  # Scores the server hasn't taken yet, oldest first
+        self.saved = bool(self.pending)  # Whether the outbox file holds scores
+        self.failures = 0  # Failed attempts in a row
+        self.error = None  # Why the last attempt failed
+        self.sent = self.batches = self.rejected = self.uploaded = 0
+        self.uploads = ThreadPoolExecutor(max_workers=POOL_SIZE - 1)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, score):
+        # A finished game: mode, level, score, length, moves, cause, seconds,
+        # played and replay (the replay's digest or None). The id lets the
+        # server take a score only once however often it is sent.
+        self.queue.put(dict(score, id=uuid.uuid4().hex))
+
+    def load_outbox(self):
+        try:
+            with open(self.outbox) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f'Leaderboard outbox not read: {e}')
+            return []
+
+    def save_outbox(self):
+        # The whole backlog, replaced in one go; no file once it is empty
+        try:
+            if self.pending:
+                os.makedirs(os.path.dirname(self.outbox), exist_ok=True)
+                with open(self.outbox + '.tmp', 'w') as f:
+                    json.dump(self.pending, f)
+                os.replace(self.outbox + '.tmp', self.outbox)
+            elif self.saved:
+                os.remove(self.outbox)
+            self.saved = bool(self.pending)
+        except OSError as e:
+            print(f'Leaderboard outbox not saved: {e}')
+
+    def collect(self, timeout):
+        # Moves new scores into pending: waits up to timeout (None: for as
+        # long as it takes) for the first, then BATCH_DELAY for more to share
+        # its request. True once close() was called.
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        deadline = time.monotonic() + BATCH_DELAY
+        while item is not CLOSE:
+            with self.lock:
+                self.pending.append(item)
+            if len(self.pending) >= BATCH_SIZE:
+                return False
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return False
+        return True
+
+    def run(self):
+        retry_at = 0.0
+        closing = False
+        while not closing:
+            timeout = max(0.0, retry_at - time.monotonic()) if self.pending else None
+            closing = self.collect(timeout)
+            if closing and self.failures:
+                break  # Still unreachable; no point holding up the exit
+            if not self.pending or (time.monotonic() < retry_at and not closing):
+                continue
+            while self.pending:
+                batch = self.pending[:BATCH_SIZE]
+                if not self.send(batch):
+                    self.failures += 1
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (self.failures - 1))
+                    retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)  # Kiosks don't retry in step
+                    break
+                self.failures = 0
+                with self.lock:
+                    del self.pending[:len(batch)]
+            if self.failures or self.saved:
+                with self.lock:
+                    self.save_outbox()
+        with self.lock:
+            self.save_outbox()
+
+    def send(self, batch):
+        # True once the server took the batch, or turned it down for good;
+        # False to try again later
+        body = json.dumps(dict(kiosk=self.kiosk, scores=batch)).encode()
+        try:
+            status, data = self.pool.request('POST', '/scores', body, {'Content-Type': 'application/json'})
+        except (OSError, http.client.HTTPException) as e:
+            self.error = str(e) or type(e).__name__
+            return False
+        if status >= 500 or status in (408, 429):
+            self.error = f'HTTP {status}'
+            return False
+        if status >= 400:
+            print(f'Leaderboard turned down {len(batch)} scores: HTTP {status}')
+            self.rejected += len(batch)
+            return True
+        self.sent += len(batch)
+        self.batches += 1
+        try:
+            wanted = json.loads(data).get('wanted', [])
+        except (ValueError, AttributeError):
+            wanted = []
+        for digest in wanted:
+            # Only ever a file name of ours
+            if isinstance(digest, str) and len(digest) == 64 and all(c in '0123456789abcdef' for c in digest):
+                self.uploads.submit(self.upload, digest)
+        return True
+
+    def upload(self, digest):
+        try:
+            with open(os.path.join(self.replay_dir, digest + '.svr'), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return  # Not kept here (--scores off, or removed since)
+        for attempt in range(UPLOAD_ATTEMPTS):
+            try:
+                status, _ = self.pool.request('PUT', f'/replays/{digest}', data,
+                                              {'Content-Type': 'application/octet-stream'})
+                if status < 500:
+                    self.uploaded += status < 300
+                    return
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(RETRY_BASE * 2 ** attempt)
+
+    def report(self):
+        text = (f'{self.sent} scores in {self.batches} requests over {self.pool.opened} connections, '
+                f'{self.uploaded} replays uploaded, {len(self.pending)} waiting')
+        return text + f' (last error: {self.error})' if self.failures else text
+
+    def close(self):
+        # A last attempt, unless the server is known to be down; what is
+        # left waits in the outbox for the next run
+        self.queue.put(CLOSE)
+        self.thread.join(CLOSE_TIMEOUT)
+        self.uploads.shutdown(wait=False, cancel_futures=True)
+        if self.thread.is_alive():
+            with self.lock:
+                self.save_outbox()  # Stuck on the network; anything sent twice is taken once
+        self.pool.close()
+
+def load_test(args):
+    # Kiosk games against the stand-in server, with the server going away
+    # for a while in the middle, then checks that every score arrived once
+    from leaderboardserver import LeaderboardServer
+    from replays import Replay
+
+    work = tempfile.mkdtemp()
+    server = LeaderboardServer(port=0)
+    server.start()
+    url = f'http://127.0.0.1:{server.port}/v1'
+    clients = [LeaderboardClient(url, f'kiosk-{number}', os.path.join(work, f'outbox-{number}.json'), work)
+               for number in range(args.kiosks)]
+    rng = random.Random(args.seed)
+    ids = set()
+    slowest = 0.0
+    started = time.perf_counter()
+    outage = (args.seconds / 3, args.seconds / 3 + args.outage) if args.outage else None
+    for game in range(args.games):
+        due = started + args.seconds * game / args.games
+        time.sleep(max(0.0, due - time.perf_counter()))
+        now = time.perf_counter() - started
+        if outage and server.up and outage[0] <= now < outage[1]:
+            server.stop()
+        elif outage and not server.up and now >= outage[1]:
+            server.start()
+        digest = None
+        if rng.random() < args.replays:
+            replay = Replay(1 + game % 3, rng.getrandbits(32), 70, 42,
+                            [(move, 1, rng.randrange(4), 0) for move in range(0, 200, 7)])
+            digest = replay.digest()
+            with open(os.path.join(work, digest + '.svr'), 'wb') as f:
+                f.write(replay.encode())
+        client = clients[game % len(clients)]
+        before = time.perf_counter()
+        client.submit(dict(mode='classic', level=1 + game % 3, score=rng.randrange(200), length=rng.randrange(1, 200),
+                           moves=rng.randrange(1000), cause='wall', seconds=rng.uniform(5, 300),
+                           played=time.time(), replay=digest))
+        slowest = max(slowest, time.perf_counter() - before)
+    if not server.up:
+        server.start()
+    # Whatever was held back goes out on the next retry, at most RETRY_MAX away
+    deadline = time.perf_counter() + args.settle
+    while time.perf_counter() < deadline and sum(len(client.pending) for client in clients):
+        time.sleep(0.1)
+    time.sleep(BATCH_DELAY + 0.5)  # Replay uploads
+    for client in clients:
+        ids.update(item['id'] for item in client.pending)
+        client.close()
+    server.stop()
+
+    for number, client in enumerate(clients):
+        print(f'kiosk-{number}: {client.report()}')
+    print(f'Server: {server.report()}')
+    print(f'Slowest submit() on the game thread: {slowest * 1e6:.0f} us')
+    missing = args.games - len(server.scores)
+    wanted = sum(1 for score in server.scores.values() if score['replay']) - len(server.replays)
+    if missing or wanted or ids:
+        print(f'{missing} scores and {wanted} replays never arrived')
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures leaderboard sync test against a local stand-in server')
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--kiosks', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10, help='spread the games over this long')
+    parser.add_argument('--outage', type=float, default=3, metavar='SECONDS',
+                        help='take the server away for this long a third of the way in (0: never)')
+    parser.add_argument('--replays', type=float, default=0.2, metavar='SHARE', help='share of games with a replay')
+    parser.add_argument('--settle', type=float, default=30, help='seconds to wait for the backlog at the end')
+    parser.add_argument('--seed', type=int)
+    sys.exit(load_test(parser.parse_args()))
@@ -0,0 +1,142 @@
+import json
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_LEADERBOARD_PORT = 7779
+MAX_BODY = 1 << 20  # Bytes in one request
+SCORE_FIELDS = ('id', 'mode', 'level', 'score', 'length', 'moves', 'cause', 'seconds', 'played', 'replay')
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.board.connections += 1
+
+    def answer(self, status, payload=None):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_BODY:
+            raise ValueError('too large')
+        return self.rfile.read(length)
+
+    def handle_one_request(self):
+        if self.server.board.up:
+            super().handle_one_request()
+        else:
+            self.close_connection = True  # Gone, as far as kiosks can tell
+
+    def do_POST(self):
+        board = self.server.board
+        if urlsplit(self.path).path != '/v1/scores':
+            return self.answer(404)
+        try:
+            request = json.loads(self.body())
+            kiosk, scores = request['kiosk'], [{field: score[field] for field in SCORE_FIELDS}
+                                               for score in request['scores']]
+        except (ValueError, KeyError, TypeError):
+            return self.answer(400)
+        with board.lock:
+            board.requests += 1
+            wanted = set()
+            for score in scores:
+                board.scores.setdefault(score['id'], dict(score, kiosk=kiosk))
+                if score['replay'] and score['replay'] not in board.replays:
+                    wanted.add(score['replay'])
+        self.answer(200, dict(wanted=sorted(wanted)))
+
+    def do_PUT(self):
+        board = self.server.board
+        path = urlsplit(self.path).path
+        if not path.startswith('/v1/replays/'):
+            return self.answer(404)
+        digest = path.rsplit('/', 1)[1]
+        try:
+            data = self.body()
+        except ValueError:
+            return self.answer(413)
+        if hashlib.sha256(data).hexdigest() != digest:
+            return self.answer(400)
+        with board.lock:
+            board.requests += 1
+            board.replays[digest] = data
+        self.answer(204)
+
+    def do_GET(self):
+        # /v1/top?mode=classic&level=1&count=10
+        board = self.server.board
+        parts = urlsplit(self.path)
+        if parts.path != '/v1/top':
+            return self.answer(404)
+        query = parse_qs(parts.query)
+        try:
+            mode = query.get('mode', ['classic'])[0]
+            level = int(query['level'][0])
+            count = int(query.get('count', [10])[0])
+        except (KeyError, ValueError):
+            return self.answer(400)
+        with board.lock:
+            scores = [score for score in board.scores.values() if score['mode'] == mode and score['level'] == level]
+        scores.sort(key=lambda score: (-score['score'], score['played']))
+        self.answer(200, scores[:count])
+
+    def log_message(self, format, *args):
+        pass
+
+class LeaderboardServer:
+    # Stand-in for the central leaderboard, to try the sync client against
+    # on one machine. Keeps what it is sent in memory, takes each score once
+    # however often a kiosk retries it, and asks for the replays it hasn't
+    # got. stop() and start() make it unreachable and back, for outages.
+    def __init__(self, host='127.0.0.1', port=DEFAULT_LEADERBOARD_PORT):
+        self.host = host
+        self.port = port
+        self.scores = {}  # Score id -> score
+        self.replays = {}  # Digest -> replay file
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.up = False
+        self.httpd = None
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.block_on_close = False
+        self.httpd.board = self
+        self.port = self.httpd.server_address[1]  # The one picked for port 0, kept across restarts
+        self.up = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        # Refuses new connections and drops the open ones at their next request
+        self.up = False
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def report(self):
+        return (f'{len(self.scores)} scores and {len(self.replays)} replays from {self.requests} requests '
+                f'over {self.connections} connections')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures stand-in leaderboard server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_LEADERBOARD_PORT)
+    args = parser.parse_args()
+    server = LeaderboardServer(args.host, args.port)
+    server.start()
+    print(f'Leaderboard on http://{args.host}:{server.port}/v1')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(server.report())
@@ -0,0 +1,187 @@
+import os
+import mmap
+import struct
+
+# Level pack file layout, all numbers little-endian:
+#   header  b'SVLP', format version (u16), level count (u16)
+#   index   offset (u32) and size (u32) of every level record
+#   level   name length (u8) and UTF-8 name, width and height in cells (u16),
+#           speed in moves per second (u8, 0 = the difficulty's speed),
+#           spawn count (u8) and spawns as x, y (u16) and direction (u8),
+#           then the walls: one bit per cell, row by row, lowest bit first
+PACK_MAGIC = b'SVLP'
+PACK_VERSION = 1
+HEADER = struct.Struct('<4sHH')
+INDEX_ENTRY = struct.Struct('<II')
+LEVEL_SIZE = struct.Struct('<HHBB')
+SPAWN = struct.Struct('<HHB')
+
+# Spawn directions, as stored in the pack
+SPAWN_DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+DEFAULT_PACK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels', 'arenas.svlp')
+
+def bitmap_size(width, height):
+    return (width * height + 7) // 8
+
+class Arena:
+    # One pack level. Arenas are drawn at a fixed size and stretched over the
+    # play area, so a layout fits any window at least as big as the arena.
+    def __init__(self, name, width, height, walls, spawns, speed=0):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.walls = bytes(walls)  # Packed bitmap, see the file layout above
+        self.spawns = spawns       # [((x, y), direction), ...] in arena cells
+        self.speed = speed
+
+    def is_wall(self, x, y):
+        i = y * self.width + x
+        return self.walls[i >> 3] >> (i & 7) & 1
+
+    def to_arena(self, area):
+        # Arena column of every play area column, and the same for rows
+        left, top, right, bottom = area
+        columns = [(x - left) * self.width // (right - left) for x in range(left, right)]
+        rows = [(y - top) * self.height // (bottom - top) for y in range(top, bottom)]
+        return columns, rows
+
+    def wall_cells(self, area):
+        # Board cells covered by walls once the arena is stretched over area,
+        # given as (left, top, right, bottom) with right/bottom exclusive
+        left, top = area[0:2]
+        columns, rows = self.to_arena(area)
+        cells = []
+        for y, ay in enumerate(rows):
+            row = ay * self.width
+            for x, ax in enumerate(columns):
+                i = row + ax
+                if self.walls[i >> 3] >> (i & 7) & 1:
+                    cells.append((left + x, top + y))
+        return cells
+
+    def spawn_points(self, area):
+        # Spawns as (board cell, direction): the first board cell of each
+        # spawn's stretched arena cell
+        left, top, right, bottom = area
+        width, height = right - left, bottom - top
+        return [((left + -(-x * width // self.width), top + -(-y * height // self.height)), direction)
+                for (x, y), direction in self.spawns]
+
+class LevelPack:
+    # Read-only view of a pack file. The file is memory-mapped and a level is
+    # only decoded when asked for, so opening a pack costs the same whether it
+    # holds ten arenas or a thousand. Decoded arenas don't point into the
+    # mapping, so they outlive close().
+    def __init__(self, path=DEFAULT_PACK):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self.data) < HEADER.size:
+                raise ValueError(f'{path}: not a level pack')
+            magic, version, self.count = HEADER.unpack_from(self.data)
+            if magic != PACK_MAGIC:
+                raise ValueError(f'{path}: not a level pack')
+            if version != PACK_VERSION:
+                raise ValueError(f'{path}: unsupported level pack version {version}')
+            if len(self.data) < HEADER.size + INDEX_ENTRY.size * self.count:
+                raise ValueError(f'{path}: truncated level pack')
+        except ValueError:
+            self.data.close()
+            raise
+        self.levels = {}  # Decoded arenas by index
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f'{self.path} has no level {index}')
+        offset, size = INDEX_ENTRY.unpack_from(self.data, HEADER.size + INDEX_ENTRY.size * index)
+        if offset + size > len(self.data):
+            raise ValueError(f'{self.path}: level {index} is truncated')
+        return offset, size
+
+    def name(self, index):
+        # Reads just the name, without decoding the level
+        offset, size = self.record(index)
+        length = self.data[offset]
+        return self.data[offset + 1:offset + 1 + length].decode('utf-8')
+
+    def names(self):
+        return [self.name(i) for i in range(self.count)]
+
+    def find(self, name):
+        # Index of the level called name, or None
+        for i in range(self.count):
+            if self.name(i) == name:
+                return i
+        return None
+
+    def __getitem__(self, index):
+        arena = self.levels.get(index)
+        if arena is None:
+            arena = self.levels[index] = self.decode(index)
+        return arena
+
+    def decode(self, index):
+        offset, size = self.record(index)
+        data = self.data
+        end = offset + size
+        pos = offset + 1 + data[offset]
+        name = data[offset + 1:pos].decode('utf-8')
+        width, height, speed, spawn_count = LEVEL_SIZE.unpack_from(data, pos)
+        pos += LEVEL_SIZE.size
+        spawns = []
+        for _ in range(spawn_count):
+            x, y, direction = SPAWN.unpack_from(data, pos)
+            spawns.append(((x, y), SPAWN_DIRECTIONS[direction]))
+            pos += SPAWN.size
+        if pos + bitmap_size(width, height) != end:
+            raise ValueError(f'{self.path}: level {index} is damaged')
+        return Arena(name, width, height, data[pos:end], spawns, speed)
+
+    def close(self):
+        self.levels.clear()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def encode_arena(arena):
+    name = arena.name.encode('utf-8')
+    parts = [bytes([len(name)]), name,
+             LEVEL_SIZE.pack(arena.width, arena.height, arena.speed, len(arena.spawns))]
+    for (x, y), direction in arena.spawns:
+        parts.append(SPAWN.pack(x, y, SPAWN_DIRECTIONS.index(direction)))
+    parts.append(arena.walls)
+    return b''.join(parts)
+
+def write_pack(path, arenas):
+    records = [encode_arena(arena) for arena in arenas]
+    offset = HEADER.size + INDEX_ENTRY.size * len(records)
+    index = []
+    for record in records:
+        index.append(INDEX_ENTRY.pack(offset, len(record)))
+        offset += len(record)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Written next to the target and moved into place, so a running game that
+    # has the old pack mapped never sees a half-written file
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(records)))
+        f.write(b''.join(index))
+        f.write(b''.join(records))
+    os.replace(temp, path)
+
+def pack_walls(width, height, cells):
+    # Bitmap for a set of wall cells
+    bits = bytearray(bitmap_size(width, height))
+    for x, y in cells:
+        i = y * width + x
+        bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
@@ -3,9 +3,33 @@ import random
 import sys
 import os
 import math
+import argparse
+import datetime
+import sqlite3
+import time
 from typing import List, Tuple
+from functools import lru_cache
 from enum import Enum
 
+from renderer import create_renderer, MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT
+from scenes import Scene, SceneManager
+from particles import ParticleSystem
+from widgets import Button, Label, MenuList, NORMAL, HOVERED, PRESSED
+from world import ChunkedBoard, Camera, WorldSnake, FoodField, SNAKE, FOOD
+from minimap import Minimap, GridMinimap, MINIMAP_MARGIN
+from topology import Topology, bounded, WALL, WRAP, DIRECTION_INDEX
+from levelpack import LevelPack, DEFAULT_PACK
+from arenagen import STYLES, load_generated
+from items import ItemMap, FOOD_ITEM, SPEED_ITEM, SHRINK_ITEM, BONUS_ITEM, POWER_UPS
+import battle
+from battle import SwarmSnake, battle_size, create_swarm
+from protocol import ALIVE
+from spectate import Broadcaster, DEFAULT_SPECTATE_PORT
+from sharedboard import SharedBoard, DEFAULT_NAME as DEFAULT_BOARD_NAME
+from scores import ScoreStore
+from replays import Replay
+from leaderboard import LeaderboardClient
+
 # Initialize Pygame
 pygame.init()
 
@@ -35,6 +59,11 @@ SNAKE_RADIUS = 130  # Radius of the figure-8 pattern
 SNAKE_SPEED = 1.5  # Adjusted speed for smoother movement
 PULSE_SPEED = 0.05  # Speed of the pulsing effect
 
+# Particle bursts: (particles, speed in pixels per second, lifetime in seconds)
+EAT_BURST = (60, 180, 0.6)
+DEATH_BURST = (400, 320, 1.2)
+LEVEL_START_BURST = (250, 260, 0.9)
+
 # Game settings
 class Level(Enum):
     EASY = 1
@@ -63,14 +92,144 @@ UI_COLORS = {
     }
 }
 
+# Snake colors (head, body) for each level
+SNAKE_COLORS = {
+    Level.EASY: ((50, 205, 50), (34, 139, 34)),     # Limegreen, darker green
+    Level.MEDIUM: ((255, 165, 0), (255, 140, 0)),   # Orange, darker orange
+    Level.HARD: ((0, 255, 200), (0, 200, 160))      # Neon cyan, darker cyan
+}
+FOOD_COLOR = (255, 0, 0)  # Bright red color for food
+ITEM_COLORS = {
+    FOOD_ITEM: FOOD_COLOR,
+    SPEED_ITEM: (0, 160, 255),    # Blue
+    SHRINK_ITEM: (200, 80, 255),  # Purple
+    BONUS_ITEM: (255, 215, 0)     # Gold
+}
+
+# Power-ups: chance per snake move that one turns up, how many can be out at
+# once, and how many moves they stay (blinking for the last few)
+POWER_UP_CHANCE = 0.02
+MAX_POWER_UPS = 3
+POWER_UP_LIFETIME = 80
+POWER_UP_BLINK = 16
+ITEM_PLACE_ATTEMPTS = 1000  # Random cells tried before giving up on a full board
+SPEED_BOOST = 1.5           # Speed factor...
+SPEED_BOOST_MOVES = 60      # ...for this many moves
+SHRINK_AMOUNT = 3           # Segments lost
+BONUS_POINTS = 5
+
+# Large-world mode: board size in cells, or None to play on the window-sized board
+WORLD_SIZE = None
+
+# Level pack arena laid over the board, or None for the open board
+ARENA = None
+# (style, seed) of the procedural arena to play, or None
+GENERATED_ARENA = None
+
+# Bots in battle royale (--battle), None for a normal game
+BATTLE_BOTS = None
+BOT_COLORS = [(230, 120, 40), (60, 160, 230), (200, 70, 200), (230, 210, 60),
+              (80, 200, 160), (240, 90, 110), (150, 110, 240), (140, 200, 70)]
+
+# Where the running game is shown to spectators: the stream (--spectate)
+# and the shared memory board (--shared-board). Both take the same keyframes
+# and per-move deltas.
+SPECTATORS = []
+
+# Finished games are kept here (see scores.py); None when the store can't be opened
+SCORES = None
+# Central leaderboard the scores are sent to as well (--leaderboard), or None
+LEADERBOARD = None
+
 # Game speeds for different levels
 SPEED_EASY = 10
 SPEED_MEDIUM = 8
 SPEED_HARD = 10
 
+LEVEL_SPEEDS = {
+    Level.EASY: SPEED_EASY,
+    Level.MEDIUM: SPEED_MEDIUM,
+    Level.HARD: SPEED_HARD
+}
+
+def level_speed(level):
+    # Moves per second; arenas may set their own
+    if ARENA and ARENA.speed:
+        return ARENA.speed
+    return LEVEL_SPEEDS[level]
+
+def level_topology(level):
+    # Move rules for the current grid size
+    return build_level_topology(level, GRID_WIDTH, GRID_HEIGHT, ARENA)
+
+@lru_cache(maxsize=8)
+def build_level_topology(level, width, height, arena=None):
+    ui_rows = UI_HEIGHT // GRID_SIZE
+    if level in [Level.MEDIUM, Level.HARD]:
+        # Walled in; the thin boundary covers the first column and row
+        topology = bounded(width, height, (1, ui_rows + 1, width, height))
+    else:
+        # Easy wraps around every edge except the top one, which borders the UI bar
+        topology = Topology(width, height, (0, ui_rows, width, height),
+                            dict(left=WRAP, right=WRAP, top=WALL, bottom=WRAP))
+    if arena is not None:
+        # Walls become illegal cells in the move table, so running into one
+        # costs the snake nothing extra to detect
+        topology = topology.with_obstacles(arena.wall_cells(topology.area))
+    return topology
+
+def start_position(level, grid=None):
+    # Where a new snake starts and which way it heads, on a board of grid
+    # (width, height) or the window-sized one
+    width, height = grid or (GRID_WIDTH, GRID_HEIGHT)
+    if ARENA:
+        topology = build_level_topology(level, width, height, ARENA)
+        # Boards smaller than the arena squeeze it, which can bury a spawn
+        for start, direction in ARENA.spawn_points(topology.area):
+            if topology.is_legal(start):
+                return start, direction
+    ui_rows = UI_HEIGHT // GRID_SIZE
+    start_x = width // 4
+    start_y = (height - ui_rows) // 2 + ui_rows
+    if level in [Level.MEDIUM, Level.HARD]:
+        start_x = max(int(BOUNDARY_THICKNESS + 1), start_x)
+        start_y = max(int((UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS + 1), start_y)
+    return (start_x, start_y), (1, 0)  # Start moving right
+
+@lru_cache(maxsize=8)
+def generated_arena(style, seed, width, height):
+    # Kept in memory as well, so a restart reuses the arena and its move tables
+    return load_generated(style, seed, width, height)
+
+def prepare_arena(level):
+    # Procedural arenas are made to measure for the level's play area when a
+    # round starts; resizing later stretches them like pack arenas
+    global ARENA
+    if GENERATED_ARENA:
+        left, top, right, bottom = level_topology(level).area
+        ARENA = generated_arena(*GENERATED_ARENA, right - left, bottom - top)
+
+def load_arena(choice, path=DEFAULT_PACK):
+    # Arena by name or by number (from 1) from a level pack
+    with LevelPack(path) as pack:
+        index = pack.find(choice)
+        if index is None and choice.isdigit() and 1 <= int(choice) <= len(pack):
+            index = int(choice) - 1
+        if index is None:
+            raise ValueError(f'no arena {choice!r} in {path}')
+        return pack[index]
+
+# Fonts are shared so rendered text can be cached by the renderer
+FONTS = {}
+
+def get_font(size):
+    if size not in FONTS:
+        FONTS[size] = pygame.font.Font(None, size)
+    return FONTS[size]
+
 class Title:
     def __init__(self):
-        self.font = pygame.font.Font(None, TITLE_FONT_SIZE)
+        self.font = get_font(TITLE_FONT_SIZE)
         self.text = "Snake Ventures"
         self.angle = 0
         self.pulse = 0
@@ -87,9 +246,10 @@ class Title:
             c.hsva = (hue, 100, 100, 100)
             self.colors.append(c)
 
-    def update(self):
-        self.angle += SNAKE_SPEED
-        self.pulse += PULSE_SPEED
+    def update(self, steps=1):
+        # steps > 1 catches up when the animation is updated less often
+        self.angle += SNAKE_SPEED * steps
+        self.pulse += PULSE_SPEED * steps
         
         # Calculate figure-8 pattern positions
         for i in range(SNAKE_SEGMENTS):
@@ -104,10 +264,7 @@ class Title:
             hue = (self.angle + (i * 360 / SNAKE_SEGMENTS)) % 360
             self.colors[i].hsva = (hue, 100, 100, 100)
 
-    def draw(self, screen):
-        # Create a surface for the glowing effect
-        glow_surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-        
+    def draw(self, renderer):
         # Draw the snake segments with dynamic sizing and glow
         for i, (x, y) in enumerate(self.segments):
             # Calculate pulsing size
@@ -115,208 +272,216 @@ class Title:
             base_size = SNAKE_SIZE * (1.3 - i * 0.03)  # Base size decreases along the snake
             size = base_size * pulse_factor
             
-            # Draw glow effect
-            for radius in range(int(size * 2), int(size // 2), -2):
-                alpha = int((radius / (size * 2)) * 100)
-                glow_color = (*self.colors[i][0:3], alpha)
-                pygame.draw.circle(glow_surface, glow_color, (int(x), int(y)), radius)
+            # Queue glow effect: a bloom light when the renderer has a bloom
+            # pass, the concentric ring halo otherwise
+            if renderer.has_bloom:
+                renderer.bloom_circle(self.colors[i], (int(x), int(y)), size * 1.5)
+            else:
+                renderer.glow(self.colors[i], (int(x), int(y)), size)
             
             # Draw main segment
-            pygame.draw.circle(screen, self.colors[i], (int(x), int(y)), int(size))
+            renderer.circle(self.colors[i], (int(x), int(y)), int(size))
         
         # Apply glow effect
-        screen.blit(glow_surface, (0, 0), special_flags=pygame.BLEND_ALPHA_SDL2)
+        if not renderer.has_bloom:
+            renderer.composite_glow()
         
         # Create shimmering effect for text
         shimmer = (math.sin(self.pulse * 2) + 1) * 0.5  # Value between 0 and 1
         text_color = (255, 255, 255)
         shadow_color = (0, 0, 0)
         
-        # Draw text with dynamic shadow and glow
-        text_surface = self.font.render(self.text, True, text_color)
-        shadow_surface = self.font.render(self.text, True, shadow_color)
-        glow_text = self.font.render(self.text, True, (100, 200, 255))
-        
-        # Calculate positions for centered text
-        text_rect = text_surface.get_rect(center=(self.center_x, self.center_y))
-        
         # Draw shadow with dynamic offset
         shadow_offset = 4 + math.sin(self.pulse) * 2
-        shadow_rect = text_rect.copy()
-        shadow_rect.x += shadow_offset
-        shadow_rect.y += shadow_offset
-        screen.blit(shadow_surface, shadow_rect)
+        renderer.text(self.font, self.text, shadow_color,
+                      center=(self.center_x + shadow_offset, self.center_y + shadow_offset))
         
         # Draw glowing text effect
-        glow_rect = text_rect.copy()
-        glow_rect.x += math.sin(self.pulse * 3) * 2
-        glow_rect.y += math.cos(self.pulse * 3) * 2
-        glow_text.set_alpha(int(128 + 128 * shimmer))
-        screen.blit(glow_text, glow_rect)
+        renderer.text(self.font, self.text, (100, 200, 255), alpha=int(128 + 128 * shimmer),
+                      center=(self.center_x + math.sin(self.pulse * 3) * 2,
+                              self.center_y + math.cos(self.pulse * 3) * 2))
         
         # Draw main text
-        screen.blit(text_surface, text_rect)
+        renderer.text(self.font, self.text, text_color, center=(self.center_x, self.center_y))
+
+        # The shimmer glows as well, then all the light is added in one pass
+        renderer.bloom_text(self.font, self.text, (100, 200, 255), alpha=int(128 * shimmer),
+                            center=(self.center_x, self.center_y))
+        renderer.composite_bloom()
 
 # UI Elements
-class Button:
-    def __init__(self, x, y, width, height, text, font_size=36, level=None):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.font = pygame.font.Font(None, font_size)
-        self.level = level
-        self.hovered = False
-
-    def draw(self, surface, current_level):
-        colors = UI_COLORS[current_level]
-        color = (min(255, colors['ui_background'][0] + 50),
-                min(255, colors['ui_background'][1] + 50),
-                min(255, colors['ui_background'][2] + 50)) if self.hovered else colors['ui_background']
-        pygame.draw.rect(surface, color, self.rect)
-        
-        # Use white color for button outline and text
-        WHITE = (255, 255, 255)
-        pygame.draw.rect(surface, WHITE, self.rect, 1)
-        
-        text_surface = self.font.render(self.text, True, WHITE)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        surface.blit(text_surface, text_rect)
-
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEMOTION:
-            self.hovered = self.rect.collidepoint(event.pos)
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):
-                return True
-        return False
+def pause_button_colors(level):
+    background = UI_COLORS[level]['ui_background']
+    hovered = tuple(min(255, channel + 50) for channel in background)
+    pressed = tuple(min(255, channel + 100) for channel in background)
+    return {NORMAL: background, HOVERED: hovered, PRESSED: pressed}
+
+def make_pause_button(level):
+    return Button(WINDOW_WIDTH - 100, 5, 90, 30, "Pause", get_font(36), pause_button_colors(level))
 
 class Snake:
-    def __init__(self, level: Level):
+    def __init__(self, level: Level, grid=None):
         self.length = 1
-        start_x = GRID_WIDTH // 4
-        start_y = (GRID_HEIGHT_PLAYABLE // 2) + (UI_HEIGHT // GRID_SIZE)
-        if level in [Level.MEDIUM, Level.HARD]:
-            start_x = max(int(BOUNDARY_THICKNESS + 1), start_x)
-            start_y = max(int((UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS + 1), start_y)
-        self.positions = [(start_x, start_y)]
-        self.direction = (1, 0)  # Start moving right
+        start, self.direction = start_position(level, grid)
+        self.positions = [start]
         self.score = 0
+        self.boost = 0  # Moves left at boosted speed
         self.level = level
+        self.grid = grid  # (width, height) of a fixed board; None follows the window
         # Define snake colors based on level
-        if level == Level.EASY:
-            self.head_color = (50, 205, 50)     # Limegreen
-            self.body_color = (34, 139, 34)     # Darker green
-        elif level == Level.MEDIUM:
-            self.head_color = (255, 165, 0)     # Orange
-            self.body_color = (255, 140, 0)     # Darker orange
-        else:  # HARD
-            self.head_color = (0, 255, 200)     # Neon cyan
-            self.body_color = (0, 200, 160)     # Darker cyan
+        self.head_color, self.body_color = SNAKE_COLORS[level]
 
     def get_head_position(self) -> Tuple[int, int]:
         return self.positions[0]
 
     def update(self):
-        cur = self.get_head_position()
-        x, y = self.direction
-        new = (cur[0] + x, cur[1] + y)
-
-        # Check UI area collision
-        if new[1] < UI_HEIGHT // GRID_SIZE:
+        # Walls and wrapping come from the level's precomputed move table
+        width, height = self.grid or (GRID_WIDTH, GRID_HEIGHT)
+        new = build_level_topology(self.level, width, height, ARENA).move(self.get_head_position(), self.direction)
+        if new is None:
             return False
 
-        # Check boundary collision for Medium and Hard levels
-        if self.level in [Level.MEDIUM, Level.HARD]:
-            # Add a small buffer to boundary collision to prevent clipping
-            buffer = 0.1
-            if (new[0] < BOUNDARY_THICKNESS + buffer or 
-                new[0] >= GRID_WIDTH - (BOUNDARY_THICKNESS + buffer) or 
-                new[1] < (UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS + buffer or 
-                new[1] >= GRID_HEIGHT - (BOUNDARY_THICKNESS + buffer)):
-                return False
-        else:
-            # Wrap around for Easy level, but respect UI area
-            new = (new[0] % GRID_WIDTH, 
-                   max(UI_HEIGHT // GRID_SIZE, 
-                       ((new[1] - (UI_HEIGHT // GRID_SIZE)) % (GRID_HEIGHT - (UI_HEIGHT // GRID_SIZE))) + (UI_HEIGHT // GRID_SIZE)))
-
         if new in self.positions[3:]:  # Snake collides with itself
             return False
         self.positions.insert(0, new)
         if len(self.positions) > self.length:
             self.positions.pop()
+        if self.boost:
+            self.boost -= 1
         return True
 
     def reset(self):
-        # Adjust reset position to account for boundary thickness
-        start_x = GRID_WIDTH // 4
-        start_y = (GRID_HEIGHT_PLAYABLE // 2) + (UI_HEIGHT // GRID_SIZE)
-        if self.level in [Level.MEDIUM, Level.HARD]:
-            start_x = max(int(BOUNDARY_THICKNESS + 1), start_x)
-            start_y = max(int((UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS + 1), start_y)
+        start, self.direction = start_position(self.level, self.grid)
         self.length = 1
-        self.positions = [(start_x, start_y)]
-        self.direction = (1, 0)
+        self.positions = [start]
         self.score = 0
+        self.boost = 0
 
-    def render(self, surface):
-        for i, p in enumerate(self.positions):
+    def get_rect(self, index):
+        # Center the snake segments in their grid cells
+        x = self.positions[index][0] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2
+        y = self.positions[index][1] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2
+        return pygame.Rect(x, y, SNAKE_SIZE, SNAKE_SIZE)
+
+    def render(self, renderer):
+        for i in range(len(self.positions)):
             color = self.head_color if i == 0 else self.body_color
-            # Center the snake segments in their grid cells
-            x = p[0] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2
-            y = p[1] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2
-            r = pygame.Rect(x, y, SNAKE_SIZE, SNAKE_SIZE)
-            pygame.draw.rect(surface, color, r)
-            pygame.draw.rect(surface, UI_COLORS[self.level]['text'], r, 1)
-
-class Food:
-    def __init__(self, level: Level):
-        self.position = (0, 0)
+            r = self.get_rect(i)
+            renderer.rect(color, r)
+            renderer.rect(UI_COLORS[self.level]['text'], r, 1)
+
+class Items:
+    # Food and power-ups on the board. One food is always out; power-ups turn
+    # up now and then and vanish again after a while. Lifetimes count in
+    # snake moves, so pausing or a slow frame never eats into them.
+    def __init__(self, level: Level, rng=random, grid=None):
         self.level = level
-        self.food_color = (255, 0, 0)  # Bright red color for food
-        self.randomize_position()
-
-    def randomize_position(self):
-        # Add buffer to prevent food spawning too close to boundaries
+        self.rng = rng  # A seeded random.Random makes the placements repeatable
+        self.grid = grid  # (width, height) of a fixed board; None follows the window
+        self.power_ups = POWER_UPS
+        self.map = ItemMap()
+        self.now = 0  # Snake moves so far
+        self.food_color = FOOD_COLOR
+        self.place(FOOD_ITEM)
+
+    def random_cell(self, taken=()):
+        # Add buffer to prevent items spawning too close to boundaries
         buffer = 1
+        width, height = self.grid or (GRID_WIDTH, GRID_HEIGHT)
         if self.level in [Level.MEDIUM, Level.HARD]:
             min_x = int(BOUNDARY_THICKNESS + buffer)
-            max_x = int(GRID_WIDTH - BOUNDARY_THICKNESS - buffer)
+            max_x = int(width - BOUNDARY_THICKNESS - buffer)
             min_y = int((UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS + buffer)
-            max_y = int(GRID_HEIGHT - BOUNDARY_THICKNESS - buffer)
+            max_y = int(height - BOUNDARY_THICKNESS - buffer)
         else:
             min_x = 0
-            max_x = GRID_WIDTH - 1
+            max_x = width - 1
             min_y = UI_HEIGHT // GRID_SIZE
-            max_y = GRID_HEIGHT - 1
+            max_y = height - 1
 
         # Ensure we have valid ranges
         max_x = max(min_x, max_x)
         max_y = max(min_y, max_y)
 
-        self.position = (
-            random.randint(min_x, max_x),
-            random.randint(min_y, max_y)
-        )
-
-    def render(self, surface):
-        # Center the food in its grid cell
-        x = self.position[0] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
-        y = self.position[1] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
-        r = pygame.Rect(x, y, FOOD_SIZE, FOOD_SIZE)
-        pygame.draw.rect(surface, self.food_color, r)  # Use the red color for food
-        pygame.draw.rect(surface, UI_COLORS[self.level]['text'], r, 1)  # Keep the outline using theme color
-
-    def get_collision_rect(self):
-        # Return the actual rect used for collision detection
-        x = self.position[0] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
-        y = self.position[1] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
-        return pygame.Rect(x, y, FOOD_SIZE, FOOD_SIZE)
-
-def draw_menu(screen):
-    # Use EASY theme colors for menu background
-    colors = UI_COLORS[Level.EASY]
-    screen.fill(colors['background'])
-    
+        # Arena walls, the snake and other items are off limits
+        topology = build_level_topology(self.level, width, height, ARENA)
+        for _ in range(ITEM_PLACE_ATTEMPTS):
+            cell = (self.rng.randint(min_x, max_x), self.rng.randint(min_y, max_y))
+            if topology.is_legal(cell) and cell not in self.map and cell not in taken:
+                return cell
+        return None
+
+    def place(self, kind, taken=()):
+        cell = self.random_cell(taken)
+        if cell is not None:
+            lifetime = None if kind == FOOD_ITEM else POWER_UP_LIFETIME
+            self.map.add(kind, cell, None if lifetime is None else self.now + lifetime)
+
+    def eat(self, snake, taken=None):
+        # The item under the snake's head, taken off the board, or None. Eaten
+        # food is put back somewhere else straight away, off the snake or off
+        # taken when given (all the snakes of a multiplayer board).
+        item = self.map.take(snake.get_head_position())
+        if item is not None and item.kind == FOOD_ITEM:
+            self.place(FOOD_ITEM, set(snake.positions) if taken is None else taken)
+        return item
+
+    def update(self, snake, taken=None):
+        # Once per snake move: expire old power-ups, maybe drop a new one
+        self.now += 1
+        self.map.expire(self.now)
+        if self.rng.random() < POWER_UP_CHANCE and len(self.map) - self.map.counts[FOOD_ITEM] < MAX_POWER_UPS:
+            self.place(self.rng.choice(self.power_ups), set(snake.positions) if taken is None else taken)
+
+    def food_cells(self):
+        return [item.cell for item in self.map.values() if item.kind == FOOD_ITEM]
+
+    def render(self, renderer):
+        outline = UI_COLORS[self.level]['text']
+        for item in self.map.values():
+            # Power-ups blink when they are about to go
+            if item.expires is not None and item.expires - self.now <= POWER_UP_BLINK and self.now % 2:
+                continue
+            # Center the item in its grid cell
+            x = item.cell[0] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
+            y = item.cell[1] * GRID_SIZE + (GRID_SIZE - FOOD_SIZE) // 2
+            r = pygame.Rect(x, y, FOOD_SIZE, FOOD_SIZE)
+            renderer.rect(ITEM_COLORS[item.kind], r)
+            renderer.rect(outline, r, 1)  # Keep the outline using theme color
+
+def use_item(snake, item):
+    # What eating an item does to the snake
+    if item.kind == FOOD_ITEM:
+        snake.length += 1
+        snake.score += 1
+    elif item.kind == BONUS_ITEM:
+        snake.length += 1
+        snake.score += BONUS_POINTS
+    elif item.kind == SPEED_ITEM:
+        snake.boost = SPEED_BOOST_MOVES
+        snake.score += 1
+    elif item.kind == SHRINK_ITEM:
+        snake.length = max(1, snake.length - SHRINK_AMOUNT)
+        del snake.positions[snake.length:]
+        snake.score += 1
+
+def snake_speed(snake):
+    # Moves per second, including a running speed boost
+    speed = level_speed(snake.level)
+    return speed * SPEED_BOOST if snake.boost else speed
+
+def cell_index(cell):
+    # Cell number on the window-sized board, as the network protocol sends it
+    return cell[1] * GRID_WIDTH + cell[0]
+
+def cell_center(position):
+    return (position[0] * GRID_SIZE + GRID_SIZE // 2, position[1] * GRID_SIZE + GRID_SIZE // 2)
+
+def burst(particles, position, color, settings):
+    count, speed, life = settings
+    particles.emit(cell_center(position), color, count, speed, life)
+
+def layout_menu():
     # Create and update title
     title = Title()
     
@@ -328,210 +493,194 @@ def draw_menu(screen):
         'hover_outline': (255, 255, 255),  # White outline for hover effect
     }
     
-    font = pygame.font.Font(None, 74)
-    
-    # Create all text surfaces first
-    easy_text = font.render('Easy', True, MENU_COLORS['Easy'])
-    medium_text = font.render('Medium', True, MENU_COLORS['Medium'])
-    hard_text = font.render('Hard', True, MENU_COLORS['Hard'])
-
-    # Calculate total menu height and adjust positions to account for title
-    total_height = MENU_ITEM_HEIGHT * 3  # 3 options
     start_y = (WINDOW_HEIGHT + WINDOW_HEIGHT // 3) // 2  # Start below the title
-
-    # Create rectangles for menu items with padding
-    padding = 20  # Padding around text for hover/click effects
-    easy_rect = easy_text.get_rect(center=(WINDOW_WIDTH/2, start_y))
-    medium_rect = medium_text.get_rect(center=(WINDOW_WIDTH/2, start_y + MENU_SPACING))
-    hard_rect = hard_text.get_rect(center=(WINDOW_WIDTH/2, start_y + MENU_SPACING * 2))
-
-    # Create larger rectangles for hover/click effects
-    easy_hover_rect = pygame.Rect(easy_rect.x - padding, easy_rect.y - padding,
-                                easy_rect.width + padding * 2, easy_rect.height + padding * 2)
-    medium_hover_rect = pygame.Rect(medium_rect.x - padding, medium_rect.y - padding,
-                                  medium_rect.width + padding * 2, medium_rect.height + padding * 2)
-    hard_hover_rect = pygame.Rect(hard_rect.x - padding, hard_rect.y - padding,
-                                hard_rect.width + padding * 2, hard_rect.height + padding * 2)
-
-    return title, (easy_hover_rect, easy_rect, easy_text), (medium_hover_rect, medium_rect, medium_text), (hard_hover_rect, hard_rect, hard_text), MENU_COLORS
-
-def draw_ui_area(screen, score, level, pause_button):
+    menu = MenuList(get_font(74), [(Level.EASY, 'Easy', MENU_COLORS['Easy']),
+                                   (Level.MEDIUM, 'Medium', MENU_COLORS['Medium']),
+                                   (Level.HARD, 'Hard', MENU_COLORS['Hard'])],
+                    WINDOW_WIDTH/2, start_y, MENU_SPACING, MENU_COLORS['hover_outline'])
+    return title, menu
+
+def layout_ui_area(level, pause_button):
+    # Score and level labels of the bar above the board
+    WHITE = (255, 255, 255)
+    font = get_font(36)
+    level_text_width = font.size(f'Level: {level.name}')[0]
+    score_label = Label(font, 'Score: 0', WHITE, topleft=(10, 10))
+    level_label = Label(font, f'Level: {level.name}', WHITE,
+                        topleft=(WINDOW_WIDTH - pause_button.rect.width - level_text_width - 40, 10))
+    return score_label, level_label
+
+def draw_ui_area(renderer, level, score_label, level_label, pause_button):
     colors = UI_COLORS[level]
     # Draw UI background
-    pygame.draw.rect(screen, colors['ui_background'], (0, 0, WINDOW_WIDTH, UI_HEIGHT))
+    renderer.rect(colors['ui_background'], (0, 0, WINDOW_WIDTH, UI_HEIGHT))
     
     # Draw score and level with white text
-    WHITE = (255, 255, 255)
-    font = pygame.font.Font(None, 36)
-    score_text = font.render(f'Score: {score}', True, WHITE)
-    level_text = font.render(f'Level: {level.name}', True, WHITE)
-    
-    # Calculate positions
-    score_pos = (10, 10)
-    level_text_width = level_text.get_width()
-    level_pos = (WINDOW_WIDTH - pause_button.rect.width - level_text_width - 40, 10)
-    
-    screen.blit(score_text, score_pos)
-    screen.blit(level_text, level_pos)
+    score_label.draw(renderer)
+    level_label.draw(renderer)
     
     # Draw pause button
-    pause_button.draw(screen, level)
+    pause_button.draw(renderer)
 
-def draw_boundaries(screen, level):
+def draw_boundaries(renderer, level):
     colors = UI_COLORS[level]
     # Draw thinner boundaries, starting below UI area
     boundary_pixel_size = int(BOUNDARY_THICKNESS * GRID_SIZE)  # Convert to pixels
     for i in range(1):  # Only one iteration needed for thinner boundary
         # Top boundary (below UI)
-        pygame.draw.rect(screen, colors['boundary'], (i * GRID_SIZE, UI_HEIGHT + (i * GRID_SIZE), 
+        renderer.rect(colors['boundary'], (i * GRID_SIZE, UI_HEIGHT + (i * GRID_SIZE), 
                                       WINDOW_WIDTH - (2 * i * GRID_SIZE), boundary_pixel_size))
         # Bottom boundary
-        pygame.draw.rect(screen, colors['boundary'], (i * GRID_SIZE, WINDOW_HEIGHT - boundary_pixel_size - (i * GRID_SIZE), 
+        renderer.rect(colors['boundary'], (i * GRID_SIZE, WINDOW_HEIGHT - boundary_pixel_size - (i * GRID_SIZE), 
                                       WINDOW_WIDTH - (2 * i * GRID_SIZE), boundary_pixel_size))
         # Left boundary
-        pygame.draw.rect(screen, colors['boundary'], (i * GRID_SIZE, UI_HEIGHT + (i * GRID_SIZE), 
+        renderer.rect(colors['boundary'], (i * GRID_SIZE, UI_HEIGHT + (i * GRID_SIZE), 
                                       boundary_pixel_size, WINDOW_HEIGHT - UI_HEIGHT - (2 * i * GRID_SIZE)))
         # Right boundary
-        pygame.draw.rect(screen, colors['boundary'], (WINDOW_WIDTH - boundary_pixel_size - (i * GRID_SIZE), UI_HEIGHT + (i * GRID_SIZE), 
+        renderer.rect(colors['boundary'], (WINDOW_WIDTH - boundary_pixel_size - (i * GRID_SIZE), UI_HEIGHT + (i * GRID_SIZE), 
                                       boundary_pixel_size, WINDOW_HEIGHT - UI_HEIGHT - (2 * i * GRID_SIZE)))
 
-def show_game_over(screen, score, level):
+def render_arena(level):
+    # All walls of the arena in one window-sized image
+    colors = UI_COLORS[level]
+    fill = tuple(channel // 3 for channel in colors['boundary'])
+    image = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+    for x, y in ARENA.wall_cells(level_topology(level).area):
+        r = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+        image.fill(fill, r)
+        pygame.draw.rect(image, colors['boundary'], r, 1)
+    return image
+
+def draw_arena(renderer, level):
+    # Built once per arena and grid size, then drawn as a single sprite
+    if ARENA:
+        renderer.sprite(('arena', ARENA, level, WINDOW_WIDTH, WINDOW_HEIGHT),
+                        lambda: render_arena(level), (0, 0))
+
+def limit_frame_rate(clock, renderer, fps):
+    # Headless renderers run unthrottled so only logic cost is measured; each
+    # frame still advances the game by one nominal frame of time
+    if renderer.throttled:
+        return clock.tick(fps)
+    clock.tick()
+    return 1000 / fps
+
+def draw_game_over(renderer, score, level, fade_alpha, glow_offset, options, quality, best=None):
     colors = UI_COLORS[level]
-    overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-    overlay.set_alpha(128)
-    overlay.fill(colors['background'])
-    screen.blit(overlay, (0, 0))
+    renderer.overlay(colors['background'], fade_alpha)
 
-    game_over_font = pygame.font.Font(None, 100)
-    text_font = pygame.font.Font(None, 65)
+    game_over_font = get_font(100)
+    text_font = get_font(65)
 
     # Define colors
     WHITE = (255, 255, 255)
     RED = (255, 0, 0)
     DARK_RED = (200, 0, 0)  # For the glow effect
+
+    game_over_rect = pygame.Rect((0, 0), game_over_font.size('GAME OVER'))
+    game_over_rect.center = (WINDOW_WIDTH/2, WINDOW_HEIGHT/2 - 100)
+
+    glow_factor = abs(math.sin(math.radians(glow_offset))) * 0.5 + 0.5  # Value between 0.5 and 1
     
-    # Create game over text with glow effect
-    game_over_glow = game_over_font.render('GAME OVER', True, DARK_RED)
-    game_over_text = game_over_font.render('GAME OVER', True, RED)
-    score_text = text_font.render(f'Final Score: {score}', True, WHITE)
-    restart_text = text_font.render('Press SPACE to Restart', True, WHITE)
-    menu_text = text_font.render('Press M for Main Menu', True, WHITE)
-
-    # Create rectangles for hover effects
-    padding = 20
-    restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 80))
-    menu_rect = menu_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 160))
-    
-    restart_hover_rect = pygame.Rect(restart_rect.x - padding, restart_rect.y - padding,
-                                   restart_rect.width + padding * 2, restart_rect.height + padding * 2)
-    menu_hover_rect = pygame.Rect(menu_rect.x - padding, menu_rect.y - padding,
-                                 menu_rect.width + padding * 2, menu_rect.height + padding * 2)
-
-    game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 - 100))
-    score_rect = score_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
-
-    clock = pygame.time.Clock()
-    waiting = True
-    return_to_menu = False
-    glow_offset = 0
-
-    while waiting:
-        mouse_pos = pygame.mouse.get_pos()
-        glow_offset = (glow_offset + 1) % 360  # For pulsing effect
-        glow_factor = abs(math.sin(math.radians(glow_offset))) * 0.5 + 0.5  # Value between 0.5 and 1
-        
-        # Clear and redraw everything
-        screen.blit(overlay, (0, 0))
-        
-        # Draw game over text with glow effect
+    # Draw game over text with glow effect
+    if renderer.has_bloom:
+        # Pulsing bloom light, added once the text is drawn
+        renderer.bloom_text(game_over_font, 'GAME OVER', RED, alpha=int(255 * glow_factor),
+                            topleft=game_over_rect.topleft)
+    else:
         glow_size = int(3 * glow_factor)  # Pulsing glow size
-        for offset in range(glow_size, 0, -1):
-            glow_rect = game_over_rect.copy()
-            glow_rect.x -= offset
-            glow_rect.y -= offset
-            glow_rect.width += offset * 2
-            glow_rect.height += offset * 2
+        for offset in range(min(glow_size, quality['glow_layers']), 0, -1):
             glow_alpha = int(255 * (1 - offset/glow_size) * glow_factor)
-            glow_surface = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-            glow_text = game_over_font.render('GAME OVER', True, (*DARK_RED, glow_alpha))
-            glow_surface.blit(glow_text, (offset, offset))
-            screen.blit(glow_surface, glow_rect)
-        
-        screen.blit(game_over_text, game_over_rect)
-        screen.blit(score_text, score_rect)
-        screen.blit(restart_text, restart_rect)
-        screen.blit(menu_text, menu_rect)
-
-        # Draw hover effects
-        if restart_hover_rect.collidepoint(mouse_pos):
-            for i in range(3):  # Create a subtle glow effect
-                glow_rect = restart_hover_rect.inflate(i*2, i*2)
-                pygame.draw.rect(screen, WHITE, glow_rect, 2, border_radius=10)
-        
-        if menu_hover_rect.collidepoint(mouse_pos):
-            for i in range(3):  # Create a subtle glow effect
-                glow_rect = menu_hover_rect.inflate(i*2, i*2)
-                pygame.draw.rect(screen, WHITE, glow_rect, 2, border_radius=10)
-
-        pygame.display.update()
-        clock.tick(60)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    waiting = False
-                elif event.key == pygame.K_m:
-                    waiting = False
-                    return_to_menu = True
-                elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if restart_hover_rect.collidepoint(event.pos):
-                    waiting = False
-                elif menu_hover_rect.collidepoint(event.pos):
-                    waiting = False
-                    return_to_menu = True
-
-    return return_to_menu
-
-def show_pause_screen(screen, level):
-    colors = UI_COLORS[level]
-    overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-    overlay.set_alpha(128)
-    overlay.fill(colors['background'])
-    screen.blit(overlay, (0, 0))
+            renderer.text(game_over_font, 'GAME OVER', DARK_RED, alpha=glow_alpha, topleft=game_over_rect.topleft)
+    
+    renderer.text(game_over_font, 'GAME OVER', RED, topleft=game_over_rect.topleft)
+    renderer.composite_bloom()
+    text = f'Final Score: {score}' if best is None else f'Final Score: {score}   Best: {best}'
+    renderer.text(text_font, text, WHITE, center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
 
-    pause_font = pygame.font.Font(None, 100)
-    text_font = pygame.font.Font(None, 65)
+    # Restart and menu options with their hover effects
+    options.set_outline_rings(quality['outline_rings'])
+    options.draw(renderer)
 
-    # Use white color (255, 255, 255) for all text regardless of level
+def layout_game_over():
     WHITE = (255, 255, 255)
-    
-    pause_text = pause_font.render('PAUSED', True, WHITE)
-    continue_text = text_font.render('Press ESC or click Pause to resume', True, WHITE)
-    menu_text = text_font.render('Press M to return to Main Menu', True, WHITE)
+    return MenuList(get_font(65), [('restart', 'Press SPACE to Restart', WHITE),
+                                   ('menu', 'Press M for Main Menu', WHITE)],
+                    WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 80, 80)
 
-    pause_rect = pause_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 - 100))
-    continue_rect = continue_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
-    menu_rect = menu_text.get_rect(center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 100))
+def draw_pause_screen(renderer, level):
+    colors = UI_COLORS[level]
+    renderer.overlay(colors['background'], 128)
 
-    screen.blit(pause_text, pause_rect)
-    screen.blit(continue_text, continue_rect)
-    screen.blit(menu_text, menu_rect)
-    pygame.display.update()
+    pause_font = get_font(100)
+    text_font = get_font(65)
 
-    return False  # Continue game by default
+    # Use white color (255, 255, 255) for all text regardless of level
+    WHITE = (255, 255, 255)
+    
+    renderer.text(pause_font, 'PAUSED', WHITE, center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 - 100))
+    renderer.text(text_font, 'Press ESC or click Pause to resume', WHITE, center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2))
+    renderer.text(text_font, 'Press M to return to Main Menu', WHITE, center=(WINDOW_WIDTH/2, WINDOW_HEIGHT/2 + 100))
 
-def resize_window(width, height, screen, snake=None, food=None, level=None, pause_button=None, paused=False):
+def draw_leaderboard(renderer, tables):
+    # tables: {level: [(score, length, moves, played, replay)]}, best first
+    WHITE = (255, 255, 255)
+    renderer.clear(UI_COLORS[Level.EASY]['background'])
+    renderer.text(get_font(74), 'HIGH SCORES', WHITE, center=(WINDOW_WIDTH/2, 60))
+    font = get_font(36)
+    column = WINDOW_WIDTH / len(Level)
+    for index, level in enumerate(Level):
+        x = column * index + column / 2
+        renderer.text(font, level.name.capitalize(), SNAKE_COLORS[level][0], center=(x, 130))
+        for rank, (score, *_) in enumerate(tables[level], start=1):
+            renderer.text(font, f'{rank:2}.  {score}', WHITE, center=(x, 130 + rank * 34))
+        if not tables[level]:
+            renderer.text(font, 'No games yet', WHITE, center=(x, 164))
+    renderer.text(font, 'Press ESC to go back', WHITE, center=(WINDOW_WIDTH/2, WINDOW_HEIGHT - 40))
+
+def game_over_fade(frames):
+    # The overlay used to be stacked once per frame, fading the board out over
+    # a few frames; this is the combined alpha after that many frames
+    return min(255, int(255 * (1 - 0.5 ** max(1, frames))))
+
+def warmup_tasks(renderer):
+    # Everything the first frame of a level, its pause screen and its game over
+    # screen would otherwise build on first use
+    WHITE = (255, 255, 255)
+    tasks = [lambda size=size: get_font(size) for size in (36, 65, 74, 100, TITLE_FONT_SIZE)]
+
+    # Menu items in every state
+    title, menu = layout_menu()
+    tasks += [lambda item=item: item.prepare(renderer) for item in menu.items]
+
+    for level in Level:
+        background = UI_COLORS[level]['background']
+        pause_button = make_pause_button(level)
+        tasks += [lambda widget=widget: widget.prepare(renderer)
+                  for widget in (pause_button, *layout_ui_area(level, pause_button))]
+        tasks.append(lambda background=background: renderer.prepare_overlay(background, 128))
+        # Every step of the game over fade
+        for frames in range(1, 9):
+            tasks.append(lambda background=background, frames=frames:
+                         renderer.prepare_overlay(background, game_over_fade(frames)))
+
+    tasks += [
+        lambda: renderer.prepare_text(get_font(100), 'PAUSED', WHITE),
+        lambda: renderer.prepare_text(get_font(65), 'Press ESC or click Pause to resume', WHITE),
+        lambda: renderer.prepare_text(get_font(65), 'Press M to return to Main Menu', WHITE),
+        lambda: renderer.prepare_text(get_font(100), 'GAME OVER', (255, 0, 0)),
+        lambda: renderer.prepare_text(get_font(100), 'GAME OVER', (200, 0, 0)),
+        lambda: renderer.prepare_text(get_font(65), 'Final Score: 0', WHITE)
+    ]
+    tasks += [lambda item=item: item.prepare(renderer) for item in layout_game_over().items]
+    return tasks
+
+def resize_window(width, height, renderer):
     global WINDOW_WIDTH, WINDOW_HEIGHT, GRID_WIDTH, GRID_HEIGHT, PLAY_AREA_HEIGHT, GRID_HEIGHT_PLAYABLE
     
     # Update window dimensions
-    WINDOW_WIDTH = max(800, width)  # Minimum width of 800
-    WINDOW_HEIGHT = max(600, height)  # Minimum height of 600
+    WINDOW_WIDTH = max(MIN_WINDOW_WIDTH, width)  # Minimum width of 800
+    WINDOW_HEIGHT = max(MIN_WINDOW_HEIGHT, height)  # Minimum height of 600
     
     # Update grid dimensions
     GRID_WIDTH = int(WINDOW_WIDTH // GRID_SIZE)
@@ -541,175 +690,719 @@ def resize_window(width, height, screen, snake=None, food=None, level=None, paus
     PLAY_AREA_HEIGHT = WINDOW_HEIGHT - UI_HEIGHT
     GRID_HEIGHT_PLAYABLE = PLAY_AREA_HEIGHT // GRID_SIZE
     
-    # Create new resized surface
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
-    
-    # If we're in the menu, redraw it
-    if not snake and not food:
-        draw_menu(screen)
-    # If we're in the game, redraw everything
-    elif snake and food and level:
-        screen.fill(UI_COLORS[level]['background'])
-        if pause_button:
-            pause_button.rect.x = WINDOW_WIDTH - 100  # Update pause button position
-            draw_ui_area(screen, snake.score, level, pause_button)
-        if level in [Level.MEDIUM, Level.HARD]:
-            draw_boundaries(screen, level)
-        snake.render(screen)
-        food.render(screen)
-        if paused:
-            show_pause_screen(screen, level)
-        pygame.display.update()
-    
-    return screen
+    # Resize the render target; scenes lay themselves out again afterwards
+    renderer.resize(WINDOW_WIDTH, WINDOW_HEIGHT)
+
+def quit_game():
+    pygame.quit()
+    sys.exit()
+
+class MenuScene(Scene):
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.event_handlers = {
+            pygame.MOUSEMOTION: self.on_mouse_event,
+            pygame.MOUSEBUTTONDOWN: self.on_mouse_event,
+            pygame.MOUSEBUTTONUP: self.on_mouse_event
+        }
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.manager.quit(),
+            pygame.K_h: lambda event: self.manager.push(LeaderboardScene(self.manager))
+        }
+        self.frames = 0
+        self.resize()
+
+    def resize(self):
+        super().resize()
+        self.title, self.menu = layout_menu()
+        self.menu.hover(pygame.mouse.get_pos())
+
+    def on_mouse_event(self, event):
+        # Hovering only redraws the items whose state changed
+        level = self.menu.handle_event(event)
+        if level:
+            self.manager.replace(new_game(self.manager, level))
+
+    def update(self, dt):
+        # The title animates every frame, or every few frames on slow machines
+        interval = self.manager.quality['animation_interval']
+        self.frames += 1
+        if self.frames % interval == 0:
+            self.title.update(interval)
+            self.dirty = True
+        self.menu.set_outline_rings(self.manager.quality['outline_rings'])
+
+    def draw(self, renderer):
+        # Clear screen and draw background
+        renderer.clear(UI_COLORS[Level.EASY]['background'])
+        
+        # Draw title
+        self.title.draw(renderer)
+        
+        # Draw menu items with hover effects
+        self.menu.draw(renderer)
+
+    def dirty_rects(self):
+        return self.menu.dirty_rects
+
+    def redraw(self, renderer, rects):
+        # Menu items sit on the plain background, well below the title
+        for item in self.menu.items:
+            if item.dirty_rect:
+                renderer.rect(UI_COLORS[Level.EASY]['background'], item.dirty_rect)
+                item.draw(renderer)
+
+def new_game(manager, level):
+    if BATTLE_BOTS:
+        return BattleScene(manager, level, BATTLE_BOTS, WORLD_SIZE or battle_size(BATTLE_BOTS + 1))
+    if WORLD_SIZE:
+        return WorldScene(manager, level, WORLD_SIZE)
+    prepare_arena(level)
+    return GameScene(manager, level)
+
+class GameScene(Scene):
+    mode = 'classic'  # Which high score table the game goes into
+
+    def __init__(self, manager, level):
+        super().__init__(manager)
+        self.level = level
+        if self.mode == 'classic' and ARENA:
+            self.mode = 'arena'
+        self.seed = random.getrandbits(32)  # Item placement, kept in the replay
+        self.snake, self.items = self.new_board()
+        self.tick_ms = self.move_ms()
+        self.elapsed = 0
+        self.moves = 0  # Including the last, fatal one
+        self.started = pygame.time.get_ticks()
+        # Only games on the open board can be replayed from the replay alone
+        self.replay = Replay(level.value, self.seed, GRID_WIDTH, GRID_HEIGHT) if self.mode == 'classic' else None
+        
+        # Create pause button and the labels next to it
+        self.pause_button = make_pause_button(level)
+        self.score_label, self.level_label = layout_ui_area(level, self.pause_button)
+
+        # Eat, death and level start effects
+        self.particles = ParticleSystem(self.particle_colors())
+        burst(self.particles, self.snake.get_head_position(), self.snake.head_color, LEVEL_START_BURST)
+        if SPECTATORS:
+            self.items.map.changes = []  # Collected for the spectators' deltas
+            self.show_spectators()
+
+        self.event_handlers = {
+            pygame.MOUSEMOTION: self.on_pause_button_event,
+            pygame.MOUSEBUTTONDOWN: self.on_pause_button_event,
+            pygame.MOUSEBUTTONUP: self.on_pause_button_event
+        }
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.pause(),
+            pygame.K_UP: lambda event: self.turn((0, -1)),
+            pygame.K_DOWN: lambda event: self.turn((0, 1)),
+            pygame.K_LEFT: lambda event: self.turn((-1, 0)),
+            pygame.K_RIGHT: lambda event: self.turn((1, 0))
+        }
+
+    def new_board(self):
+        return Snake(self.level), Items(self.level, random.Random(self.seed))
+
+    def particle_colors(self):
+        return list(ITEM_COLORS.values()) + [self.snake.head_color, self.snake.body_color]
+
+    def move_ms(self):
+        # Time between snake moves; speed boosts shorten it
+        return 1000 / snake_speed(self.snake)
+
+    def resize(self):
+        super().resize()
+        self.pause_button.rect.x = WINDOW_WIDTH - 100  # Update pause button position
+        self.score_label, self.level_label = layout_ui_area(self.level, self.pause_button)
+        self.score_label.set_text(f'Score: {self.snake.score}')
+        if self.replay:
+            self.replay.resize(GRID_WIDTH, GRID_HEIGHT)
+        if SPECTATORS:
+            self.show_spectators()  # Cell numbers follow the board width
+
+    def pause(self):
+        self.manager.push(PauseScene(self.manager, self))
+
+    def on_focus_lost(self):
+        # Don't let the snake run into a wall while nobody is watching
+        self.pause()
+
+    def turn(self, direction):
+        # The snake can't reverse into itself
+        if self.snake.direction != (-direction[0], -direction[1]):
+            self.snake.direction = direction
+
+    def on_pause_button_event(self, event):
+        if self.pause_button.handle_event(event):
+            self.pause()
+
+    def dirty_rects(self):
+        rect = self.pause_button.dirty_rect
+        return [rect] if rect else []
+
+    def redraw(self, renderer, rects):
+        # The button image covers its whole rect, so hovering redraws only it
+        self.pause_button.draw(renderer)
+
+    def update_particles(self, dt):
+        if self.particles.count:
+            self.particles.update(dt / 1000)
+            self.dirty = True
+
+    def update(self, dt):
+        self.update_particles(dt)
+        # Step the snake at the level speed, independent of the frame rate
+        self.elapsed = min(self.elapsed + dt, self.tick_ms * 3)
+        while self.elapsed >= self.tick_ms:
+            self.elapsed -= self.tick_ms
+            self.moves += 1
+            if not self.step():
+                head = self.snake.get_head_position()
+                burst(self.particles, head, self.snake.head_color, DEATH_BURST)
+                burst(self.particles, head, self.snake.body_color, DEATH_BURST)
+                self.record_game()
+                self.manager.push(GameOverScene(self.manager, self))
+                return
+            self.tick_ms = self.move_ms()
+
+    def step(self):
+        snake = self.snake
+        before = len(snake.positions)
+        if self.replay:
+            self.replay.move(snake.direction)
+        # Update snake
+        if not snake.update():
+            self.publish(before, alive=False)
+            return False
+
+        # Items are keyed by cell, so this is one lookup however many are out
+        item = self.items.eat(snake)
+        if item is not None:
+            use_item(snake, item)
+            burst(self.particles, item.cell, ITEM_COLORS[item.kind], EAT_BURST)
+            self.score_label.set_text(f'Score: {snake.score}')
+        self.items.update(snake)
+        self.publish(before + 1 - len(snake.positions))
+        self.dirty = True
+        return True
+
+    def death_cause(self):
+        # 'wall' or 'self' for the move that ended the game
+        head = self.snake.get_head_position()
+        return 'wall' if level_topology(self.level).move(head, self.snake.direction) is None else 'self'
+
+    def record_game(self):
+        game = dict(mode=self.mode, level=self.level.value, score=self.snake.score, length=self.snake.length,
+                    moves=self.moves, cause=self.death_cause(), seconds=(pygame.time.get_ticks() - self.started) / 1000)
+        if SCORES:
+            SCORES.record(**game, replay=self.replay)
+        if LEADERBOARD:
+            LEADERBOARD.submit(dict(game, played=time.time(), replay=self.replay.digest() if self.replay else None))
+
+    def best_score(self):
+        return SCORES.best.get((self.mode, self.level.value)) if SCORES else None
+
+    def spectator_state(self):
+        # The board for a spectator keyframe, as Match.state() less the tick
+        snake = self.snake
+        return dict(seed=0, level=self.level.value, width=GRID_WIDTH, height=GRID_HEIGHT, now=self.items.now,
+                    snakes=[dict(id=0, alive=True, direction=DIRECTION_INDEX[snake.direction],
+                                 length=snake.length, score=snake.score, boost=snake.boost,
+                                 cells=[cell_index(cell) for cell in snake.positions])],
+                    items=sorted((cell_index(item.cell), item.kind, item.expires) for item in self.items.map.values()))
+
+    def publish(self, removed, alive=True):
+        # This move for the spectators: tail cells gone, items changed
+        if not SPECTATORS:
+            return
+        snake = self.snake
+        head = cell_index(snake.get_head_position()) if alive else 0
+        moves = [(0, ALIVE if alive else 0, DIRECTION_INDEX[snake.direction], head, removed,
+                  snake.length, snake.score)]
+        changes = [(cell_index(cell), kind) for cell, kind in self.items.map.changes]
+        self.items.map.changes.clear()
+        for spectators in SPECTATORS:
+            spectators.publish(moves, changes, self.spectator_state)
+
+    def show_spectators(self):
+        # The whole board, for a new game or a new board size
+        state = self.spectator_state()
+        for spectators in SPECTATORS:
+            spectators.keyframe(state)
+
+    def draw(self, renderer):
+        # Draw everything
+        renderer.clear(UI_COLORS[self.level]['background'])
+        draw_ui_area(renderer, self.level, self.score_label, self.level_label, self.pause_button)
+        if self.level in [Level.MEDIUM, Level.HARD]:
+            draw_boundaries(renderer, self.level)
+        draw_arena(renderer, self.level)
+        self.snake.render(renderer)
+        self.items.render(renderer)
+        self.particles.draw(renderer)
+        if self.level == Level.HARD:
+            # The neon head glows
+            renderer.bloom_rect(self.snake.head_color, self.snake.get_rect(0))
+            renderer.composite_bloom()
+
+def view_cells():
+    # Cells the window shows below the UI bar, counting partly visible ones
+    return (-(-WINDOW_WIDTH // GRID_SIZE), -(-(WINDOW_HEIGHT - UI_HEIGHT) // GRID_SIZE))
+
+class WorldScene(GameScene):
+    # Large-world mode: the board can be far bigger than the window and a
+    # camera follows the head. Only the chunks in view are drawn, so the frame
+    # cost follows the window size, not the world size.
+    mode = 'world'
+
+    def __init__(self, manager, level, world_size):
+        self.world_size = world_size
+        super().__init__(manager, level)
+
+    def new_board(self):
+        width, height = self.world_size
+        self.board = ChunkedBoard(width, height)
+        wrap = self.level == Level.EASY
+        head_color, body_color = SNAKE_COLORS[self.level]
+        snake = WorldSnake(self.board, (width // 2, height // 2), wrap, head_color, body_color)
+        # Walled worlds show one cell past the edge so the wall can be seen
+        self.camera = Camera(width, height, *view_cells(), margin=0 if wrap else 1)
+        self.camera.follow(snake.get_head_position())
+        food = FoodField(self.board, FOOD_COLOR)
+        # Boards bigger than the window get a minimap; it follows the board
+        # changes from here on
+        self.minimap = None
+        if width > self.camera.width or height > self.camera.height:
+            self.minimap = Minimap(self.board, {SNAKE: body_color, FOOD: FOOD_COLOR},
+                                   UI_COLORS[self.level]['ui_background'])
+        food.refill(self.camera.view)
+        return snake, food
+
+    def move_ms(self):
+        return 1000 / level_speed(self.level)
+
+    def resize(self):
+        super().resize()
+        self.camera.resize(*view_cells())
+        self.camera.follow(self.snake.get_head_position())
+
+    def step(self):
+        snake = self.snake
+        if not snake.update():
+            return False
+        head = snake.get_head_position()
+        self.camera.follow(head)
+        if self.items.eat(head):
+            snake.length += 1
+            snake.score += 1
+            burst(self.particles, head, self.items.food_color, EAT_BURST)
+            self.score_label.set_text(f'Score: {snake.score}')
+        self.items.refill(self.camera.view)
+        self.dirty = True
+        return True
 
-def main():
+    def death_cause(self):
+        return None  # Not told apart on the large boards
+
+    def to_screen(self, cell, size):
+        # Screen rect of an item of the given size centered in a world cell
+        x = (cell[0] - self.camera.x) * GRID_SIZE + (GRID_SIZE - size) // 2
+        y = (cell[1] - self.camera.y) * GRID_SIZE + (GRID_SIZE - size) // 2 + UI_HEIGHT
+        return pygame.Rect(x, y, size, size)
+
+    def draw_edges(self, renderer):
+        colors = UI_COLORS[self.level]
+        thickness = int(BOUNDARY_THICKNESS * GRID_SIZE)
+        world = pygame.Rect(self.to_screen((0, 0), GRID_SIZE).topleft,
+                            (self.world_size[0] * GRID_SIZE, self.world_size[1] * GRID_SIZE))
+        outline = world.inflate(thickness * 2, thickness * 2)
+        renderer.rect(colors['boundary'], (outline.left, outline.top, outline.width, thickness))
+        renderer.rect(colors['boundary'], (outline.left, world.bottom, outline.width, thickness))
+        renderer.rect(colors['boundary'], (outline.left, outline.top, thickness, outline.height))
+        renderer.rect(colors['boundary'], (world.right, outline.top, thickness, outline.height))
+
+    def draw(self, renderer):
+        colors = UI_COLORS[self.level]
+        renderer.clear(colors['background'])
+        if self.level in [Level.MEDIUM, Level.HARD]:
+            self.draw_edges(renderer)
+        head = self.snake.get_head_position()
+        for x, y, value in self.board.cells_in(*self.camera.view):
+            if value == SNAKE:
+                color = self.snake.head_color if (x, y) == head else self.snake.body_color
+                r = self.to_screen((x, y), SNAKE_SIZE)
+            else:
+                color = self.items.food_color
+                r = self.to_screen((x, y), FOOD_SIZE)
+            renderer.rect(color, r)
+            renderer.rect(colors['text'], r, 1)
+        self.particles.draw(renderer, (self.camera.x * GRID_SIZE, self.camera.y * GRID_SIZE - UI_HEIGHT))
+        if self.level == Level.HARD:
+            renderer.bloom_rect(self.snake.head_color, self.to_screen(head, SNAKE_SIZE))
+            renderer.composite_bloom()
+        if self.minimap:
+            topleft = (WINDOW_WIDTH - self.minimap.width - MINIMAP_MARGIN, UI_HEIGHT + MINIMAP_MARGIN)
+            self.minimap.draw(renderer, topleft, self.camera.view, head, self.snake.head_color, colors['text'])
+        # The bar goes on last so nothing from the board shows through it
+        draw_ui_area(renderer, self.level, self.score_label, self.level_label, self.pause_button)
+
+def lighten(color, amount=0.5):
+    return tuple(int(c + (255 - c) * amount) for c in color)
+
+class BattleScene(WorldScene):
+    # Battle royale: the player against a swarm of bots on one big board.
+    # The whole swarm moves in a handful of NumPy operations per tick (see
+    # battle.Swarm), and only the cells inside the camera view are drawn, so
+    # neither cost grows with the number of snakes in a Python loop.
+    mode = 'battle'
+
+    def __init__(self, manager, level, bots, world_size):
+        self.bots = bots
+        super().__init__(manager, level, world_size)
+        self.shown = (0, self.swarm.alive_count)  # Score and snakes alive on the label
+        self.update_label()
+        self.update_minimap()
+
+    def new_board(self):
+        width, height = self.world_size
+        wrap = self.level == Level.EASY
+        self.swarm = create_swarm(width, height, self.bots + 1, wrap)
+        head_color, body_color = SNAKE_COLORS[self.level]
+        snake = SwarmSnake(self.swarm, 0, head_color, body_color)
+        # Snake 0 is the player, the bots cycle through BOT_COLORS
+        self.body_colors = [body_color] + BOT_COLORS
+        self.head_colors = [head_color] + [lighten(color) for color in BOT_COLORS]
+        self.camera = Camera(width, height, *view_cells(), margin=0 if wrap else 1)
+        self.camera.follow(snake.get_head_position())
+        self.minimap = GridMinimap(width, height, UI_COLORS[self.level]['ui_background'])
+        return snake, None  # Food lives in the swarm
+
+    def particle_colors(self):
+        return super().particle_colors() + BOT_COLORS
+
+    def color_index(self, index):
+        # Index into body_colors / head_colors for a snake
+        return 0 if index == 0 else 1 + (index - 1) % len(BOT_COLORS)
+
+    def update_label(self):
+        self.score_label.set_text(f'Score: {self.shown[0]}  Alive: {self.shown[1]}')
+
+    def update_minimap(self):
+        # Rebuilt every tick, since bots move all over the board
+        self.minimap.update([(self.swarm.food, FOOD_COLOR), (self.swarm.owner > 0, BOT_COLORS[0])])
+
+    def resize(self):
+        super().resize()
+        self.update_label()
+
+    def step(self):
+        swarm = self.swarm
+        swarm.step()
+        if not self.snake.alive:
+            return False
+        head = self.snake.get_head_position()
+        self.camera.follow(head)
+        score = self.snake.score
+        if score != self.shown[0]:
+            burst(self.particles, head, FOOD_COLOR, EAT_BURST)
+        # Bots that die in view go out with a small burst
+        left, top, width, height = self.camera.view
+        for index in swarm.died.tolist():
+            x, y = swarm.head(index)
+            if left <= x < left + width and top <= y < top + height:
+                burst(self.particles, (x, y), self.body_colors[self.color_index(index)], EAT_BURST)
+        if (score, swarm.alive_count) != self.shown:
+            self.shown = (score, swarm.alive_count)
+            self.update_label()
+        self.update_minimap()
+        self.dirty = True
+        return True
+
+    def draw(self, renderer):
+        colors = UI_COLORS[self.level]
+        renderer.clear(colors['background'])
+        if self.level in [Level.MEDIUM, Level.HARD]:
+            self.draw_edges(renderer)
+        swarm = self.swarm
+        visible = swarm.visible(self.camera.view)
+        if visible:
+            grid, food, (left, top) = visible
+            ys, xs = battle.numpy.nonzero(food)
+            for x, y in zip((xs + left).tolist(), (ys + top).tolist()):
+                renderer.rect(FOOD_COLOR, self.to_screen((x, y), FOOD_SIZE))
+            ys, xs = battle.numpy.nonzero(grid)
+            owners = grid[ys, xs] - 1
+            heads = swarm.body[owners, swarm.head_slot[owners]] == (ys + top) * swarm.width + xs + left
+            for x, y, index, is_head in zip((xs + left).tolist(), (ys + top).tolist(),
+                                            owners.tolist(), heads.tolist()):
+                shade = self.color_index(index)
+                r = self.to_screen((x, y), SNAKE_SIZE)
+                renderer.rect(self.head_colors[shade] if is_head else self.body_colors[shade], r)
+                if index == 0:
+                    renderer.rect(colors['text'], r, 1)
+        self.particles.draw(renderer, (self.camera.x * GRID_SIZE, self.camera.y * GRID_SIZE - UI_HEIGHT))
+        head = self.snake.get_head_position()
+        if self.level == Level.HARD:
+            renderer.bloom_rect(self.snake.head_color, self.to_screen(head, SNAKE_SIZE))
+            renderer.composite_bloom()
+        topleft = (WINDOW_WIDTH - self.minimap.width - MINIMAP_MARGIN, UI_HEIGHT + MINIMAP_MARGIN)
+        self.minimap.draw(renderer, topleft, self.camera.view, head, self.snake.head_color, colors['text'])
+        draw_ui_area(renderer, self.level, self.score_label, self.level_label, self.pause_button)
+
+class PauseScene(Scene):
+    opaque = False
+    idle = True  # Nothing moves until a key or click arrives
+
+    def __init__(self, manager, game):
+        super().__init__(manager)
+        self.game = game
+        self.event_handlers = {
+            pygame.MOUSEBUTTONDOWN: self.on_click,
+            pygame.MOUSEBUTTONUP: self.game.pause_button.handle_event  # Release the pressed look
+        }
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.manager.pop(),
+            pygame.K_m: lambda event: self.manager.reset(MenuScene(self.manager))
+        }
+
+    def on_click(self, event):
+        if self.game.pause_button.handle_event(event):
+            self.manager.pop()
+
+    def draw(self, renderer):
+        draw_pause_screen(renderer, self.game.level)
+
+class LeaderboardScene(Scene):
+    idle = True
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        # One walk down the games_top index per level, however many games are stored
+        self.tables = {level: SCORES.top(level.value) if SCORES else [] for level in Level}
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.manager.pop(),
+            pygame.K_h: lambda event: self.manager.pop()
+        }
+
+    def draw(self, renderer):
+        draw_leaderboard(renderer, self.tables)
+
+class GameOverScene(Scene):
+    opaque = False
+
+    def __init__(self, manager, game):
+        super().__init__(manager)
+        self.game = game
+        self.best = game.best_score()  # Includes this game, recorded just before
+        self.frames = 0
+        self.glow_offset = 0
+        self.event_handlers = {
+            pygame.MOUSEMOTION: self.on_mouse_event,
+            pygame.MOUSEBUTTONDOWN: self.on_mouse_event,
+            pygame.MOUSEBUTTONUP: self.on_mouse_event
+        }
+        self.key_handlers = {
+            pygame.K_SPACE: lambda event: self.restart(),
+            pygame.K_m: lambda event: self.to_menu(),
+            pygame.K_ESCAPE: lambda event: self.manager.quit()
+        }
+        self.resize()
+
+    def resize(self):
+        super().resize()
+        self.options = layout_game_over()
+        self.options.hover(pygame.mouse.get_pos())
+
+    def restart(self):
+        self.manager.reset(new_game(self.manager, self.game.level))
+
+    def to_menu(self):
+        self.manager.reset(MenuScene(self.manager))
+
+    def on_mouse_event(self, event):
+        choice = self.options.handle_event(event)
+        if choice == 'restart':
+            self.restart()
+        elif choice == 'menu':
+            self.to_menu()
+
+    def update(self, dt):
+        # The death burst keeps flying under the overlay
+        self.game.update_particles(dt)
+        self.frames += 1
+        self.glow_offset = (self.glow_offset + 1) % 360  # For pulsing effect
+        self.dirty = True
+
+    def draw(self, renderer):
+        # Reproduce the old stacked-overlay fade on top of the redrawn board
+        draw_game_over(renderer, self.game.snake.score, self.game.level, game_over_fade(self.frames),
+                       self.glow_offset, self.options, self.manager.quality, self.best)
+
+def main(renderer=None):
     # Set up display with windowed mode
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
-    pygame.display.set_caption('Snake Ventures')
+    if renderer is None:
+        renderer = create_renderer(WINDOW_WIDTH, WINDOW_HEIGHT, 'Snake Ventures')
     
     # Center the window on the screen
     os.environ['SDL_VIDEO_CENTERED'] = '1'
-    
-    clock = pygame.time.Clock()
-
-    while True:
-        # Level selection menu
-        title, easy_items, medium_items, hard_items, menu_colors = draw_menu(screen)
-        easy_hover_rect, easy_rect, easy_text = easy_items
-        medium_hover_rect, medium_rect, medium_text = medium_items
-        hard_hover_rect, hard_rect, hard_text = hard_items
-        level = None
-
-        while level is None:
-            # Get mouse position for hover effect
-            mouse_pos = pygame.mouse.get_pos()
-            
-            # Clear screen and draw background
-            screen.fill(UI_COLORS[Level.EASY]['background'])
-            
-            # Update and draw title
-            title.update()
-            title.draw(screen)
-            
-            # Draw menu items with hover effects
-            for hover_rect, text_rect, text_surface in [
-                (easy_hover_rect, easy_rect, easy_text),
-                (medium_hover_rect, medium_rect, medium_text),
-                (hard_hover_rect, hard_rect, hard_text)
-            ]:
-                if hover_rect.collidepoint(mouse_pos):
-                    # Draw hover effect
-                    for i in range(3):  # Create a subtle glow effect
-                        glow_rect = hover_rect.inflate(i*2, i*2)
-                        pygame.draw.rect(screen, menu_colors['hover_outline'], glow_rect, 2, border_radius=10)
-                screen.blit(text_surface, text_rect)
-            
-            pygame.display.update()
-            clock.tick(60)
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    if easy_hover_rect.collidepoint(mouse_pos):
-                        level = Level.EASY
-                    elif medium_hover_rect.collidepoint(mouse_pos):
-                        level = Level.MEDIUM
-                    elif hard_hover_rect.collidepoint(mouse_pos):
-                        level = Level.HARD
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        pygame.quit()
-                        sys.exit()
-                elif event.type == pygame.VIDEORESIZE:
-                    screen = resize_window(event.w, event.h, screen)
-                    title, easy_items, medium_items, hard_items, menu_colors = draw_menu(screen)
-                    easy_hover_rect, easy_rect, easy_text = easy_items
-                    medium_hover_rect, medium_rect, medium_text = medium_items
-                    hard_hover_rect, hard_rect, hard_text = hard_items
-
-        # Set speed based on level
-        if level == Level.EASY:
-            SNAKE_SPEED = SPEED_EASY
-        elif level == Level.MEDIUM:
-            SNAKE_SPEED = SPEED_MEDIUM
-        else:  # HARD
-            SNAKE_SPEED = SPEED_HARD
-
-        snake = Snake(level)
-        food = Food(level)
-        
-        # Create pause button
-        pause_button = Button(WINDOW_WIDTH - 100, 5, 90, 30, "Pause", level=level)
-        paused = False
-        return_to_menu = False
-
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        paused = not paused
-                        if paused:
-                            return_to_menu = show_pause_screen(screen, level)
-                    elif event.key == pygame.K_m and paused:
-                        return_to_menu = True
-                    elif not paused:
-                        if event.key == pygame.K_UP and snake.direction != (0, 1):
-                            snake.direction = (0, -1)
-                        elif event.key == pygame.K_DOWN and snake.direction != (0, -1):
-                            snake.direction = (0, 1)
-                        elif event.key == pygame.K_LEFT and snake.direction != (1, 0):
-                            snake.direction = (-1, 0)
-                        elif event.key == pygame.K_RIGHT and snake.direction != (-1, 0):
-                            snake.direction = (1, 0)
-                elif event.type == pygame.VIDEORESIZE:
-                    screen = resize_window(event.w, event.h, screen, snake, food, level, pause_button, paused)
-                
-                # Handle pause button events
-                if pause_button.handle_event(event):
-                    paused = not paused
-                    if paused:
-                        return_to_menu = show_pause_screen(screen, level)
-
-            if return_to_menu:
-                break
-
-            if not paused:
-                # Update snake
-                if not snake.update():
-                    if show_game_over(screen, snake.score, level):
-                        break
-
-                # Check if snake ate the food using the actual rendered rectangles
-                snake_head_rect = pygame.Rect(
-                    snake.positions[0][0] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2,
-                    snake.positions[0][1] * GRID_SIZE + (GRID_SIZE - SNAKE_SIZE) // 2,
-                    SNAKE_SIZE,
-                    SNAKE_SIZE
-                )
-
-                food_rect = food.get_collision_rect()
-                if snake_head_rect.colliderect(food_rect):
-                    snake.length += 1
-                    snake.score += 1
-                    food.randomize_position()
-
-                # Draw everything
-                screen.fill(UI_COLORS[level]['background'])
-                draw_ui_area(screen, snake.score, level, pause_button)
-                if level in [Level.MEDIUM, Level.HARD]:
-                    draw_boundaries(screen, level)
-                snake.render(screen)
-                food.render(screen)
-                pygame.display.update()
-
-            clock.tick(SNAKE_SPEED)
+
+    def on_resize(width, height):
+        resize_window(width, height, renderer)
+        # Overlays and outlines depend on the window size, so warm them up again
+        manager.warmup.add(warmup_tasks(renderer))
+
+    manager = SceneManager(renderer, on_resize=on_resize)
+    manager.warmup.add(warmup_tasks(renderer))
+    manager.push(MenuScene(manager))
+    manager.run(limit_frame_rate)
+    quit_game()
+
+def add_arena_arguments(parser):
+    # Arena options shared with the terminal version
+    parser.add_argument('--arena', metavar='NAME',
+                        help='play in an arena from the level pack, by name or number')
+    parser.add_argument('--level-pack', metavar='FILE', default=DEFAULT_PACK,
+                        help='level pack to take arenas from')
+    parser.add_argument('--generate', choices=STYLES,
+                        help='play in a procedurally generated arena of this style')
+    parser.add_argument('--seed', type=int,
+                        help='seed of the generated arena (default: random)')
+    parser.add_argument('--daily', action='store_true',
+                        help="play today's generated arena, the same for everybody")
+
+def apply_arena_arguments(parser, args):
+    global ARENA, GENERATED_ARENA
+    if args.arena and (args.generate or args.daily):
+        parser.error('--arena can not be combined with --generate or --daily')
+    if args.arena:
+        try:
+            ARENA = load_arena(args.arena, args.level_pack)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.daily:
+        seed = int(datetime.date.today().strftime('%Y%m%d'))
+        GENERATED_ARENA = (args.generate or STYLES[seed % len(STYLES)], seed)
+    elif args.generate:
+        seed = args.seed if args.seed is not None else random.randrange(1000000)
+        GENERATED_ARENA = (args.generate, seed)
+
+def print_scores(scores):
+    for mode in ('classic', 'arena'):
+        for level in Level:
+            top = scores.top(level.value, mode)
+            if not top:
+                continue
+            print(f'{mode.capitalize()} {level.name.lower()}')
+            for rank, (score, length, moves, played, replay) in enumerate(top, start=1):
+                when = datetime.datetime.fromtimestamp(played).strftime('%Y-%m-%d %H:%M')
+                print(f'{rank:4}  {score:6}  {when}  length {length}, {moves} moves')
+    print('Sessions')
+    for session, started, ended in scores.sessions():
+        if session == scores.session:
+            continue  # This one, just opened to print the scores
+        stats = scores.session_stats(session)
+        when = datetime.datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M')
+        print(f"      {when}  {stats['games']} games, best {stats['best']}, "
+              f"{stats['seconds'] / 60:.0f} minutes played")
+
+def parse_world_size(text):
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected WIDTHxHEIGHT, got {text!r}')
+    if width < 10 or height < 10:
+        raise argparse.ArgumentTypeError('the world must be at least 10x10 cells')
+    return (width, height)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Snake Ventures')
+    parser.add_argument('--renderer', choices=['auto', 'texture', 'software', 'null'], default='auto',
+                        help='texture uses the GPU when available, software draws on plain surfaces, '
+                             'null draws nothing and runs unthrottled')
+    parser.add_argument('--world', metavar='WIDTHxHEIGHT', type=parse_world_size,
+                        help='play on a large world of this many cells, e.g. 2000x2000, '
+                             'with the view following the snake')
+    add_arena_arguments(parser)
+    parser.add_argument('--list-arenas', action='store_true',
+                        help='print the arenas in the level pack and exit')
+    parser.add_argument('--scores', action='store_true',
+                        help='print the high scores and the latest sessions and exit')
+    parser.add_argument('--leaderboard', metavar='URL',
+                        help='send finished games to this central leaderboard as well, '
+                             'e.g. http://scores.example.com/v1')
+    parser.add_argument('--kiosk', metavar='NAME', help='name this machine goes by on the leaderboard '
+                                                        '(default: the host name)')
+    parser.add_argument('--battle', metavar='BOTS', type=int,
+                        help='battle royale against this many bots; --world sets the board size '
+                             '(default: grows with the number of bots)')
+    parser.add_argument('--spectate', metavar='[HOST:]PORT', nargs='?', const=str(DEFAULT_SPECTATE_PORT),
+                        help='stream the game to spectators (snake-ventures-watch) on this port, '
+                             f'by default {DEFAULT_SPECTATE_PORT} on this machine only')
+    parser.add_argument('--shared-board', metavar='NAME', nargs='?', const=DEFAULT_BOARD_NAME,
+                        help='keep the board in shared memory for screens on this machine '
+                             f'(snake-ventures-watch --shared), by default named {DEFAULT_BOARD_NAME}')
+    args = parser.parse_args()
+    if args.list_arenas:
+        try:
+            with LevelPack(args.level_pack) as pack:
+                names = pack.names()
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        for number, name in enumerate(names, start=1):
+            print(f'{number:4}  {name}')
+        sys.exit(0)
+    try:
+        SCORES = ScoreStore([level.value for level in Level])
+    except (sqlite3.Error, OSError) as e:
+        print(f'High scores are off: {e}')
+    if args.scores:
+        if SCORES is None:
+            sys.exit(1)
+        print_scores(SCORES)
+        SCORES.close()
+        sys.exit(0)
+    if args.leaderboard:
+        try:
+            LEADERBOARD = LeaderboardClient(args.leaderboard, args.kiosk)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.world and (args.arena or args.generate or args.daily):
+        parser.error('arenas can not be combined with --world')
+    if args.battle is not None:
+        if args.battle < 1:
+            parser.error('--battle needs at least one bot')
+        if args.arena or args.generate or args.daily:
+            parser.error('arenas can not be combined with --battle')
+        if battle.numpy is None:
+            parser.error('--battle needs NumPy (python3-numpy)')
+    BATTLE_BOTS = args.battle
+    if (args.spectate or args.shared_board) and (args.world or args.battle is not None):
+        parser.error('--spectate and --shared-board work with the normal board only')
+    if args.spectate:
+        host, _, port = args.spectate.rpartition(':')
+        try:
+            SPECTATORS.append(Broadcaster(host or '127.0.0.1', int(port)))
+        except (OSError, ValueError, OverflowError) as e:
+            parser.error(f'can not stream on {args.spectate}: {e}')
+    if args.shared_board:
+        try:
+            SPECTATORS.append(SharedBoard(args.shared_board))
+        except FileExistsError:
+            parser.error(f'shared memory {args.shared_board!r} is taken, another game may be using it')
+        except OSError as e:
+            parser.error(f'can not share the board: {e}')
+    apply_arena_arguments(parser, args)
+    WORLD_SIZE = args.world
+    renderer = create_renderer(WINDOW_WIDTH, WINDOW_HEIGHT, 'Snake Ventures', args.renderer)
+    try:
+        main(renderer)
+    finally:
+        for spectators in SPECTATORS:
+            spectators.close()
+        if SCORES:
+            SCORES.close()
+        if LEADERBOARD:
+            LEADERBOARD.close()
+        if renderer.name == 'null':
+            print(f'{renderer.frames} frames drawn: {renderer.report()}')
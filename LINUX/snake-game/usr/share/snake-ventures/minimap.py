@@ -0,0 +1,97 @@
+import pygame
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Only GridMinimap needs it, and only battle royale uses that
+    numpy = None
+
+# Minimap settings
+MINIMAP_SIZE = 200      # Longest side in pixels
+MINIMAP_MARGIN = 10     # Gap to the window edge and the UI bar
+
+class MinimapImage:
+    # Downsampled board image plus the view and head markers drawn over it
+    def __init__(self, board_width, board_height, background, max_size=MINIMAP_SIZE):
+        self.background = background
+        self.scale = max(1, -(-max(board_width, board_height) // max_size))  # Cells per pixel
+        self.width = -(-board_width // self.scale)
+        self.height = -(-board_height // self.scale)
+        self.surface = pygame.Surface((self.width, self.height))
+        self.surface.fill(background)
+        # Pixels changed since the renderer last picked them up; all of them
+        # at first, or a reused texture would still show the last game
+        self.dirty_rects = [self.surface.get_rect()]
+
+    def to_map(self, cell):
+        return (cell[0] // self.scale, cell[1] // self.scale)
+
+    def draw(self, renderer, topleft, view, head, head_color, frame_color):
+        # The occupancy image, the camera view and a marker on the head
+        renderer.dynamic_image('minimap', self.surface, topleft, self.dirty_rects)
+        self.dirty_rects.clear()
+        left, top = topleft
+        renderer.rect(frame_color, (left - 1, top - 1, self.width + 2, self.height + 2), 1)
+        x, y = self.to_map(view[0:2])
+        view_rect = pygame.Rect(left + x, top + y, max(1, view[2] // self.scale), max(1, view[3] // self.scale))
+        renderer.rect(frame_color, view_rect.clip((left, top, self.width, self.height)), 1)
+        x, y = self.to_map(head)
+        renderer.rect(head_color, (left + x - 1, top + y - 1, 3, 3))
+
+class Minimap(MinimapImage):
+    # Downsampled occupancy image of a ChunkedBoard. It listens to the board's
+    # cell changes and only repaints the pixel a change falls in, so the cost
+    # per tick doesn't depend on the snake length or the board size.
+    def __init__(self, board, colors, background, max_size=MINIMAP_SIZE):
+        # colors maps cell values to pixel colors, most important first: a
+        # pixel covering several cells shows the first value present
+        super().__init__(board.width, board.height, background, max_size)
+        self.colors = colors
+        # How many cells of each value every pixel covers
+        self.counts = {value: array('I', bytes(4 * self.width * self.height)) for value in colors}
+        for x, y, value in board.cells_in(0, 0, board.width, board.height):
+            self.on_change(x, y, 0, value)
+        board.listeners.append(self.on_change)
+
+    def on_change(self, x, y, old, new):
+        px = x // self.scale
+        py = y // self.scale
+        index = py * self.width + px
+        if old in self.counts:
+            self.counts[old][index] -= 1
+        if new in self.counts:
+            self.counts[new][index] += 1
+        color = self.background
+        for value, value_color in self.colors.items():
+            if self.counts[value][index]:
+                color = value_color
+                break
+        self.surface.set_at((px, py), color)
+        self.dirty_rects.append(pygame.Rect(px, py, 1, 1))
+
+class GridMinimap(MinimapImage):
+    # Minimap for boards kept in NumPy arrays, where a tick changes cells all
+    # over the board: the whole image is rebuilt from the arrays with a few
+    # array operations instead of following single cell changes
+    def __init__(self, board_width, board_height, background, max_size=MINIMAP_SIZE):
+        super().__init__(board_width, board_height, background, max_size)
+        self.board_size = (board_width, board_height)
+        self.pixels = numpy.zeros((self.width, self.height, 3), numpy.uint8)
+        # Scratch arrays reused every update: the board padded out to whole
+        # pixels (the padding stays False) and the pixels a layer lights
+        self.padded = numpy.zeros((self.height * self.scale, self.width * self.scale), bool)
+        self.lit = numpy.zeros((self.height, self.width), bool)
+
+    def update(self, layers):
+        # layers: (flat bool array over the board, color), most important last
+        width, height = self.board_size
+        scale = self.scale
+        padded = self.padded
+        blocks = padded.reshape(self.height, scale, self.width, scale)
+        self.pixels[...] = self.background
+        for cells, color in layers:
+            padded[:height, :width] = cells.reshape(height, width)
+            blocks.any(axis=(1, 3), out=self.lit)
+            self.pixels[self.lit.T] = color
+        pygame.surfarray.blit_array(self.surface, self.pixels)
+        self.dirty_rects = [self.surface.get_rect()]
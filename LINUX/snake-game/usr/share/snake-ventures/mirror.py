@@ -0,0 +1,54 @@
+from collections import deque
+
+from main import Level, POWER_UP_LIFETIME
+from items import FOOD_ITEM
+from protocol import ALIVE, ProtocolError
+
+class Mirror:
+    # A copy of a board kept up to date from a keyframe and then the deltas
+    # alone: a multiplayer room on a client, or a game on a spectator screen
+    def __init__(self):
+        self.tick = None
+
+    def load(self, state):
+        self.tick = state['tick']
+        self.seed = state['seed']
+        self.level = Level(state['level'])
+        self.width = state['width']
+        self.height = state['height']
+        self.now = state['now']
+        self.snakes = {snake['id']: dict(snake, cells=deque(snake['cells'])) for snake in state['snakes']}
+        self.items = {cell: (kind, expires) for cell, kind, expires in state['items']}
+
+    def apply(self, tick, moves, changes):
+        if self.tick is None or tick != self.tick + 1:
+            raise ProtocolError(f'tick {tick} does not follow {self.tick}')
+        self.tick = tick
+        self.now += 1  # Items age one step per tick
+        for id, flags, direction, head, removed, length, score in moves:
+            snake = self.snakes[id]
+            cells = snake['cells']
+            if flags & ALIVE:
+                cells.appendleft(head)
+                for _ in range(removed):
+                    cells.pop()
+            else:
+                snake['alive'] = False
+                cells.clear()
+            snake.update(direction=direction, length=length, score=score)
+        for cell, kind in changes:
+            if kind is None:
+                self.items.pop(cell, None)
+            else:
+                # Power-ups last a fixed number of ticks from when they turn up
+                self.items[cell] = (kind, None if kind == FOOD_ITEM else self.now + POWER_UP_LIFETIME)
+
+    def state(self):
+        # Same shape as Match.state(), to compare against the server
+        return dict(tick=self.tick, seed=self.seed, level=self.level.value, width=self.width,
+                    height=self.height, now=self.now,
+                    snakes=[dict(snake, cells=list(snake['cells'])) for _, snake in sorted(self.snakes.items())],
+                    items=sorted((cell, kind, expires) for cell, (kind, expires) in self.items.items()))
+
+    def to_cell(self, index):
+        return (index % self.width, index // self.width)
@@ -0,0 +1,195 @@
+import os
+import random
+
+# The game rules live in main.py; keep pygame quiet when importing them
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import main as game
+from main import Level, Snake, Items, use_item
+from items import SHRINK_ITEM, BONUS_ITEM
+from topology import DIRECTIONS, DIRECTION_INDEX
+from protocol import ALIVE
+
+# Multiplayer settings
+MAX_PLAYERS = 4
+NET_POWER_UPS = (SHRINK_ITEM, BONUS_ITEM)  # Speed boosts don't fit a fixed server tick
+TICK_SEED_STRIDE = 1 << 32
+
+def spawn_points(topology):
+    # One start per player, spread over the play area and heading inwards
+    left, top, right, bottom = topology.area
+    mid_x, mid_y = (left + right) // 2, (top + bottom) // 2
+    return [(((left + right * 3) // 4 - (right - left) // 2, mid_y), (1, 0)),
+            (((left + right * 3) // 4, mid_y), (-1, 0)),
+            ((mid_x, (top * 3 + bottom) // 4), (0, 1)),
+            ((mid_x, (top + bottom * 3) // 4), (0, -1))]
+
+class Match:
+    # One round of a multiplayer room: up to MAX_PLAYERS snakes on the normal
+    # board with the normal item rules, plus collisions between snakes. All
+    # randomness comes from an RNG reseeded from (seed, tick) every tick, so
+    # the same inputs always play out the same way on the server and on any
+    # client, and a copy of the state needs no RNG state. The board has a
+    # fixed size, whatever window a client shows it in.
+    def __init__(self, level, seed, players, width=None, height=None, tick=0):
+        self.level = level
+        self.seed = seed
+        self.tick = tick
+        self.width = width or game.GRID_WIDTH
+        self.height = height or game.GRID_HEIGHT
+        self.topology = game.build_level_topology(level, self.width, self.height, game.ARENA)
+        self.rng = random.Random(seed * TICK_SEED_STRIDE + tick)
+        self.snakes = {}  # Player id -> Snake; dead snakes stay with alive False
+        self.occupied = {}  # Cell -> snake segments on it, for collisions and item placement
+        spawns = spawn_points(self.topology)
+        for player in sorted(players):
+            snake = Snake(level)
+            snake.grid = (self.width, self.height)
+            start, snake.direction = spawns[player]
+            snake.positions = [start]
+            snake.alive = True
+            self.snakes[player] = snake
+            self.occupy(start)
+        self.items = Items(level, self.rng, (self.width, self.height))
+        self.items.power_ups = NET_POWER_UPS
+        self.items.map.changes = []
+        self.started_with = len(self.snakes)
+
+    def occupy(self, cell):
+        self.occupied[cell] = self.occupied.get(cell, 0) + 1
+
+    def vacate(self, cell):
+        count = self.occupied[cell] - 1
+        if count:
+            self.occupied[cell] = count
+        else:
+            del self.occupied[cell]
+
+    def alive(self):
+        return [player for player, snake in self.snakes.items() if snake.alive]
+
+    def over(self):
+        # Everybody is dead, or one is left of a round that started with more
+        alive = len(self.alive())
+        return alive == 0 or (alive == 1 and self.started_with > 1)
+
+    def cell_index(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def step(self, directions):
+        # One tick. directions: player id -> direction for the snakes that
+        # turn this tick; turns back into the body are ignored. Returns the
+        # per-snake moves and the item changes (see
+        # protocol.encode_delta_body); a snake that dies is cleared from the
+        # board in the same tick.
+        self.tick += 1
+        self.rng.seed(self.seed * TICK_SEED_STRIDE + self.tick)
+        items = self.items
+        removed = {}  # Player id -> tail cells that left the board this tick
+        crashed = []
+        # Everybody moves first, tails before heads, so snakes can chase each
+        # other's tails
+        for player in self.alive():
+            snake = self.snakes[player]
+            if player in directions and turn_allowed(snake, directions[player]):
+                snake.direction = directions[player]
+            old_length = len(snake.positions)
+            tail = snake.positions[-1]
+            if not snake.update():
+                crashed.append(player)
+                continue
+            removed[player] = 0
+            if len(snake.positions) == old_length:
+                self.vacate(tail)
+                removed[player] = 1
+        for player in removed:
+            self.occupy(self.snakes[player].positions[0])
+        # Running into another snake, or head to head, is as fatal as a wall
+        crashed += [player for player in removed if self.occupied[self.snakes[player].positions[0]] > 1]
+        for player in crashed:
+            snake = self.snakes[player]
+            snake.alive = False
+            for cell in snake.positions:
+                self.vacate(cell)
+            removed[player] = len(snake.positions)
+        # Survivors eat, in player order so ties always go the same way
+        for player in sorted(removed):
+            snake = self.snakes[player]
+            if not snake.alive:
+                continue
+            item = items.eat(snake, self.occupied)
+            if item is not None:
+                before = list(snake.positions)
+                use_item(snake, item)
+                for cell in before[len(snake.positions):]:
+                    self.vacate(cell)
+                    removed[player] += 1
+        items.update(None, self.occupied)
+
+        moves = []
+        for player in sorted(removed):
+            snake = self.snakes[player]
+            head = self.cell_index(snake.positions[0]) if snake.alive else 0
+            moves.append((player, ALIVE if snake.alive else 0, DIRECTION_INDEX[snake.direction], head,
+                          removed[player], snake.length, snake.score))
+        changes = [(self.cell_index(cell), kind) for cell, kind in items.map.changes]
+        items.map.changes.clear()
+        return moves, changes
+
+    def snapshot(self):
+        # Compact copy of the match to roll back to: tuples only, and no RNG
+        # state since the RNG is reseeded every tick
+        snakes = tuple((player, tuple(snake.positions), snake.direction, snake.length, snake.score,
+                        snake.boost, snake.alive) for player, snake in self.snakes.items())
+        items = tuple((item.kind, item.cell, item.expires) for item in self.items.map.values())
+        return (self.tick, snakes, items, self.items.now)
+
+    def restore(self, snapshot):
+        # Back to a snapshot of this match (or of one with the same players)
+        self.tick, snakes, items, self.items.now = snapshot
+        self.occupied = {}
+        for player, positions, direction, length, score, boost, alive in snakes:
+            snake = self.snakes[player]
+            snake.positions = list(positions)
+            snake.direction = direction
+            snake.length = length
+            snake.score = score
+            snake.boost = boost
+            snake.alive = alive
+            if alive:
+                for cell in positions:
+                    self.occupy(cell)
+        self.items.map.clear()
+        for kind, cell, expires in items:
+            self.items.map.add(kind, cell, expires)
+        self.items.map.changes.clear()
+
+    @classmethod
+    def from_state(cls, state):
+        # The match a keyframe describes
+        match = cls(Level(state['level']), state['seed'], [snake['id'] for snake in state['snakes']],
+                    state['width'], state['height'])
+        to_cell = match.to_cell
+        snakes = tuple((snake['id'], tuple(to_cell(cell) for cell in snake['cells']), DIRECTIONS[snake['direction']],
+                        snake['length'], snake['score'], snake['boost'], snake['alive'])
+                       for snake in state['snakes'])
+        items = tuple((kind, to_cell(cell), expires) for cell, kind, expires in state['items'])
+        match.restore((state['tick'], snakes, items, state['now']))
+        return match
+
+    def to_cell(self, index):
+        return (index % self.width, index // self.width)
+
+    def state(self):
+        # Everything a client needs to take over the match, as plain values
+        return dict(tick=self.tick, seed=self.seed, level=self.level.value,
+                    width=self.width, height=self.height, now=self.items.now,
+                    snakes=[dict(id=player, alive=snake.alive, direction=DIRECTION_INDEX[snake.direction],
+                                 length=snake.length, score=snake.score, boost=snake.boost,
+                                 cells=[self.cell_index(cell) for cell in snake.positions] if snake.alive else [])
+                            for player, snake in sorted(self.snakes.items())],
+                    items=sorted((self.cell_index(item.cell), item.kind, item.expires)
+                                 for item in self.items.map.values()))
+
+def turn_allowed(snake, direction):
+    # Same rule as the window: no reversing into the body
+    return direction != (-snake.direction[0], -snake.direction[1])
@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+# Bots need no window; the rules come from main.py, which starts pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+import main as game
+from main import Level
+from mirror import Mirror
+from topology import DIRECTIONS, DIRECTION_INDEX
+from protocol import (MSG_KEYFRAME, MSG_DELTA, MSG_ERROR, MSG_TURN, MSG_PONG, TURN, PING, SPECTATOR,
+                      ProtocolError, LinkWriter, read_frame, encode_join, encode_input, encode_ping,
+                      decode_keyframe, decode_delta)
+from server import Server, DEFAULT_PORT, TICK_RATE
+from prediction import Predictor
+
+# Load test settings
+CONNECT_BATCH = 50      # Connections opened at a time
+SETTLE_TIME = 0.5       # Seconds for the last frames to arrive before checking
+PING_INTERVAL = 1.0     # Seconds between pings, which keep the round trip estimate fresh
+FRAME_TIME = 1 / 60     # Seconds between predictions with --predict, like a frame of the game
+
+class Client:
+    # One connection to a room. With bot set it plays by itself: towards the
+    # nearest food, never straight into a snake or a wall. With predict set
+    # it also predicts the game ahead of the server like a player's window
+    # would, and the bot plays on what it predicted.
+    def __init__(self, level, room, latency=0.0, jitter=0.0, bot=False, seed=None, predict=False):
+        self.level = level
+        self.room = room
+        self.latency = latency
+        self.jitter = jitter
+        self.bot = bot
+        self.rng = random.Random(seed)
+        self.mirror = Mirror()
+        self.predictor = Predictor(1 / TICK_RATE) if predict else None
+        self.you = SPECTATOR
+        self.ack = 0
+        self.received = 0  # Payload bytes and deltas, for the load test
+        self.deltas = 0
+        self.error = None
+
+    async def connect(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        self.reader = reader
+        self.link = LinkWriter(writer, self.latency, self.jitter, random.Random(self.rng.random()))
+        self.link.send(encode_join(self.level.value, self.room))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(self.ping())]
+        if self.predictor:
+            tasks.append(asyncio.create_task(self.predict()))
+        try:
+            while True:
+                payload = await read_frame(self.reader)
+                self.received += len(payload)
+                if payload[0] == MSG_DELTA:
+                    tick, self.ack, moves, changes = decode_delta(payload)
+                    self.mirror.apply(tick, moves, changes)
+                    self.deltas += 1
+                    if self.predictor:
+                        self.predictor.on_delta(tick, moves, changes, loop.time())
+                    elif self.bot:
+                        self.play()
+                elif payload[0] == MSG_TURN and len(payload) == TURN.size:
+                    _, player, tick, direction = TURN.unpack(payload)
+                    if self.predictor:
+                        self.predictor.on_turn(player, tick, DIRECTIONS[direction])
+                elif payload[0] == MSG_PONG and len(payload) == PING.size:
+                    sent = PING.unpack(payload)[1]
+                    if self.predictor:
+                        self.predictor.on_pong(((int(loop.time() * 1000) - sent) & 0xFFFFFFFF) / 1000)
+                elif payload[0] == MSG_KEYFRAME:
+                    state, self.you = decode_keyframe(payload)
+                    self.mirror.load(state)
+                    if self.predictor:
+                        self.predictor.load(state, self.you)
+                elif payload[0] == MSG_ERROR:
+                    raise ProtocolError(payload[1:].decode(errors='replace'))
+                else:
+                    raise ProtocolError(f'unknown message {payload[0]}')
+        except ProtocolError as e:
+            self.error = str(e)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.link.close()
+
+    async def ping(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.link.send(encode_ping(int(loop.time() * 1000)))
+            await asyncio.sleep(PING_INTERVAL)
+
+    async def predict(self):
+        # What a player's window does every frame
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.predictor.update(loop.time()) and self.bot:
+                self.play_predicted()
+            await asyncio.sleep(FRAME_TIME)
+
+    def turn(self, direction):
+        # Without prediction the turn is meant for the next tick the server plays
+        if self.predictor:
+            tick = self.predictor.turn(direction)
+            if tick is None:
+                return
+        else:
+            tick = self.mirror.tick + 1
+        self.link.send(encode_input(tick, DIRECTION_INDEX[direction]))
+
+    def play(self):
+        mirror = self.mirror
+        snake = mirror.snakes.get(self.you)
+        if snake is None or not snake['alive']:
+            return
+        topology = game.build_level_topology(mirror.level, mirror.width, mirror.height, game.ARENA)
+        taken = {index for other in mirror.snakes.values() for index in other['cells']}
+        head = mirror.to_cell(snake['cells'][0])
+        food = [mirror.to_cell(cell) for cell in mirror.items]
+        self.steer(topology, head, DIRECTIONS[snake['direction']], lambda cell: topology.index(cell) in taken, food)
+
+    def play_predicted(self):
+        match = self.predictor.predicted
+        snake = match.snakes.get(self.you)
+        if snake is None or not snake.alive or match.over():
+            return
+        food = [item.cell for item in match.items.map.values()]
+        self.steer(match.topology, snake.positions[0], snake.direction, match.occupied.__contains__, food)
+
+    def steer(self, topology, head, current, taken, food):
+        food = food or [head]
+
+        def score(direction):
+            new = topology.move(head, direction)
+            if new is None or taken(new):
+                return (1, 0, 0)
+            distance = min(abs(x - new[0]) + abs(y - new[1]) for x, y in food)
+            return (0, distance, self.rng.random())
+
+        options = [d for d in DIRECTIONS if d != (-current[0], -current[1])]
+        best = min(options, key=score)
+        if best != current:
+            self.turn(best)
+
+async def load_test(args):
+    # Fills rooms with bot clients and reports what the server and the link
+    # cost. With --local the server runs in this process, so at the end every
+    # client's copy of its room is checked against the server's own.
+    server = None
+    host, port = args.host, args.port
+    if args.local:
+        server = Server(latency=args.lag / 1000, jitter=args.jitter / 1000, seed=args.seed)
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        host, port = '127.0.0.1', listener.sockets[0].getsockname()[1]
+        ticking = asyncio.create_task(server.run())
+
+    rng = random.Random(args.seed)
+    clients = [Client(Level(1 + room % 3), room, args.lag / 1000, args.jitter / 1000, bot=True,
+                      seed=rng.random(), predict=args.predict)
+               for room in range(args.rooms) for _ in range(args.players)]
+    for start in range(0, len(clients), CONNECT_BATCH):
+        await asyncio.gather(*(client.connect(host, port) for client in clients[start:start + CONNECT_BATCH]))
+    tasks = [asyncio.create_task(client.run()) for client in clients]
+    started = time.perf_counter()
+    deltas_before = sum(client.deltas for client in clients)
+    await asyncio.sleep(args.seconds)
+    elapsed = time.perf_counter() - started
+    rate = (sum(client.deltas for client in clients) - deltas_before) / len(clients) / elapsed
+
+    mismatches = 0
+    if server:
+        server.stop()
+        await ticking
+        await asyncio.sleep(SETTLE_TIME + (args.lag + args.jitter) / 1000)
+        for client in clients:
+            room = server.rooms.get((client.level, client.room))
+            if room is None or client.mirror.tick is None or client.mirror.state() != room.match.state():
+                mismatches += 1
+            elif client.predictor and client.predictor.confirmed.state() != room.match.state():
+                mismatches += 1
+        print(f'Server: {server.report()}')
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if server:
+        # Let the server see every client go before the loop shuts down
+        await asyncio.sleep(SETTLE_TIME + (args.lag + args.jitter) / 1000)
+        listener.close()
+
+    deltas = sum(client.deltas for client in clients)
+    received = sum(client.received for client in clients)
+    errors = [client.error for client in clients if client.error]
+    print(f'Clients: {len(clients)} in {args.rooms} rooms, {rate:.1f} deltas per second, '
+          f'{received / max(1, deltas):.0f} bytes per delta on average')
+    if args.predict:
+        predictors = [client.predictor for client in clients]
+        rollbacks = sum(predictor.rollbacks for predictor in predictors)
+        resimulated = sum(predictor.resimulated for predictor in predictors)
+        corrections = sum(predictor.corrections for predictor in predictors)
+        print(f'Prediction: {rollbacks} rollbacks, {resimulated / max(1, rollbacks):.1f} ticks played again '
+              f'on average, {corrections} moved the own snake')
+    if errors:
+        print(f'{len(errors)} clients failed, e.g.: {errors[0]}')
+    if server:
+        print(f'{mismatches} clients out of sync with the server')
+    return 1 if errors or mismatches else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures multiplayer load test: bot clients over loopback')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--local', action='store_true',
+                        help='run the server in this process and check every client against it at the end')
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--players', type=int, default=2, choices=range(1, 5), metavar='1-4',
+                        help='bots per room')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--lag', type=float, default=0, metavar='MS',
+                        help='hold back everything sent by this long (both ways with --local)')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS',
+                        help='vary the lag by up to this much either way')
+    parser.add_argument('--predict', action='store_true',
+                        help='predict ahead of the server like the game window and let the bots play on that')
+    parser.add_argument('--seed', type=int)
+    sys.exit(asyncio.run(load_test(parser.parse_args())))
@@ -0,0 +1,224 @@
+import sys
+import random
+import asyncio
+import argparse
+import threading
+
+import main as game
+from main import (Level, Snake, GameScene, BOT_COLORS, EAT_BURST, DEATH_BURST, UI_COLORS, burst,
+                  lighten, draw_ui_area, draw_boundaries)
+from scenes import SceneManager
+from renderer import create_renderer
+from topology import DIRECTIONS, DIRECTION_INDEX
+from protocol import (MSG_KEYFRAME, MSG_DELTA, MSG_ERROR, MSG_TURN, MSG_PONG, TURN, PING, ProtocolError,
+                      LinkWriter, read_frame, encode_join, encode_input, encode_ping, decode_keyframe, decode_delta)
+from prediction import Predictor
+from server import DEFAULT_PORT, TICK_RATE
+
+# Online play settings
+CONNECT_TIMEOUT = 5.0   # Seconds to wait for the server's first keyframe
+PING_INTERVAL = 1.0     # Seconds between pings, which keep the round trip estimate fresh
+
+class Connection:
+    # The link to the server. It runs an asyncio loop on a thread of its
+    # own, so the window's frame loop never waits for the network; the
+    # predictor is shared between the two under lock.
+    def __init__(self, host, port, level, room, latency=0.0, jitter=0.0):
+        self.host = host
+        self.port = port
+        self.level = level
+        self.room = room
+        self.latency = latency
+        self.jitter = jitter
+        self.predictor = Predictor(1 / TICK_RATE)
+        self.lock = threading.Lock()
+        self.ready = threading.Event()  # Set on the first keyframe, or on failing before it
+        self.error = None
+        self.link = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.run(),), daemon=True)
+
+    def start(self):
+        self.thread.start()
+        if not self.ready.wait(CONNECT_TIMEOUT):
+            self.error = 'no answer from the server'
+        return self.error is None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        predictor = self.predictor
+        pinging = None
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self.link = LinkWriter(writer, self.latency, self.jitter, random.Random())
+            self.link.send(encode_join(self.level.value, self.room))
+            pinging = asyncio.create_task(self.ping())
+            while True:
+                payload = await read_frame(reader)
+                with self.lock:
+                    if payload[0] == MSG_DELTA:
+                        tick, _, moves, changes = decode_delta(payload)
+                        predictor.on_delta(tick, moves, changes, loop.time())
+                    elif payload[0] == MSG_TURN and len(payload) == TURN.size:
+                        _, player, tick, direction = TURN.unpack(payload)
+                        predictor.on_turn(player, tick, DIRECTIONS[direction])
+                    elif payload[0] == MSG_PONG and len(payload) == PING.size:
+                        sent = PING.unpack(payload)[1]
+                        predictor.on_pong(((int(loop.time() * 1000) - sent) & 0xFFFFFFFF) / 1000)
+                    elif payload[0] == MSG_KEYFRAME:
+                        predictor.load(*decode_keyframe(payload))
+                        self.ready.set()
+                    elif payload[0] == MSG_ERROR:
+                        raise ProtocolError(payload[1:].decode(errors='replace'))
+                    else:
+                        raise ProtocolError(f'unknown message {payload[0]}')
+        except ProtocolError as e:
+            self.error = str(e)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.error = f'connection lost: {e}' if self.ready.is_set() else f'can not connect: {e}'
+        finally:
+            if pinging:
+                pinging.cancel()
+            if self.link:
+                self.link.close()
+            self.ready.set()
+
+    async def ping(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.link.send(encode_ping(int(loop.time() * 1000)))
+            await asyncio.sleep(PING_INTERVAL)
+
+    def now(self):
+        # The network thread's clock, which the predictor's samples are on
+        return self.loop.time()
+
+    def turn(self, direction):
+        # Called under lock from the window
+        tick = self.predictor.turn(direction)
+        if tick is not None:
+            self.loop.call_soon_threadsafe(self.link.send, encode_input(tick, DIRECTION_INDEX[direction]))
+
+class OnlineScene(GameScene):
+    # A multiplayer room in the game window. What is shown is the predicted
+    # match, so the player's own turns show up on the next tick with no wait
+    # for the server; the other snakes get their turns a round trip late and
+    # are put right by the predictor's rollbacks.
+    mode = 'online'  # Scores stay on the server
+
+    def __init__(self, manager, level, connection):
+        self.connection = connection
+        self.match = None  # The predicted match shown, replaced every round
+        self.dead = False
+        self.score = 0  # Own score last frame, for the eat bursts
+        super().__init__(manager, level)
+
+    def new_board(self):
+        # The scene's own snake only stands in until the first predicted tick
+        return Snake(self.level), None
+
+    def particle_colors(self):
+        return super().particle_colors() + BOT_COLORS
+
+    def on_focus_lost(self):
+        pass  # The game goes on on the server anyway
+
+    def turn(self, direction):
+        with self.connection.lock:
+            self.connection.turn(direction)
+
+    def update_label(self):
+        text = f'Score: {self.snake.score}'
+        if self.dead or self.match.over():
+            text += '  Waiting for the next round'
+        self.score_label.set_text(text)
+
+    def update(self, dt):
+        self.update_particles(dt)
+        connection = self.connection
+        if connection.error:
+            self.manager.quit()
+            return
+        with connection.lock:
+            predictor = connection.predictor
+            steps = predictor.update(connection.now())
+            if predictor.predicted is not self.match:
+                # A new round
+                self.match = predictor.predicted
+                self.dead = False
+                self.score = 0
+                steps = 1
+            if not steps:
+                return
+            snake = self.match.snakes.get(predictor.you)
+            if snake is not None:
+                if snake.score > self.score and snake.alive:
+                    burst(self.particles, snake.get_head_position(), snake.head_color, EAT_BURST)
+                self.snake, self.score = snake, snake.score
+            # Only a death the server confirmed gets the burst; a predicted
+            # one may still be rolled back
+            confirmed = predictor.confirmed.snakes.get(predictor.you)
+            if confirmed is not None and not confirmed.alive and not self.dead:
+                self.dead = True
+                if self.snake.positions:  # A keyframe of a dead snake has none
+                    head = self.snake.get_head_position()
+                    burst(self.particles, head, self.snake.head_color, DEATH_BURST)
+                    burst(self.particles, head, self.snake.body_color, DEATH_BURST)
+            self.update_label()
+        self.dirty = True
+
+    def draw(self, renderer):
+        renderer.clear(UI_COLORS[self.level]['background'])
+        draw_ui_area(renderer, self.level, self.score_label, self.level_label, self.pause_button)
+        if self.level in [Level.MEDIUM, Level.HARD]:
+            draw_boundaries(renderer, self.level)
+        with self.connection.lock:
+            match = self.match
+            if match is not None:
+                for player, snake in match.snakes.items():
+                    if not snake.alive:
+                        continue
+                    if player == self.connection.predictor.you:
+                        snake.render(renderer)
+                        continue
+                    body = BOT_COLORS[player % len(BOT_COLORS)]
+                    for index in range(len(snake.positions)):
+                        renderer.rect(lighten(body) if index == 0 else body, snake.get_rect(index))
+                match.items.render(renderer)
+        self.particles.draw(renderer)
+
+def play(renderer, connection):
+    # Like main.main, straight into the room instead of the menu
+    def on_resize(width, height):
+        game.resize_window(width, height, renderer)
+        manager.warmup.add(game.warmup_tasks(renderer))
+
+    manager = SceneManager(renderer, on_resize=on_resize)
+    manager.warmup.add(game.warmup_tasks(renderer))
+    manager.push(OnlineScene(manager, connection.predictor.confirmed.level, connection))
+    manager.run(game.limit_frame_rate)
+
+if __name__ == "__main__":
+    levels = {level.name.lower(): level for level in Level}
+    parser = argparse.ArgumentParser(description='Snake Ventures online: join a room on a multiplayer server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--room', type=int, default=0, help='room number; players in the same room share a board')
+    parser.add_argument('--level', choices=list(levels), default='easy')
+    parser.add_argument('--renderer', choices=['auto', 'texture', 'software', 'null'], default='auto')
+    parser.add_argument('--lag', type=float, default=0, metavar='MS',
+                        help='hold back everything sent by this long, to try out bad links')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS',
+                        help='vary the lag by up to this much either way')
+    args = parser.parse_args()
+    if not 0 <= args.room <= 0xFFFF:
+        parser.error('--room must be between 0 and 65535')
+    connection = Connection(args.host, args.port, levels[args.level], args.room,
+                            args.lag / 1000, args.jitter / 1000)
+    if not connection.start():
+        sys.exit(f'Snake Ventures online: {connection.error}')
+    renderer = create_renderer(game.WINDOW_WIDTH, game.WINDOW_HEIGHT, 'Snake Ventures', args.renderer)
+    play(renderer, connection)
+    if connection.error:
+        print(f'Snake Ventures online: {connection.error}')
+    game.quit_game()
@@ -0,0 +1,130 @@
+import math
+import pygame
+
+try:
+    import numpy
+except ImportError:  # Particle effects are simply left out without NumPy
+    numpy = None
+
+# Particle settings
+MAX_PARTICLES = 4096   # Preallocated once; bursts beyond this are cut short
+PARTICLE_SIZE = 8      # Sprite size in pixels
+FADE_STEPS = 8         # Pre-rendered alpha levels per color
+DRAG = 2.0             # Share of velocity lost per second
+GRAVITY = 120.0        # Pixels per second squared, pulls bursts down a little
+
+def make_particle_sheet(palette, size=PARTICLE_SIZE, fade_steps=FADE_STEPS):
+    # One row of soft dots: every palette color at every fade level, so a whole
+    # frame of particles is drawn from a single image
+    sheet = pygame.Surface((size * len(palette) * fade_steps, size), pygame.SRCALPHA)
+    radius = size / 2
+    for c, color in enumerate(palette):
+        for step in range(fade_steps):
+            strength = (step + 1) / fade_steps
+            x = (c * fade_steps + step) * size
+            for r in range(int(radius), 0, -1):
+                # Brighter towards the middle
+                alpha = int(255 * strength * (1 - (r - 1) / radius) ** 0.5)
+                pygame.draw.circle(sheet, (*color[0:3], alpha), (x + radius, radius), r)
+    return sheet
+
+class ParticleSystem:
+    # Fixed pool of particles kept in parallel NumPy arrays. Free slots sit on a
+    # stack, so emitting and expiring never allocate per particle, and a frame
+    # updates every particle with a handful of array operations.
+    def __init__(self, palette, capacity=MAX_PARTICLES):
+        self.palette = [tuple(color[0:3]) for color in palette]
+        self.palette_index = {color: i for i, color in enumerate(self.palette)}
+        self.capacity = capacity
+        self.count = 0
+        self.enabled = numpy is not None
+        if not self.enabled:
+            return
+        self.rng = numpy.random.default_rng()
+        self.x = numpy.zeros(capacity, numpy.float32)
+        self.y = numpy.zeros(capacity, numpy.float32)
+        self.vx = numpy.zeros(capacity, numpy.float32)
+        self.vy = numpy.zeros(capacity, numpy.float32)
+        self.life = numpy.zeros(capacity, numpy.float32)
+        self.max_life = numpy.ones(capacity, numpy.float32)
+        self.first_frame = numpy.zeros(capacity, numpy.int32)  # Sheet frame of the particle's color
+        self.alive = numpy.zeros(capacity, bool)
+        self.free = numpy.arange(capacity - 1, -1, -1, dtype=numpy.int32)
+        self.free_count = capacity
+        # Scratch buffers reused every frame
+        self.scratch = numpy.zeros(capacity, numpy.float32)
+        self.expired = numpy.zeros(capacity, bool)
+        self.frame = numpy.zeros(capacity, numpy.int32)
+        self.sheet_key = ('particles', PARTICLE_SIZE, FADE_STEPS) + tuple(self.palette)
+
+    def emit(self, center, color, count, speed=200.0, life=0.8):
+        # Burst of particles flying out of center in every direction
+        if not self.enabled:
+            return
+        count = min(count, self.free_count)
+        if count <= 0:
+            return
+        self.free_count -= count
+        slots = self.free[self.free_count:self.free_count + count]
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        velocity = self.rng.uniform(0.2, 1.0, count) * speed
+        self.x[slots] = center[0]
+        self.y[slots] = center[1]
+        self.vx[slots] = numpy.cos(angle) * velocity
+        self.vy[slots] = numpy.sin(angle) * velocity
+        lifetimes = self.rng.uniform(0.5, 1.0, count) * life
+        self.life[slots] = lifetimes
+        self.max_life[slots] = lifetimes
+        self.first_frame[slots] = self.palette_index[tuple(color[0:3])] * FADE_STEPS
+        self.alive[slots] = True
+        self.count += count
+
+    def clear(self):
+        if not self.enabled:
+            return
+        self.alive[:] = False
+        self.free[:] = numpy.arange(self.capacity - 1, -1, -1, dtype=numpy.int32)
+        self.free_count = self.capacity
+        self.count = 0
+
+    def update(self, dt):
+        # dt in seconds. Dead slots are moved along too; that's cheaper than
+        # selecting the live ones and they are never drawn.
+        if not self.enabled or not self.count:
+            return
+        numpy.multiply(self.vx, dt, out=self.scratch)
+        self.x += self.scratch
+        numpy.multiply(self.vy, dt, out=self.scratch)
+        self.y += self.scratch
+        damping = max(0.0, 1 - DRAG * dt)
+        self.vx *= damping
+        self.vy *= damping
+        self.vy += GRAVITY * dt
+        self.life -= dt
+
+        numpy.less_equal(self.life, 0, out=self.expired)
+        self.expired &= self.alive
+        if self.expired.any():
+            slots = numpy.flatnonzero(self.expired)
+            self.alive[slots] = False
+            self.free[self.free_count:self.free_count + len(slots)] = slots
+            self.free_count += len(slots)
+            self.count -= len(slots)
+
+    def draw(self, renderer, offset=(0, 0)):
+        # offset is subtracted from particle positions, e.g. a camera position
+        if not self.enabled or not self.count:
+            return
+        slots = numpy.flatnonzero(self.alive)
+        # Sprite frame = the color's first frame plus how much life is left
+        numpy.divide(self.life, self.max_life, out=self.scratch)
+        self.scratch *= FADE_STEPS
+        numpy.clip(self.scratch, 0, FADE_STEPS - 1, out=self.scratch)
+        self.frame[:] = self.scratch
+        self.frame += self.first_frame
+        left = offset[0] + PARTICLE_SIZE // 2
+        top = offset[1] + PARTICLE_SIZE // 2
+        renderer.sprite_batch(self.sheet_key, lambda: make_particle_sheet(self.palette), PARTICLE_SIZE,
+                              self.frame[slots].tolist(),
+                              zip((self.x[slots] - left).astype(numpy.int32).tolist(),
+                                  (self.y[slots] - top).astype(numpy.int32).tolist()))
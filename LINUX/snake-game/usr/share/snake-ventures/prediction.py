@@ -0,0 +1,164 @@
+import math
+from collections import deque
+
+from multiplayer import Match
+from topology import DIRECTIONS
+from protocol import ProtocolError
+
+# Prediction settings
+MAX_PREDICTION = 10     # Ticks the client may run ahead of the last confirmed one
+CLOCK_WINDOW = 20       # Deltas the server clock estimate looks back over
+PING_WINDOW = 5         # Round trips the lead over the server is worked out from
+LEAD_MARGIN = 1         # Extra ticks for a turn to reach the server in time
+
+class Predictor:
+    # Client-side prediction with rollback. Two copies of the match are kept:
+    # confirmed follows the server's deltas tick by tick, predicted runs
+    # ahead of it by about one round trip. The player's own turns go into
+    # predicted at once and, being meant for a tick the server hasn't played
+    # yet, come true there too, so there is neither input delay nor a
+    # correction afterwards. Other players keep going straight until their
+    # turns come in; a turn for a tick that was already predicted rolls
+    # predicted back to a snapshot of confirmed and plays it forward again.
+    def __init__(self, interval):
+        self.interval = interval  # Seconds per server tick
+        self.you = None
+        self.confirmed = self.predicted = None
+        self.clock = deque(maxlen=CLOCK_WINDOW)  # Server tick minus local clock, per delta
+        self.round_trips = deque(maxlen=PING_WINDOW)
+        # Counters for the load test
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.corrections = 0  # Rollbacks that moved the player's own snake
+
+    def load(self, state, you):
+        # A keyframe: a new round or a first look at one. Ticks keep counting
+        # across rounds, so the clock estimate carries on.
+        self.you = you
+        self.confirmed = Match.from_state(state)
+        self.predicted = Match.from_state(state)
+        self.turns = {}  # Tick -> {player: direction} for the ticks not confirmed yet
+        self.pending = deque()  # (tick, direction) of own turns the server hasn't placed yet
+        self.played = {}  # Tick -> directions of every snake after predicting it
+        self.stale_from = None  # First predicted tick whose turns changed afterwards
+
+    def directions(self, match):
+        return tuple(snake.direction for snake in match.snakes.values())
+
+    def turn(self, direction):
+        # A turn of the player's own snake: predicted at the next tick that
+        # doesn't have one yet. Returns that tick, to tell the server, or
+        # None when the turn changes nothing.
+        if self.predicted is None:
+            return None
+        snake = self.predicted.snakes.get(self.you)
+        if snake is None or not snake.alive or self.predicted.over():
+            return None
+        tick = self.predicted.tick + 1
+        current = snake.direction
+        if self.pending and self.pending[-1][0] >= tick:
+            tick, current = self.pending[-1][0] + 1, self.pending[-1][1]
+        if direction in (current, (-current[0], -current[1])):
+            return None
+        self.pending.append((tick, direction))
+        self.turns.setdefault(tick, {})[self.you] = direction
+        return tick
+
+    def on_turn(self, player, tick, direction):
+        # The server placed a turn at tick (own turns come back this way too)
+        if self.confirmed is None:
+            return
+        if player == self.you:
+            # Own turns come back in order; ones the server dropped never do
+            while self.pending:
+                sent, sent_direction = self.pending.popleft()
+                if sent_direction == direction and sent <= tick:
+                    break
+                self.unschedule(sent)
+            else:
+                return  # Not one of ours any more, e.g. from before a keyframe
+            if sent == tick:
+                return  # Predicted right
+            self.unschedule(sent)
+        if tick <= self.confirmed.tick:
+            raise ProtocolError(f'turn for tick {tick}, already confirmed {self.confirmed.tick}')
+        self.turns.setdefault(tick, {})[player] = direction
+        if tick <= self.predicted.tick:
+            self.mark_stale(tick)
+
+    def unschedule(self, tick):
+        turns = self.turns.get(tick)
+        if turns and turns.pop(self.you, None) is not None and tick <= self.predicted.tick:
+            self.mark_stale(tick)
+
+    def mark_stale(self, tick):
+        if self.stale_from is None or tick < self.stale_from:
+            self.stale_from = tick
+
+    def on_delta(self, tick, moves, changes, now):
+        # Confirms one more tick. The server's moves carry every snake's
+        # direction, so confirmed replays exactly what the server did and
+        # checks the outcome against it.
+        confirmed = self.confirmed
+        if confirmed is None:
+            raise ProtocolError('delta before any keyframe')
+        if tick != confirmed.tick + 1:
+            raise ProtocolError(f'tick {tick} does not follow {confirmed.tick}')
+        self.clock.append(tick - now / self.interval)
+        directions = {move[0]: DIRECTIONS[move[2]] for move in moves}
+        self.turns.pop(tick, None)
+        if list(confirmed.step(directions)) != [[tuple(move) for move in moves], changes]:
+            raise ProtocolError(f'out of sync with the server at tick {tick}')
+        if self.played.pop(tick, None) != self.directions(confirmed):
+            self.mark_stale(tick)
+        if self.predicted.tick <= tick:
+            self.predicted.restore(confirmed.snapshot())
+            self.played.clear()
+            self.stale_from = None
+        elif self.stale_from is not None:
+            self.rollback()
+
+    def rollback(self):
+        # Replays the predicted ticks from the confirmed state with the turns
+        # known now
+        predicted = self.predicted
+        target = predicted.tick
+        before = tuple(predicted.snakes[self.you].positions) if self.you in predicted.snakes else None
+        predicted.restore(self.confirmed.snapshot())
+        self.played.clear()
+        self.stale_from = None
+        while predicted.tick < target:
+            self.advance()
+        self.rollbacks += 1
+        self.resimulated += target - self.confirmed.tick
+        if before is not None and tuple(predicted.snakes[self.you].positions) != before:
+            self.corrections += 1
+
+    def advance(self):
+        predicted = self.predicted
+        tick = predicted.tick + 1
+        predicted.step(self.turns.get(tick, {}))
+        self.played[tick] = self.directions(predicted)
+
+    def on_pong(self, round_trip):
+        self.round_trips.append(round_trip)
+
+    def target_tick(self, now):
+        # Tick the server will be at when a turn sent now gets there
+        if not self.clock:
+            return self.confirmed.tick
+        server_tick = now / self.interval + max(self.clock)  # The least delayed delta is closest
+        lead = max(self.round_trips, default=0) / self.interval + LEAD_MARGIN
+        return math.floor(server_tick + lead)
+
+    def update(self, now):
+        # Predicts up to where the local clock says the game is; returns the
+        # number of ticks played
+        if self.predicted is None:
+            return 0
+        target = min(self.target_tick(now), self.confirmed.tick + MAX_PREDICTION)
+        steps = 0
+        while self.predicted.tick < target and not self.predicted.over():
+            self.advance()
+            steps += 1
+        return steps
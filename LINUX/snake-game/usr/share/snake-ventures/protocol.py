@@ -0,0 +1,187 @@
+import asyncio
+import random
+import struct
+from collections import deque
+
+from items import FOOD_ITEM, SPEED_ITEM, SHRINK_ITEM, BONUS_ITEM
+
+# Binary protocol between the multiplayer server and its clients. Every
+# message is a frame: a little-endian u16 payload length, then the payload,
+# whose first byte is the message type. Cells travel as u16 indexes
+# (y * width + x), directions as indexes into topology.DIRECTIONS.
+FRAME = struct.Struct('<H')
+MAX_FRAME = 0xFFFF
+
+# Client -> server
+MSG_JOIN = 1        # Level index and room number
+MSG_INPUT = 2       # A turn and the tick it is meant for
+MSG_PING = 3        # Client clock in milliseconds, echoed back as a pong
+JOIN = struct.Struct('<BBH')
+INPUT = struct.Struct('<BIB')
+PING = struct.Struct('<BI')
+
+# Server -> client
+MSG_KEYFRAME = 16   # The whole match, sent on joining and when a round starts
+MSG_DELTA = 17      # What changed in one tick
+MSG_ERROR = 18      # Text, then the server hangs up
+MSG_TURN = 19       # A player's turn and the tick it will be applied at, sent as soon as it arrives
+MSG_PONG = 20       # The ping, back
+KEYFRAME = struct.Struct('<BIIBBHHIB')  # type, tick, seed, level, you, width, height, items.now, snakes
+KEYFRAME_SNAKE = struct.Struct('<BBBHHBH')  # id, alive, direction, length, score, boost, cells
+KEYFRAME_ITEM = struct.Struct('<HBi')  # cell, kind, expires (-1 for never)
+DELTA = struct.Struct('<BII')  # type, tick, tick of the last turn applied for this client
+DELTA_SNAKE = struct.Struct('<BBBHHHH')  # id, flags, direction, head, removed, length, score
+DELTA_ITEM = struct.Struct('<HB')  # cell, kind (0 when the cell was cleared)
+TURN = struct.Struct('<BBIB')  # type, player, tick, direction
+COUNT = struct.Struct('<H')
+
+# Delta snake flags. Living snakes add head and drop removed tail cells;
+# a snake without ALIVE died this tick and leaves the board entirely.
+ALIVE = 1
+
+SPECTATOR = 255  # "you" for clients that watch until the next round
+KIND_CODES = {FOOD_ITEM: 1, SPEED_ITEM: 2, SHRINK_ITEM: 3, BONUS_ITEM: 4}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+class ProtocolError(ValueError):
+    pass
+
+def encode_join(level, room):
+    return JOIN.pack(MSG_JOIN, level, room)
+
+def encode_input(tick, direction):
+    return INPUT.pack(MSG_INPUT, tick, direction)
+
+def encode_turn(player, tick, direction):
+    return TURN.pack(MSG_TURN, player, tick, direction)
+
+def encode_ping(stamp, pong=False):
+    return PING.pack(MSG_PONG if pong else MSG_PING, stamp & 0xFFFFFFFF)
+
+def encode_error(text):
+    return bytes([MSG_ERROR]) + text.encode()[:200]
+
+def encode_keyframe(state, you):
+    # state: the dict from Match.state()
+    parts = [KEYFRAME.pack(MSG_KEYFRAME, state['tick'], state['seed'], state['level'], you,
+                           state['width'], state['height'], state['now'], len(state['snakes']))]
+    for snake in state['snakes']:
+        cells = snake['cells']
+        parts.append(KEYFRAME_SNAKE.pack(snake['id'], snake['alive'], snake['direction'], snake['length'],
+                                         snake['score'], snake['boost'], len(cells)))
+        parts.append(struct.pack(f'<{len(cells)}H', *cells))
+    parts.append(COUNT.pack(len(state['items'])))
+    for cell, kind, expires in state['items']:
+        parts.append(KEYFRAME_ITEM.pack(cell, KIND_CODES[kind], -1 if expires is None else expires))
+    return b''.join(parts)
+
+def decode_keyframe(payload):
+    # Inverse of encode_keyframe: (state, you)
+    try:
+        _, tick, seed, level, you, width, height, now, count = KEYFRAME.unpack_from(payload)
+        offset = KEYFRAME.size
+        snakes = []
+        for _ in range(count):
+            id, alive, direction, length, score, boost, size = KEYFRAME_SNAKE.unpack_from(payload, offset)
+            offset += KEYFRAME_SNAKE.size
+            cells = list(struct.unpack_from(f'<{size}H', payload, offset))
+            offset += size * 2
+            snakes.append(dict(id=id, alive=bool(alive), direction=direction, length=length,
+                               score=score, boost=boost, cells=cells))
+        count, = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        items = []
+        for i in range(count):
+            cell, code, expires = KEYFRAME_ITEM.unpack_from(payload, offset + i * KEYFRAME_ITEM.size)
+            items.append((cell, CODE_KINDS[code], None if expires < 0 else expires))
+    except (struct.error, KeyError) as e:
+        raise ProtocolError(f'bad keyframe: {e}')
+    state = dict(tick=tick, seed=seed, level=level, width=width, height=height, now=now,
+                 snakes=snakes, items=items)
+    return state, you
+
+def encode_delta_body(moves, item_changes):
+    # The part of a delta that is the same for everybody in a room, encoded
+    # once per tick. moves: (id, flags, direction, head, removed, length,
+    # score) per snake; item_changes: (cell, kind or None) in order.
+    parts = [COUNT.pack(len(moves))]
+    parts += [DELTA_SNAKE.pack(*move) for move in moves]
+    parts.append(COUNT.pack(len(item_changes)))
+    parts += [DELTA_ITEM.pack(cell, 0 if kind is None else KIND_CODES[kind]) for cell, kind in item_changes]
+    return b''.join(parts)
+
+def encode_delta(tick, ack, body):
+    return DELTA.pack(MSG_DELTA, tick, ack) + body
+
+def decode_delta(payload):
+    # (tick, ack, moves, item_changes), see encode_delta_body
+    try:
+        _, tick, ack = DELTA.unpack_from(payload)
+        offset = DELTA.size
+        count, = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        moves = [DELTA_SNAKE.unpack_from(payload, offset + i * DELTA_SNAKE.size) for i in range(count)]
+        offset += count * DELTA_SNAKE.size
+        count, = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        changes = []
+        for i in range(count):
+            cell, code = DELTA_ITEM.unpack_from(payload, offset + i * DELTA_ITEM.size)
+            changes.append((cell, CODE_KINDS[code] if code else None))
+    except (struct.error, KeyError) as e:
+        raise ProtocolError(f'bad delta: {e}')
+    return tick, ack, moves, changes
+
+async def read_frame(reader):
+    # Next payload; raises asyncio.IncompleteReadError when the peer is gone
+    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if not size:
+        raise ProtocolError('empty frame')
+    return await reader.readexactly(size)
+
+class LinkWriter:
+    # Sends frames through a StreamWriter. With latency or jitter (seconds)
+    # every frame is held back that long first, to try the game over a bad
+    # link on one machine; frames never overtake each other, as on TCP.
+    def __init__(self, writer, latency=0.0, jitter=0.0, rng=None):
+        self.writer = writer
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.held = deque()  # (due time, frame), due times never decrease
+        self.last_due = 0.0
+
+    def send(self, payload):
+        data = FRAME.pack(len(payload)) + payload
+        if not self.latency and not self.jitter:
+            self.writer.write(data)
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        self.last_due = max(self.last_due, loop.time() + delay)
+        self.held.append((self.last_due, data))
+        if len(self.held) == 1:
+            loop.call_at(self.last_due, self.deliver)
+
+    def deliver(self):
+        # One timer at a time, for the oldest frame: timers due at the same
+        # moment could fire in any order
+        loop = asyncio.get_running_loop()
+        while self.held and self.held[0][0] <= loop.time():
+            data = self.held.popleft()[1]
+            if not self.writer.is_closing():
+                self.writer.write(data)
+        if self.held:
+            loop.call_at(self.held[0][0], self.deliver)
+
+    def backlog(self):
+        # Bytes the socket hasn't taken yet
+        return self.writer.transport.get_write_buffer_size()
+
+    def close(self):
+        # After whatever is still held back has gone out
+        loop = asyncio.get_running_loop()
+        if self.last_due > loop.time():
+            loop.call_at(self.last_due, self.writer.close)
+        else:
+            self.writer.close()
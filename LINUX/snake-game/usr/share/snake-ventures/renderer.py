@@ -0,0 +1,565 @@
+import os
+import pygame
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from bloom import create_bloom_pass
+
+try:
+    from pygame._sdl2 import video as sdl2_video
+    from pygame._sdl2.sdl2 import error as sdl2_error
+except ImportError:  # pygame built without the SDL2 video module
+    sdl2_video = None
+    sdl2_error = pygame.error
+
+# Renderer settings
+TEXT_CACHE_SIZE = 256   # Rendered strings kept around (scores change every few ticks)
+SPRITE_CACHE_SIZE = 128 # Widget images, one per widget state
+GLOW_SPRITE_SIZE = 64   # Segment size the glow sprite is pre-rendered at
+CIRCLE_SPRITE_RADIUS = 64
+MIN_WINDOW_WIDTH = 800
+MIN_WINDOW_HEIGHT = 600
+
+def make_glow_sprite(size):
+    # Same concentric ring falloff Title.draw used to paint per segment, but in
+    # white so it can be tinted to any segment color when drawn
+    sprite = pygame.Surface((size * 4, size * 4), pygame.SRCALPHA)
+    center = (size * 2, size * 2)
+    for radius in range(int(size * 2), int(size // 2), -2):
+        alpha = int((radius / (size * 2)) * 100)
+        pygame.draw.circle(sprite, (255, 255, 255, alpha), center, radius)
+    return sprite
+
+def draw_glow_rings(surface, color, center, size, ring_step=2):
+    # Exact glow look of the original title animation at ring_step=2
+    for radius in range(int(size * 2), int(size // 2), -ring_step):
+        alpha = int((radius / (size * 2)) * 100)
+        pygame.draw.circle(surface, (*color[0:3], alpha), center, radius)
+
+def convert_alpha(surface):
+    # Converted once so every later blit is a straight pixel copy. Some video
+    # drivers (e.g. dummy) have no alpha display format; keep the original then.
+    converted = surface.convert_alpha()
+    return converted if converted.get_flags() & pygame.SRCALPHA else surface
+
+@lru_cache(maxsize=16)
+def sheet_areas(sheet_width, frame_size):
+    # Source rects of the frames in a one-row sprite sheet
+    return [pygame.Rect(x, 0, frame_size, frame_size) for x in range(0, sheet_width, frame_size)]
+
+def anchor_rect(size, anchor):
+    # anchor is a single get_rect style keyword, e.g. {'center': (x, y)}
+    rect = pygame.Rect((0, 0), size)
+    for name, value in anchor.items():
+        setattr(rect, name, value)
+    return rect
+
+class Renderer:
+    # Drawing interface shared by every backend. Game code only talks to these
+    # methods, never to a display surface directly.
+    name = None
+    accelerated = False
+    throttled = True  # False lets the game loops run as fast as they can
+    glow_ring_step = 2
+    glow_scale = 1
+    bloom = None  # BloomPass, when the backend can composite one
+
+    @property
+    def size(self):
+        raise NotImplementedError
+
+    def resize(self, width, height):
+        raise NotImplementedError
+
+    def clear(self, color):
+        raise NotImplementedError
+
+    def rect(self, color, rect, width=0, border_radius=0):
+        raise NotImplementedError
+
+    def circle(self, color, center, radius):
+        raise NotImplementedError
+
+    def text(self, font, text, color, alpha=None, **anchor):
+        # Draws text placed by a single get_rect style anchor and returns its rect
+        raise NotImplementedError
+
+    def overlay(self, color, alpha):
+        # Translucent fill over whatever was drawn before
+        raise NotImplementedError
+
+    def sprite(self, key, build, topleft):
+        # Draws a cached image; build() returns the pygame surface for key and is
+        # only called when key isn't cached yet
+        raise NotImplementedError
+
+    def dynamic_image(self, key, surface, topleft, dirty_rects):
+        # Draws a surface the caller keeps changing; dirty_rects are the parts
+        # changed since the last call with this key
+        raise NotImplementedError
+
+    def sprite_batch(self, key, build, frame_size, frames, positions):
+        # Draws many frames of one cached sprite sheet (a row of square frames
+        # built by build()) in one call; frames and positions pair up
+        raise NotImplementedError
+
+    def glow(self, color, center, size):
+        # Queues a glow halo; halos show up on the next composite_glow()
+        raise NotImplementedError
+
+    @property
+    def has_bloom(self):
+        return self.bloom is not None
+
+    # Bloom: bright shapes are collected in a small layer that composite_bloom()
+    # blurs and adds onto the frame. No-ops without a bloom pass.
+    def bloom_circle(self, color, center, radius):
+        if self.bloom:
+            self.bloom.circle(color, center, radius)
+
+    def bloom_rect(self, color, rect):
+        if self.bloom:
+            self.bloom.rect(color, rect)
+
+    def bloom_text(self, font, text, color, alpha=None, **anchor):
+        if self.bloom:
+            self.bloom.text(font, text, color, anchor_rect(font.size(text), anchor), alpha)
+
+    def composite_bloom(self):
+        if self.bloom:
+            processed = self.bloom.process()
+            if processed:
+                self.add_light(*processed)
+
+    def add_light(self, image, area, target):
+        # Adds area of image, stretched to target, onto the frame
+        raise NotImplementedError
+
+    def set_glow_quality(self, ring_step, scale):
+        # Lets the frame governor trade glow detail for speed
+        self.glow_ring_step = ring_step
+        self.glow_scale = scale
+
+    # Warm-up hooks: build and cache what a later draw call would need, without
+    # drawing anything. Backends without caches can leave them as no-ops.
+    def prepare_text(self, font, text, color):
+        pass
+
+    def prepare_overlay(self, color, alpha):
+        pass
+
+    def prepare_sprite(self, key, build):
+        pass
+
+    def composite_glow(self):
+        raise NotImplementedError
+
+    def present(self, rects=None):
+        # rects limits the update to those areas when only they were redrawn
+        raise NotImplementedError
+
+class SurfaceRenderer(Renderer):
+    # Software backend: draws straight onto the pygame display surface
+    name = 'software'
+
+    def __init__(self, width, height, caption):
+        self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        pygame.display.set_caption(caption)
+        self.text_cache = OrderedDict()
+        self.sprites = OrderedDict()
+        self.overlays = {}
+        self.glow_layer = None
+        self.glow_bounds = None
+        self.glow_dirty = False
+        self.bloom = create_bloom_pass(self.size)
+
+    @property
+    def size(self):
+        return self.screen.get_size()
+
+    def resize(self, width, height):
+        self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        self.overlays.clear()
+        self.glow_layer = None
+        if self.bloom:
+            self.bloom.resize(self.size)
+
+    def clear(self, color):
+        self.screen.fill(color)
+
+    def rect(self, color, rect, width=0, border_radius=0):
+        pygame.draw.rect(self.screen, color, rect, width, border_radius=border_radius)
+
+    def circle(self, color, center, radius):
+        pygame.draw.circle(self.screen, color, center, radius)
+
+    def render_text(self, font, text, color):
+        key = (font, text, tuple(color))
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = convert_alpha(font.render(text, True, color))
+            self.text_cache[key] = surface
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return surface
+
+    def text(self, font, text, color, alpha=None, **anchor):
+        surface = self.render_text(font, text, color)
+        rect = anchor_rect(surface.get_size(), anchor)
+        surface.set_alpha(255 if alpha is None else alpha)  # None would switch off per-pixel alpha
+        self.screen.blit(surface, rect)
+        return rect
+
+    def get_overlay(self, color, alpha):
+        key = (self.size, tuple(color), alpha)
+        surface = self.overlays.get(key)
+        if surface is None:
+            surface = pygame.Surface(self.size).convert()
+            surface.set_alpha(alpha)
+            surface.fill(color)
+            self.overlays[key] = surface
+        return surface
+
+    def overlay(self, color, alpha):
+        self.screen.blit(self.get_overlay(color, alpha), (0, 0))
+
+    def get_sprite(self, key, build):
+        surface = self.sprites.get(key)
+        if surface is None:
+            surface = convert_alpha(build())
+            self.sprites[key] = surface
+            if len(self.sprites) > SPRITE_CACHE_SIZE:
+                self.sprites.popitem(last=False)
+        else:
+            self.sprites.move_to_end(key)
+        return surface
+
+    def sprite(self, key, build, topleft):
+        self.screen.blit(self.get_sprite(key, build), topleft)
+
+    def dynamic_image(self, key, surface, topleft, dirty_rects):
+        self.screen.blit(surface, topleft)
+
+    def sprite_batch(self, key, build, frame_size, frames, positions):
+        sheet = self.get_sprite(key, build)
+        areas = sheet_areas(sheet.get_width(), frame_size)
+        self.screen.blits([(sheet, position, areas[frame]) for frame, position in zip(frames, positions)],
+                          doreturn=False)
+
+    def prepare_text(self, font, text, color):
+        self.render_text(font, text, color)
+
+    def prepare_overlay(self, color, alpha):
+        self.get_overlay(color, alpha)
+
+    def prepare_sprite(self, key, build):
+        self.get_sprite(key, build)
+
+    def set_glow_quality(self, ring_step, scale):
+        if scale != self.glow_scale:
+            self.glow_layer = None
+        super().set_glow_quality(ring_step, scale)
+
+    def glow(self, color, center, size):
+        scale = self.glow_scale
+        if self.glow_layer is None:
+            width, height = self.size
+            self.glow_layer = pygame.Surface((int(width * scale) + 1, int(height * scale) + 1), pygame.SRCALPHA)
+            self.glow_layer.fill((0, 0, 0, 0))
+            self.glow_bounds = None
+        if not self.glow_dirty:
+            # Only the area used last time needs clearing
+            if self.glow_bounds:
+                self.glow_layer.fill((0, 0, 0, 0), self.glow_bounds)
+            self.glow_bounds = None
+            self.glow_dirty = True
+        center = (int(center[0] * scale), int(center[1] * scale))
+        draw_glow_rings(self.glow_layer, color, center, size * scale, self.glow_ring_step)
+        extent = int(size * scale * 2) + 1
+        area = pygame.Rect(center[0] - extent, center[1] - extent, extent * 2, extent * 2)
+        self.glow_bounds = area if self.glow_bounds is None else self.glow_bounds.union(area)
+
+    def composite_glow(self):
+        if not self.glow_dirty:
+            return
+        self.glow_dirty = False
+        bounds = self.glow_bounds.clip(self.glow_layer.get_rect())
+        if not bounds:
+            return
+        if self.glow_scale == 1:
+            self.screen.blit(self.glow_layer, bounds.topleft, bounds, special_flags=pygame.BLEND_ALPHA_SDL2)
+            return
+        # Low resolution glow is stretched back up; it is blurry anyway
+        scale = self.glow_scale
+        target = pygame.Rect(int(bounds.x / scale), int(bounds.y / scale),
+                             int(bounds.width / scale), int(bounds.height / scale))
+        layer = pygame.transform.smoothscale(self.glow_layer.subsurface(bounds), target.size)
+        self.screen.blit(layer, target.topleft, special_flags=pygame.BLEND_ALPHA_SDL2)
+
+    def add_light(self, image, area, target):
+        light = pygame.transform.smoothscale(image.subsurface(area), target.size)
+        self.screen.blit(light, target.topleft, special_flags=pygame.BLEND_RGB_ADD)
+
+    def present(self, rects=None):
+        if rects:
+            pygame.display.update(rects)
+        else:
+            pygame.display.update()
+
+class TextureRenderer(Renderer):
+    # Hardware backend built on SDL's Renderer/Texture API. Sprites are uploaded
+    # once and then only stretched and tinted on the GPU.
+    name = 'texture'
+
+    def __init__(self, width, height, caption, accelerated=True):
+        # Stretched textures (glow sprite, bloom light) are filtered, not blocky
+        os.environ.setdefault('SDL_RENDER_SCALE_QUALITY', 'linear')
+        self.window = sdl2_video.Window(caption, (width, height), resizable=True)
+        self.renderer = None
+        if accelerated:
+            try:
+                self.renderer = sdl2_video.Renderer(self.window, accelerated=1)
+            except sdl2_error:
+                self.renderer = None  # No GPU driver available
+        self.accelerated = self.renderer is not None
+        if self.renderer is None:
+            # SDL's own software renderer, still much cheaper than per-frame surfaces
+            self.renderer = sdl2_video.Renderer(self.window, accelerated=0)
+        self.renderer.draw_blend_mode = pygame.BLENDMODE_BLEND
+        self.text_cache = OrderedDict()
+        self.sprites = OrderedDict()
+        self.shape_cache = {}
+        self.glow_queue = []
+        self.glow_sprite = self.make_texture(make_glow_sprite(GLOW_SPRITE_SIZE))
+        disc = pygame.Surface((CIRCLE_SPRITE_RADIUS * 2, CIRCLE_SPRITE_RADIUS * 2), pygame.SRCALPHA)
+        pygame.draw.circle(disc, (255, 255, 255), (CIRCLE_SPRITE_RADIUS, CIRCLE_SPRITE_RADIUS), CIRCLE_SPRITE_RADIUS)
+        self.circle_sprite = self.make_texture(disc)
+        self.canvas = None
+        self.create_canvas()
+        self.bloom = create_bloom_pass(self.size)
+        self.light = None
+        self.streams = {}  # Streaming textures behind dynamic_image()
+
+    def make_texture(self, surface):
+        texture = sdl2_video.Texture.from_surface(self.renderer, surface)
+        texture.blend_mode = pygame.BLENDMODE_BLEND
+        return texture
+
+    def create_canvas(self):
+        # Draw into a persistent target texture so overlays can be layered on
+        # top of the previous frame exactly like they are on a display surface
+        self.renderer.target = None
+        self.canvas = sdl2_video.Texture(self.renderer, self.window.size, target=True)
+        self.renderer.target = self.canvas
+
+    @property
+    def size(self):
+        return self.window.size
+
+    def resize(self, width, height):
+        if self.window.size != (width, height):
+            self.window.size = (width, height)
+        self.create_canvas()
+        if self.bloom:
+            self.bloom.resize(self.size)
+            self.light = None
+
+    def set_color(self, color):
+        self.renderer.draw_color = color if len(color) == 4 else (*color, 255)
+
+    def clear(self, color):
+        self.set_color(color)
+        self.renderer.clear()
+
+    def get_shape(self, color, size, width, border_radius):
+        # Rounded outlines come from a cached pygame.draw render
+        key = (tuple(size), tuple(color), width, border_radius)
+        texture = self.shape_cache.get(key)
+        if texture is None:
+            shape = pygame.Surface(size, pygame.SRCALPHA)
+            pygame.draw.rect(shape, color, shape.get_rect(), width, border_radius=border_radius)
+            texture = self.shape_cache[key] = self.make_texture(shape)
+        return texture
+
+    def rect(self, color, rect, width=0, border_radius=0):
+        rect = pygame.Rect(rect)
+        if border_radius:
+            self.get_shape(color, rect.size, width, border_radius).draw(dstrect=rect)
+            return
+        self.set_color(color)
+        if width == 0:
+            self.renderer.fill_rect(rect)
+        else:
+            for i in range(width):
+                self.renderer.draw_rect(rect.inflate(-2 * i, -2 * i))
+
+    def circle(self, color, center, radius):
+        self.circle_sprite.color = color[0:3]
+        self.circle_sprite.draw(dstrect=(center[0] - radius, center[1] - radius, radius * 2, radius * 2))
+
+    def render_text(self, font, text, color):
+        key = (font, text, tuple(color))
+        texture = self.text_cache.get(key)
+        if texture is None:
+            texture = self.make_texture(font.render(text, True, color))
+            self.text_cache[key] = texture
+            if len(self.text_cache) > TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last=False)
+        else:
+            self.text_cache.move_to_end(key)
+        return texture
+
+    def text(self, font, text, color, alpha=None, **anchor):
+        texture = self.render_text(font, text, color)
+        rect = anchor_rect((texture.width, texture.height), anchor)
+        texture.alpha = 255 if alpha is None else alpha
+        texture.draw(dstrect=rect)
+        return rect
+
+    def get_sprite(self, key, build):
+        texture = self.sprites.get(key)
+        if texture is None:
+            texture = self.make_texture(build())
+            self.sprites[key] = texture
+            if len(self.sprites) > SPRITE_CACHE_SIZE:
+                self.sprites.popitem(last=False)
+        else:
+            self.sprites.move_to_end(key)
+        return texture
+
+    def sprite(self, key, build, topleft):
+        texture = self.get_sprite(key, build)
+        texture.draw(dstrect=(topleft[0], topleft[1], texture.width, texture.height))
+
+    def dynamic_image(self, key, surface, topleft, dirty_rects):
+        # Only the changed parts are uploaded again
+        texture = self.streams.get(key)
+        if texture is None or (texture.width, texture.height) != surface.get_size():
+            texture = self.streams[key] = sdl2_video.Texture(self.renderer, surface.get_size(), streaming=True)
+            texture.update(surface)
+        else:
+            for rect in dirty_rects:
+                texture.update(surface.subsurface(rect), rect)
+        texture.draw(dstrect=(topleft[0], topleft[1], texture.width, texture.height))
+
+    def sprite_batch(self, key, build, frame_size, frames, positions):
+        texture = self.get_sprite(key, build)
+        areas = sheet_areas(texture.width, frame_size)
+        draw = texture.draw
+        for frame, (x, y) in zip(frames, positions):
+            draw(srcrect=areas[frame], dstrect=(x, y, frame_size, frame_size))
+
+    def prepare_text(self, font, text, color):
+        self.render_text(font, text, color)
+
+    def prepare_sprite(self, key, build):
+        self.get_sprite(key, build)
+
+    def overlay(self, color, alpha):
+        self.set_color((*color[0:3], alpha))
+        self.renderer.fill_rect(pygame.Rect((0, 0), self.size))
+
+    def glow(self, color, center, size):
+        self.glow_queue.append((color, center, size))
+
+    def composite_glow(self):
+        for color, (x, y), size in self.glow_queue:
+            self.glow_sprite.color = color[0:3]
+            extent = int(size * 4)
+            self.glow_sprite.draw(dstrect=(x - extent // 2, y - extent // 2, extent, extent))
+        self.glow_queue.clear()
+
+    def add_light(self, image, area, target):
+        # The small light layer is streamed into one reused texture
+        if self.light is None:
+            self.light = sdl2_video.Texture(self.renderer, image.get_size(), streaming=True)
+            self.light.blend_mode = pygame.BLENDMODE_ADD
+        self.light.update(image)
+        self.light.draw(srcrect=area, dstrect=target)
+
+    def present(self, rects=None):
+        # The whole canvas is copied either way; on the GPU that costs next to nothing
+        self.renderer.target = None
+        self.canvas.draw()
+        self.renderer.present()
+        self.renderer.target = self.canvas
+
+class NullRenderer(Renderer):
+    # Headless backend: counts draw calls and draws nothing, so the game logic
+    # can be run and measured without a window or any pixel cost
+    name = 'null'
+    throttled = False
+
+    def __init__(self, width, height, caption=None):
+        if not pygame.display.get_init():
+            # The event queue still needs a video driver, even a dummy one
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            pygame.display.init()
+        self.width = width
+        self.height = height
+        self.calls = Counter()
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    @property
+    def frames(self):
+        return self.calls['present']
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+        self.calls['resize'] += 1
+
+    def clear(self, color):
+        self.calls['clear'] += 1
+
+    def rect(self, color, rect, width=0, border_radius=0):
+        self.calls['rect'] += 1
+
+    def circle(self, color, center, radius):
+        self.calls['circle'] += 1
+
+    def text(self, font, text, color, alpha=None, **anchor):
+        self.calls['text'] += 1
+        return anchor_rect(font.size(text), anchor)
+
+    def overlay(self, color, alpha):
+        self.calls['overlay'] += 1
+
+    def sprite(self, key, build, topleft):
+        self.calls['sprite'] += 1
+
+    def dynamic_image(self, key, surface, topleft, dirty_rects):
+        self.calls['dynamic_image'] += 1
+
+    def sprite_batch(self, key, build, frame_size, frames, positions):
+        self.calls['sprite_batch'] += 1
+
+    def glow(self, color, center, size):
+        self.calls['glow'] += 1
+
+    def composite_glow(self):
+        self.calls['composite_glow'] += 1
+
+    def present(self, rects=None):
+        self.calls['present'] += 1
+
+    def report(self):
+        return ', '.join(f'{name}={count}' for name, count in sorted(self.calls.items()))
+
+def create_renderer(width, height, caption, backend='auto'):
+    # 'auto' prefers the texture backend (GPU if there is one, SDL's software
+    # renderer otherwise) and only drops to plain surfaces if it is unavailable
+    if backend == 'null':
+        return NullRenderer(width, height, caption)
+    if backend in ('auto', 'texture') and sdl2_video is not None:
+        try:
+            return TextureRenderer(width, height, caption)
+        except (pygame.error, sdl2_error):
+            if backend == 'texture':
+                raise
+    return SurfaceRenderer(width, height, caption)
@@ -0,0 +1,62 @@
+import struct
+import hashlib
+
+from topology import DIRECTIONS, DIRECTION_INDEX
+
+# Replays of single-player games on the window-sized board. The snake moves
+# by fixed rules and all item placement comes from one seeded RNG, so a game
+# is fully described by its level, the seed, the board size and which way
+# the snake went from which move on. A few hundred bytes hold a long game.
+MAGIC = b'SVRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBIHHI')  # magic, version, level, seed, width, height, events
+EVENT = struct.Struct('<IBHH')  # move, kind, then the direction or the new board size
+
+# Event kinds
+TURN = 1  # From this move on the snake heads DIRECTIONS[a]
+GRID = 2  # From this move on the board is a x b cells (the window was resized)
+
+class Replay:
+    def __init__(self, level, seed, width, height, events=None):
+        self.level = level  # Level value
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.events = events if events is not None else []  # (move, kind, a, b) in move order
+        self.moves = 0
+        self.direction = None
+
+    def move(self, direction):
+        # Called before every move with the direction the snake is about to take
+        if direction != self.direction:
+            self.events.append((self.moves, TURN, DIRECTION_INDEX[direction], 0))
+            self.direction = direction
+        self.moves += 1
+
+    def resize(self, width, height):
+        self.events.append((self.moves, GRID, width, height))
+
+    def encode(self):
+        parts = [HEADER.pack(MAGIC, VERSION, self.level, self.seed, self.width, self.height, len(self.events))]
+        parts += [EVENT.pack(*event) for event in self.events]
+        return b''.join(parts)
+
+    @classmethod
+    def decode(cls, data):
+        try:
+            magic, version, level, seed, width, height, count = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('not a Snake Ventures replay, or from another version')
+            if len(data) != HEADER.size + count * EVENT.size:
+                raise ValueError('replay has the wrong length')
+            events = list(EVENT.iter_unpack(memoryview(data)[HEADER.size:]))
+        except struct.error as e:
+            raise ValueError(f'bad replay: {e}')
+        for move, kind, a, b in events:
+            if kind not in (TURN, GRID) or (kind == TURN and a >= len(DIRECTIONS)):
+                raise ValueError(f'bad replay event at move {move}')
+        return cls(level, seed, width, height, events)
+
+    def digest(self):
+        # Names the replay file and identifies the replay to the leaderboard
+        return hashlib.sha256(self.encode()).hexdigest()
@@ -0,0 +1,240 @@
+import time
+import pygame
+
+from governor import FrameGovernor
+from warmup import AssetWarmup
+
+# Frame rate shared by every scene; the game itself ticks at its level speed
+FRAME_RATE = 60
+
+# Low-power settings
+UNFOCUSED_FRAME_RATE = 10  # Animated scenes while another window has focus
+IDLE_WAIT_MS = 250         # Longest an idle scene blocks waiting for input
+MINIMIZED_WAIT_MS = 1000   # Nothing is drawn at all while minimized
+WARMUP_SHARE = 0.8         # Share of the frame budget warm-up work may fill
+
+# Window events that change how hard the loop has to work
+FOCUS_LOST_EVENTS = [pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED]
+REDRAW_EVENTS = [pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED,
+                 pygame.WINDOWSHOWN, pygame.WINDOWEXPOSED]
+
+# Events the manager handles itself, whatever scene is on top
+MANAGER_EVENTS = [pygame.QUIT, pygame.VIDEORESIZE] + FOCUS_LOST_EVENTS + REDRAW_EVENTS
+
+class Scene:
+    # One screen of the game (menu, level, pause, game over). The manager owns
+    # the loop; scenes only react to events, advance and draw themselves.
+    opaque = True  # Overlay scenes set this to False to be drawn over the scene below
+    idle = False   # Static scenes that only change on input can block on the event queue
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.dirty = True  # Set whenever the scene needs to be drawn again
+        # Dispatch tables filled in by each scene: event type -> handler and,
+        # for KEYDOWN, key -> handler. Only these event types reach the queue.
+        self.event_handlers = {}
+        self.key_handlers = {}
+
+    @property
+    def allowed_events(self):
+        events = list(self.event_handlers)
+        if self.key_handlers:
+            events.append(pygame.KEYDOWN)
+        return events
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            handler = self.key_handlers.get(event.key)
+        else:
+            handler = self.event_handlers.get(event.type)
+        if handler:
+            handler(event)
+
+    def update(self, dt):
+        pass
+
+    def draw(self, renderer):
+        pass
+
+    def dirty_rects(self):
+        # Areas that changed on their own (e.g. a widget's hover state) while
+        # the rest of the scene stayed the same
+        return []
+
+    def redraw(self, renderer, rects):
+        # Draws just the given areas again; only called with dirty_rects()
+        pass
+
+    def resize(self):
+        self.dirty = True
+
+    def on_focus_lost(self):
+        pass
+
+class SceneManager:
+    # Single main loop driving a stack of scenes with one clock and one event pump
+    def __init__(self, renderer, on_resize=None):
+        self.renderer = renderer
+        self.on_resize = on_resize
+        self.clock = pygame.time.Clock()
+        self.governor = FrameGovernor(1000 / FRAME_RATE)
+        self.warmup = AssetWarmup()
+        self.stack = []
+        self.running = False
+        self.filtered_for = None
+        self.pending = []  # Events already taken off the queue by a blocking wait
+        self.focused = True
+        self.minimized = False
+
+    @property
+    def quality(self):
+        # Effect settings scenes should draw with right now
+        return self.governor.settings
+
+    def record_frame_time(self, frame_ms):
+        if self.governor.record(frame_ms):
+            settings = self.governor.settings
+            self.renderer.set_glow_quality(settings['glow_ring_step'], settings['glow_scale'])
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        self.stack.append(scene)
+        scene.dirty = True
+
+    def pop(self):
+        scene = self.stack.pop()
+        if self.stack:
+            self.top.dirty = True
+        return scene
+
+    def replace(self, scene):
+        # Swap the top scene
+        self.stack.pop()
+        self.push(scene)
+
+    def reset(self, scene):
+        # Drop the whole stack, e.g. when returning to the main menu
+        self.stack.clear()
+        self.push(scene)
+
+    def quit(self):
+        self.running = False
+
+    def apply_event_filter(self):
+        # Let SDL drop every event type the top scene has no handler for
+        scene = self.top
+        if scene is None or scene is self.filtered_for:
+            return
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(MANAGER_EVENTS + scene.allowed_events)
+        self.filtered_for = scene
+
+    def visible_scenes(self):
+        # Everything from the topmost opaque scene upwards has to be drawn
+        start = len(self.stack) - 1
+        while start > 0 and not self.stack[start].opaque:
+            start -= 1
+        return self.stack[start:]
+
+    def handle_window_event(self, event):
+        if event.type in FOCUS_LOST_EVENTS:
+            if event.type == pygame.WINDOWMINIMIZED:
+                self.minimized = True
+            self.focused = False
+            if self.top:
+                self.top.on_focus_lost()
+        else:
+            # Back on screen: redraw straight away
+            if event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN):
+                self.minimized = False
+            if event.type == pygame.WINDOWFOCUSGAINED:
+                self.focused = True
+                self.minimized = False
+            for scene in self.visible_scenes():
+                scene.dirty = True
+
+    def wait_for_events(self, timeout):
+        # Sleep in SDL until an allowed event arrives or the timeout passes
+        event = pygame.event.wait(timeout)
+        if event.type != pygame.NOEVENT:
+            self.pending.append(event)
+        self.clock.tick()
+        return 1000 / FRAME_RATE
+
+    def process_events(self):
+        events = self.pending + pygame.event.get()
+        self.pending = []
+        # Hover only cares where the mouse ended up, so every motion event but
+        # the last one of the frame is skipped
+        last_motion = None
+        for event in events:
+            if event.type == pygame.MOUSEMOTION:
+                last_motion = event
+        for event in events:
+            if event.type == pygame.MOUSEMOTION and event is not last_motion:
+                continue
+            if event.type == pygame.QUIT:
+                self.quit()
+                return
+            if event.type == pygame.VIDEORESIZE:
+                if self.on_resize:
+                    self.on_resize(event.w, event.h)
+                for scene in self.stack:
+                    scene.resize()
+                continue
+            if event.type in FOCUS_LOST_EVENTS or event.type in REDRAW_EVENTS:
+                self.handle_window_event(event)
+                self.apply_event_filter()
+                continue
+            if self.top:
+                self.top.handle_event(event)
+                self.apply_event_filter()
+
+    def run(self, limit_frame_rate):
+        self.running = True
+        dt = 0
+        while self.running and self.stack:
+            frame_start = time.perf_counter()
+            self.apply_event_filter()
+            self.process_events()
+            if not self.running or not self.stack:
+                break
+            self.top.update(dt)
+
+            if self.minimized and self.renderer.throttled:
+                # Nothing can be seen, so skip drawing and sleep until restored
+                dt = self.wait_for_events(MINIMIZED_WAIT_MS)
+                continue
+
+            scenes = self.visible_scenes()
+            if any(scene.dirty_rects() for scene in scenes[:-1]):
+                # Overlays drawn on top of a changed area need drawing again too
+                for scene in scenes:
+                    scene.dirty = True
+            if any(scene.dirty for scene in scenes):
+                for scene in scenes:
+                    scene.draw(self.renderer)
+                    scene.dirty = False
+                self.renderer.present()
+                # Only the work counts against the budget, not the sleep after it
+                self.record_frame_time((time.perf_counter() - frame_start) * 1000)
+            else:
+                rects = self.top.dirty_rects()
+                if rects:
+                    self.top.redraw(self.renderer, rects)
+                    self.renderer.present(rects)
+                    self.record_frame_time((time.perf_counter() - frame_start) * 1000)
+
+            if not self.warmup.done:
+                # Build upcoming assets in whatever is left of this frame
+                self.warmup.run_until(frame_start + WARMUP_SHARE / FRAME_RATE)
+
+            if self.top and self.top.idle and self.renderer.throttled:
+                dt = self.wait_for_events(IDLE_WAIT_MS)
+            elif not self.focused:
+                dt = limit_frame_rate(self.clock, self.renderer, UNFOCUSED_FRAME_RATE)
+            else:
+                dt = limit_frame_rate(self.clock, self.renderer, FRAME_RATE)
@@ -0,0 +1,156 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from itertools import groupby
+
+# Finished games, kept across runs
+DATA_DIR = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'snake-ventures')
+DEFAULT_PATH = os.path.join(DATA_DIR, 'scores.db')
+REPLAY_DIR = os.path.join(DATA_DIR, 'replays')
+
+# Store settings
+BATCH_SIZE = 500      # Most writes committed in one transaction
+BATCH_DELAY = 0.5     # Seconds a write waits for others to share its commit
+CLOSE_TIMEOUT = 5.0   # Seconds the game waits on exit for the last writes
+MODES = ('classic', 'arena', 'world', 'battle')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,  -- Milliseconds since the epoch at the start
+    started REAL NOT NULL,
+    ended REAL
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL REFERENCES sessions (id),
+    mode TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    cause TEXT,              -- 'wall' or 'self'; NULL where not known
+    played REAL NOT NULL,    -- When the game ended
+    seconds REAL NOT NULL,
+    replay TEXT              -- Digest of the file in REPLAY_DIR, NULL for games without a replay
+);
+-- Top-N per level is a walk down this index, however many games there are
+CREATE INDEX IF NOT EXISTS games_top ON games (mode, level, score DESC, played);
+CREATE INDEX IF NOT EXISTS games_session ON games (session);
+CREATE INDEX IF NOT EXISTS games_replay ON games (replay) WHERE replay IS NOT NULL;
+'''
+
+INSERT_GAME = ('INSERT INTO games (session, mode, level, score, length, moves, cause, played, seconds, replay) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+CLOSE = object()  # Tells the writer thread to finish
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute('PRAGMA journal_mode=WAL')  # Readers never wait for the writer
+    connection.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; a crash loses at most the last commits
+    return connection
+
+class ScoreStore:
+    # High scores, per-session stats and replay references in SQLite. The
+    # game only ever queues writes: a thread of its own commits them in
+    # batches and writes the replay files, so a game over costs the frame
+    # loop no disk access. Reads go through a second connection, which WAL
+    # lets run alongside the writer.
+    def __init__(self, levels, path=DEFAULT_PATH, replay_dir=REPLAY_DIR):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.replay_dir = replay_dir
+        self.reader = connect(path)
+        self.reader.executescript(SCHEMA)
+        self.session = int(time.time() * 1000)
+        self.queue = queue.SimpleQueue()
+        self.queue.put(('INSERT OR IGNORE INTO sessions (id, started) VALUES (?, ?)', (self.session, time.time())))
+        # Best score per (mode, level), kept up to date in memory for the
+        # game over screen. One index lookup each.
+        self.best = {}
+        for mode in MODES:
+            for level in levels:
+                score, = self.reader.execute('SELECT MAX(score) FROM games WHERE mode = ? AND level = ?',
+                                             (mode, level)).fetchone()
+                if score is not None:
+                    self.best[(mode, level)] = score
+        self.thread = threading.Thread(target=self.write, daemon=True)
+        self.thread.start()
+
+    def record(self, mode, level, score, length, moves, cause, seconds, replay=None):
+        # A finished game; replay is a replays.Replay or None
+        digest = data = None
+        if replay is not None:
+            data = replay.encode()
+            digest = replay.digest()
+        self.best[(mode, level)] = max(score, self.best.get((mode, level), score))
+        self.queue.put((INSERT_GAME, (self.session, mode, level, score, length, moves, cause, time.time(),
+                                      seconds, digest), digest, data))
+
+    def write(self):
+        # Writer thread: one transaction for everything that came in within
+        # BATCH_DELAY of the first write, up to BATCH_SIZE writes
+        connection = connect(self.path)
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + BATCH_DELAY
+            while len(batch) < BATCH_SIZE and batch[-1] is not CLOSE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is CLOSE:
+                batch.pop()
+                done = True
+            for write in batch:
+                if len(write) > 2 and write[2] is not None:
+                    self.save_replay(*write[2:])
+            try:
+                with connection:
+                    for sql, writes in groupby(batch, key=lambda write: write[0]):
+                        connection.executemany(sql, [write[1] for write in writes])
+            except sqlite3.Error as e:
+                print(f'Scores not saved: {e}')
+        connection.close()
+
+    def save_replay(self, digest, data):
+        path = os.path.join(self.replay_dir, digest + '.svr')
+        try:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            if not os.path.exists(path):  # Same digest, same replay
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f'Replay not saved: {e}')
+
+    def replay_path(self, digest):
+        return os.path.join(self.replay_dir, digest + '.svr')
+
+    def top(self, level, mode='classic', count=10):
+        # [(score, length, moves, played, replay)], best first; ties go to the earlier game
+        return self.reader.execute('SELECT score, length, moves, played, replay FROM games '
+                                   'WHERE mode = ? AND level = ? ORDER BY score DESC, played LIMIT ?',
+                                   (mode, level, count)).fetchall()
+
+    def session_stats(self, session=None):
+        # Games, total and best score and time played in a session, this
+        # one by default. Only counts what the writer has committed so far.
+        games, total, best, seconds = self.reader.execute(
+            'SELECT COUNT(*), TOTAL(score), MAX(score), TOTAL(seconds) FROM games WHERE session = ?',
+            (self.session if session is None else session,)).fetchone()
+        return dict(games=games, total=int(total), best=best or 0, seconds=seconds)
+
+    def sessions(self, count=10):
+        # [(session, started, ended)], latest first
+        return self.reader.execute('SELECT id, started, ended FROM sessions ORDER BY id DESC LIMIT ?',
+                                   (count,)).fetchall()
+
+    def close(self):
+        # Ends the session and waits a little for the last writes
+        self.queue.put(('UPDATE sessions SET ended = ? WHERE id = ?', (time.time(), self.session)))
+        self.queue.put(CLOSE)
+        self.thread.join(CLOSE_TIMEOUT)
+        self.reader.close()
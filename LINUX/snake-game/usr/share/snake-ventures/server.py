@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+# Headless: the rules come from main.py, which starts pygame on import. SDL
+# would also take over SIGINT/SIGTERM, which a server has to die from.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+from multiplayer import Match, MAX_PLAYERS
+from main import Level
+from topology import DIRECTIONS
+from protocol import (MSG_JOIN, MSG_INPUT, MSG_PING, JOIN, INPUT, PING, SPECTATOR, ProtocolError, LinkWriter,
+                      read_frame, encode_keyframe, encode_delta, encode_delta_body, encode_error, encode_turn,
+                      encode_ping)
+
+# Server settings
+DEFAULT_PORT = 7777
+TICK_RATE = 10          # Ticks per second, the Easy and Hard snake speed
+ROUND_BREAK = 20        # Ticks between the end of a round and the next one
+MAX_QUEUED_INPUTS = 12  # Turns a player can have waiting, one is applied per tick
+MAX_INPUT_LEAD = 20     # Turns meant for further ahead than this many ticks are dropped
+MAX_BACKLOG = 64 * 1024 # Unsent bytes before a client counts as stuck and is dropped
+
+class Player:
+    def __init__(self, id, link):
+        self.id = id
+        self.link = link
+        self.inputs = deque()  # (tick, direction) in tick order, at most one per tick
+        self.ack = 0  # Tick of the last turn applied
+
+class Room:
+    # Players sharing one board. The server runs the rules; players only send
+    # turns and get back what changed each tick.
+    def __init__(self, level, number, seed):
+        self.level = level
+        self.number = number
+        self.seed = seed
+        self.players = {}
+        self.match = None
+        self.rounds = 0
+        self.break_ticks = 0
+
+    def free_id(self):
+        for id in range(MAX_PLAYERS):
+            if id not in self.players:
+                return id
+        return None
+
+    def join(self, link):
+        id = self.free_id()
+        if id is None:
+            return None
+        player = self.players[id] = Player(id, link)
+        if self.match is None:
+            self.new_round()
+        else:
+            # Watches the running round, the keyframe says so
+            link.send(encode_keyframe(self.match.state(), id if id in self.match.snakes else SPECTATOR))
+        return player
+
+    def leave(self, player):
+        del self.players[player.id]
+
+    def new_round(self):
+        # Ticks keep counting across rounds, so a turn still on its way from
+        # the last round can't land in this one
+        tick = self.match.tick + ROUND_BREAK if self.match else 0
+        self.rounds += 1
+        self.match = Match(self.level, (self.seed + self.rounds * 7919) & 0xFFFFFFFF, list(self.players), tick=tick)
+        state = self.match.state()
+        for player in self.players.values():
+            player.inputs.clear()
+            player.link.send(encode_keyframe(state, player.id))
+
+    def turn(self, player, tick, direction):
+        # A turn is applied at the tick the client meant it for, so the
+        # client's own prediction comes true. Turns that come in late, or
+        # for a tick that already has one, go to the next free tick. Either
+        # way everybody in the room hears straight away when it will happen.
+        match = self.match
+        if player.id not in match.snakes or match.over():
+            return
+        next_tick = match.tick + 1
+        if tick > next_tick + MAX_INPUT_LEAD or len(player.inputs) >= MAX_QUEUED_INPUTS:
+            return
+        tick = max(tick, next_tick, player.inputs[-1][0] + 1 if player.inputs else 0)
+        player.inputs.append((tick, direction))
+        message = encode_turn(player.id, tick, DIRECTIONS.index(direction))
+        for other in self.players.values():
+            other.link.send(message)
+
+    def tick(self):
+        match = self.match
+        if match.over():
+            self.break_ticks += 1
+            if self.break_ticks >= ROUND_BREAK:
+                self.break_ticks = 0
+                self.new_round()
+            return
+        directions = {}
+        next_tick = match.tick + 1
+        for player in self.players.values():
+            if player.inputs and player.inputs[0][0] <= next_tick:
+                player.ack, directions[player.id] = player.inputs.popleft()
+        body = encode_delta_body(*match.step(directions))
+        for player in list(self.players.values()):
+            player.link.send(encode_delta(match.tick, player.ack, body))
+
+class Server:
+    # Any number of rooms in one process, all stepped from a single fixed-rate
+    # timer so hundreds of rooms cost one wakeup per tick instead of one task
+    # each. A room exists while somebody is in it.
+    def __init__(self, tick_rate=TICK_RATE, latency=0.0, jitter=0.0, seed=None):
+        self.interval = 1 / tick_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.rooms = {}
+        self.running = False
+        self.ticks = 0
+        self.busy = 0.0      # Seconds spent stepping rooms, and the worst tick
+        self.worst = 0.0
+
+    async def handle(self, reader, writer):
+        link = LinkWriter(writer, self.latency, self.jitter, random.Random(self.rng.random()))
+        room = player = None
+        try:
+            payload = await read_frame(reader)
+            if payload[0] != MSG_JOIN or len(payload) != JOIN.size:
+                raise ProtocolError('expected a join')
+            _, level, number = JOIN.unpack(payload)
+            try:
+                level = Level(level)
+            except ValueError:
+                raise ProtocolError(f'no level {level}')
+            key = (level, number)
+            room = self.rooms.get(key)
+            if room is None:
+                room = self.rooms[key] = Room(level, number, self.rng.getrandbits(32))
+            player = room.join(link)
+            if player is None:
+                link.send(encode_error('room is full'))
+                return
+            while True:
+                payload = await read_frame(reader)
+                if payload[0] == MSG_PING and len(payload) == PING.size:
+                    link.send(encode_ping(PING.unpack(payload)[1], pong=True))
+                    continue
+                if payload[0] != MSG_INPUT or len(payload) != INPUT.size:
+                    raise ProtocolError('expected an input')
+                _, tick, direction = INPUT.unpack(payload)
+                if direction >= len(DIRECTIONS):
+                    raise ProtocolError(f'no direction {direction}')
+                room.turn(player, tick, DIRECTIONS[direction])
+        except ProtocolError as e:
+            link.send(encode_error(str(e)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Gone
+        finally:
+            if player is not None:
+                room.leave(player)
+                if not room.players:
+                    del self.rooms[(room.level, room.number)]
+            link.close()
+
+    def tick(self):
+        started = time.perf_counter()
+        for room in list(self.rooms.values()):
+            room.tick()
+            for player in list(room.players.values()):
+                if player.link.backlog() > MAX_BACKLOG:
+                    player.link.close()  # Its reader notices and cleans up
+        elapsed = time.perf_counter() - started
+        self.ticks += 1
+        self.busy += elapsed
+        self.worst = max(self.worst, elapsed)
+
+    async def run(self):
+        # Fixed tick: a late tick is followed by a shorter wait, and a tick
+        # that overruns a whole interval starts the schedule afresh instead
+        # of bunching up ticks to catch up
+        loop = asyncio.get_running_loop()
+        self.running = True
+        next_tick = loop.time()
+        while self.running:
+            self.tick()
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def stop(self):
+        self.running = False
+
+    def report(self):
+        mean = self.busy / self.ticks * 1000 if self.ticks else 0
+        players = sum(len(room.players) for room in self.rooms.values())
+        return (f'{len(self.rooms)} rooms, {players} players, {self.ticks} ticks, '
+                f'{mean:.2f} ms per tick on average, {self.worst * 1000:.2f} ms at worst')
+
+async def serve(host, port, server):
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f'Snake Ventures server on {host}:{port}')
+    async with listener:
+        await server.run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures multiplayer server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--lag', type=float, default=0, metavar='MS',
+                        help='hold back everything sent by this long, to try out bad links')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS',
+                        help='vary the lag by up to this much either way')
+    args = parser.parse_args()
+    server = Server(latency=args.lag / 1000, jitter=args.jitter / 1000)
+    try:
+        asyncio.run(serve(args.host, args.port, server))
+    except KeyboardInterrupt:
+        print(server.report())
+        sys.exit(0)
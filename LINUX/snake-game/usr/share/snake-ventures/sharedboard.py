@@ -0,0 +1,155 @@
+import time
+import struct
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+
+from protocol import ALIVE, KIND_CODES, CODE_KINDS
+
+# The live board in a shared memory segment, for screens on the same machine
+# (an attract screen, an operator console) that read it directly instead of
+# through a socket. Layout: HEADER, then one byte per cell, row by row.
+DEFAULT_NAME = 'snake-ventures'
+MAGIC = b'SVB1'
+HEADER = struct.Struct('<4sIHHBBxxIIII')  # magic, sequence, width, height, level, alive, head, length, score, tick
+SEQUENCE = struct.Struct('<I')
+SEQUENCE_OFFSET = 4
+MAX_CELLS = 0x10000  # Cell numbers are u16, as in the network protocol
+READ_TIMEOUT = 0.5  # Seconds a reader waits for an update to finish
+
+# Cell values; items follow HEAD in protocol.KIND_CODES order
+EMPTY = 0
+BODY = 1
+HEAD = 2
+
+def item_value(kind):
+    return HEAD + KIND_CODES[kind]
+
+def value_kind(value):
+    # The item kind of a cell value, or None for empty and snake cells
+    return CODE_KINDS.get(value - HEAD)
+
+class SharedBoard:
+    # Writer side. Takes the same keyframes and per-move deltas as the
+    # spectator stream (see spectate.Broadcaster), so a move costs only the
+    # cells it changed: the new head, the tail cells that went and the items
+    # that came or went. Every update is bracketed by a seqlock: the sequence
+    # number is odd while the board is being written, and readers retry when
+    # it was odd or changed while they copied.
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name, create=True, size=HEADER.size + MAX_CELLS)
+        self.buf = self.shm.buf
+        self.grid = self.buf[HEADER.size:]
+        self.sequence = 0
+        self.snakes = {}  # Snake id -> cell numbers, head first
+        self.width = self.height = 0
+        self.level = 0
+        self.tick = 0
+        self.player = (0, 0, 0, 0)  # alive, head, length, score of snake 0, the player
+        self.begin()
+        self.end()
+
+    def begin(self):
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buf, SEQUENCE_OFFSET, self.sequence)
+
+    def end(self):
+        # The header goes out while the sequence is still odd, then the even
+        # sequence on its own, last
+        alive, head, length, score = self.player
+        HEADER.pack_into(self.buf, 0, MAGIC, self.sequence, self.width, self.height, self.level, alive, head,
+                         length, score, self.tick)
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buf, SEQUENCE_OFFSET, self.sequence)
+
+    def keyframe(self, state):
+        # The whole board, when a game starts or the board changes size;
+        # state as Match.state(), less the tick
+        self.begin()
+        width, height = state['width'], state['height']
+        if width * height > MAX_CELLS:
+            width = height = 0  # Readers show nothing rather than part of the board
+        self.width, self.height, self.level = width, height, state['level']
+        self.grid[:width * height] = bytes(width * height)
+        self.snakes = {}
+        self.player = (0, 0, 0, 0)
+        if width:
+            for cell, kind, _ in state['items']:
+                self.grid[cell] = item_value(kind)
+            for snake in state['snakes']:
+                cells = self.snakes[snake['id']] = deque(snake['cells'])
+                for cell in cells:
+                    self.grid[cell] = BODY
+                if cells:
+                    self.grid[cells[0]] = HEAD
+                if snake['id'] == 0:
+                    self.player = (snake['alive'], cells[0] if cells else 0, snake['length'], snake['score'])
+        self.end()
+
+    def publish(self, moves, changes, state):
+        # One move, see protocol.encode_delta_body; state is unused, the
+        # board never needs drawing again from scratch
+        self.tick += 1
+        if not self.width:
+            return
+        grid = self.grid
+        self.begin()
+        # Tails first: a new item can turn up on a cell a tail just left
+        for id, flags, direction, head, removed, length, score in moves:
+            cells = self.snakes[id]
+            if not flags & ALIVE:
+                removed = len(cells)
+            for _ in range(removed):
+                grid[cells.pop()] = EMPTY
+        for cell, kind in changes:
+            grid[cell] = EMPTY if kind is None else item_value(kind)
+        # Heads last: an eaten item's cell is where the head goes
+        for id, flags, direction, head, removed, length, score in moves:
+            if flags & ALIVE:
+                cells = self.snakes[id]
+                if cells:
+                    grid[cells[0]] = BODY
+                cells.appendleft(head)
+                grid[head] = HEAD
+            if id == 0:
+                self.player = (bool(flags & ALIVE), head, length, score)
+        self.end()
+
+    def close(self):
+        self.grid.release()
+        self.buf.release()
+        self.shm.close()
+        self.shm.unlink()
+
+class SharedBoardReader:
+    # Reader side, in any process on the machine
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name)
+        # Python tracks segments a process merely opened as well, and would
+        # remove this one from under the game when the reader exits
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        if bytes(self.shm.buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f'{name} is not a Snake Ventures board')
+
+    def sequence(self):
+        # Cheap check for changes: goes up with every update
+        return SEQUENCE.unpack_from(self.shm.buf, SEQUENCE_OFFSET)[0]
+
+    def read(self, timeout=READ_TIMEOUT):
+        # A consistent copy: (header dict, cell values as bytes). Raises
+        # TimeoutError when no update finishes within timeout seconds, as
+        # when the game died halfway through one.
+        buf = self.shm.buf
+        deadline = time.monotonic() + timeout
+        while True:
+            _, sequence, width, height, level, alive, head, length, score, tick = HEADER.unpack_from(buf)
+            if not sequence & 1:
+                grid = bytes(buf[HEADER.size:HEADER.size + width * height])
+                if self.sequence() == sequence:
+                    return dict(width=width, height=height, level=level, alive=bool(alive), head=head,
+                                length=length, score=score, tick=tick), grid
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'board {self.shm.name} stuck mid-update')
+            time.sleep(0)  # Mid-update; let the writer finish
+
+    def close(self):
+        self.shm.close()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from collections import deque
+
+from protocol import FRAME, SPECTATOR, encode_keyframe, encode_delta, encode_delta_body
+
+# Spectator stream settings
+DEFAULT_SPECTATE_PORT = 7778
+KEYFRAME_INTERVAL = 50    # Ticks between keyframes, the longest a dropped viewer waits
+MAX_QUEUED_FRAMES = 100   # Frames a viewer may fall behind before it skips to the next keyframe
+
+class Viewer:
+    # One spectator connection and the frames waiting for it
+    def __init__(self, writer):
+        self.writer = writer
+        self.frames = deque()
+        self.waiting = True  # For a keyframe: at the start and after falling behind
+        self.ready = asyncio.Event()
+        self.drops = 0
+
+    def push(self, frame, keyframe):
+        if keyframe:
+            if self.waiting or len(self.frames) >= MAX_QUEUED_FRAMES:
+                self.frames.clear()  # Whatever was still queued is superseded anyway
+            self.waiting = False
+        elif self.waiting:
+            return
+        elif len(self.frames) >= MAX_QUEUED_FRAMES:
+            # Too slow to keep up: rather than let the queue grow, drop it and
+            # pick the stream up again at the next keyframe
+            self.frames.clear()
+            self.waiting = True
+            self.drops += 1
+            return
+        self.frames.append(frame)
+        self.ready.set()
+
+class Broadcaster:
+    # Publishes a running game to any number of viewers over TCP, in the
+    # multiplayer protocol's keyframes and deltas (see protocol.py). Each
+    # tick is encoded and framed once on the game's thread, whoever is
+    # watching; handing it to the viewers, and any waiting on slow ones, is
+    # left to an asyncio loop on a thread of its own, so the game never
+    # waits for a viewer. Viewers get the last keyframe and the deltas since
+    # as soon as they connect.
+    def __init__(self, host='127.0.0.1', port=DEFAULT_SPECTATE_PORT):
+        self.loop = asyncio.new_event_loop()
+        self.listener = self.loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+        self.viewers = set()
+        self.latest = []  # Last keyframe and the deltas since, for viewers joining in between
+        self.tick = 0
+        self.since_keyframe = 0
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def keyframe(self, state):
+        # The whole board: when a game starts, the board changes size, or
+        # every KEYFRAME_INTERVAL ticks. state: as Match.state(), less the tick.
+        payload = encode_keyframe(dict(state, tick=self.tick), SPECTATOR)
+        self.since_keyframe = 0
+        self.loop.call_soon_threadsafe(self.send, FRAME.pack(len(payload)) + payload, True)
+
+    def publish(self, moves, changes, state):
+        # One tick, see protocol.encode_delta_body; state is called for the
+        # board only when a keyframe is due
+        self.tick += 1
+        payload = encode_delta(self.tick, 0, encode_delta_body(moves, changes))
+        self.loop.call_soon_threadsafe(self.send, FRAME.pack(len(payload)) + payload, False)
+        self.since_keyframe += 1
+        if self.since_keyframe >= KEYFRAME_INTERVAL:
+            self.keyframe(state())
+
+    def send(self, frame, keyframe):
+        if keyframe:
+            self.latest = [frame]
+        elif self.latest:
+            self.latest.append(frame)
+        for viewer in self.viewers:
+            viewer.push(frame, keyframe)
+
+    async def handle(self, reader, writer):
+        viewer = Viewer(writer)
+        for index, frame in enumerate(self.latest):
+            viewer.push(frame, index == 0)
+        self.viewers.add(viewer)
+        try:
+            while True:
+                await viewer.ready.wait()
+                viewer.ready.clear()
+                frames = list(viewer.frames)
+                viewer.frames.clear()
+                writer.writelines(frames)
+                await writer.drain()  # Frames pile up in viewer.frames meanwhile
+        except ConnectionError:
+            pass  # Gone
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+    def close(self):
+        def stop():
+            self.listener.close()
+            for viewer in self.viewers:
+                viewer.writer.close()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(stop)
+        self.thread.join()
@@ -0,0 +1,256 @@
+import os
+import sys
+import time
+import curses
+import argparse
+
+# The game rules live in main.py; keep pygame quiet when importing them
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import main as game
+from main import Level, Snake, Items, use_item, snake_speed
+from items import FOOD_ITEM, SPEED_ITEM, SHRINK_ITEM, BONUS_ITEM
+
+# Terminal settings
+MAX_GRID_WIDTH = 70   # Same board as the 1400x850 window
+MAX_GRID_HEIGHT = 42
+UI_ROWS = game.UI_HEIGHT // game.GRID_SIZE  # Rows the rules reserve for the UI
+HEAD_CHAR = '@'
+BODY_CHAR = 'o'
+WALL_CHAR = '#'
+EMPTY_CHAR = ' '
+ITEM_CHARS = {FOOD_ITEM: '*', SPEED_ITEM: '>', SHRINK_ITEM: '-', BONUS_ITEM: '$'}
+
+KEY_DIRECTIONS = {
+    curses.KEY_UP: (0, -1),
+    curses.KEY_DOWN: (0, 1),
+    curses.KEY_LEFT: (-1, 0),
+    curses.KEY_RIGHT: (1, 0)
+}
+
+def fit_board(rows, cols):
+    # Size the rule grid to the terminal (one character per cell, plus a
+    # column and a row for the right/bottom walls) and push it into main.py
+    game.GRID_WIDTH = max(10, min(MAX_GRID_WIDTH, cols - 1))
+    game.GRID_HEIGHT = max(UI_ROWS + 6, min(MAX_GRID_HEIGHT, rows - 1))
+    game.GRID_HEIGHT_PLAYABLE = game.GRID_HEIGHT - UI_ROWS
+
+def autopilot(snake, items):
+    # Greedy demo bot: head for the food, never reverse, avoid instant death
+    head = snake.get_head_position()
+    options = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+    reverse = (-snake.direction[0], -snake.direction[1])
+    body = set(snake.positions[:-1])
+
+    topology = game.level_topology(snake.level)
+
+    def safe(direction):
+        new = topology.move(head, direction)
+        return new is not None and new not in body
+
+    targets = items.food_cells() or [head]
+
+    def distance(direction):
+        x, y = head[0] + direction[0], head[1] + direction[1]
+        return min(abs(tx - x) + abs(ty - y) for tx, ty in targets)
+
+    candidates = [d for d in options if d != reverse and safe(d)]
+    if candidates:
+        snake.direction = min(candidates, key=distance)
+
+class TerminalView:
+    # Writes only the cells that changed since the previous tick
+    def __init__(self, stdscr, level):
+        self.stdscr = stdscr
+        self.level = level
+        self.colors = {}
+        if curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            snake_color = {Level.EASY: curses.COLOR_GREEN,
+                           Level.MEDIUM: curses.COLOR_YELLOW,
+                           Level.HARD: curses.COLOR_CYAN}[level]
+            for pair, (name, color) in enumerate([('snake', snake_color),
+                                                   (FOOD_ITEM, curses.COLOR_RED),
+                                                   (SPEED_ITEM, curses.COLOR_BLUE),
+                                                   (SHRINK_ITEM, curses.COLOR_MAGENTA),
+                                                   (BONUS_ITEM, curses.COLOR_YELLOW),
+                                                   ('wall', snake_color),
+                                                   ('text', curses.COLOR_WHITE)], start=1):
+                curses.init_pair(pair, color, -1)
+                self.colors[name] = curses.color_pair(pair)
+        self.shown_score = None
+        self.snake_cells = []
+        self.item_cells = {}  # Cell -> kind of every item on screen
+
+    def put(self, cell, char, color=None):
+        try:
+            self.stdscr.addstr(cell[1], cell[0], char, self.colors.get(color, 0))
+        except curses.error:
+            pass  # Writing the bottom-right corner always "fails" in curses
+
+    def status(self, message):
+        self.stdscr.move(1, 0)
+        self.stdscr.clrtoeol()
+        self.put((0, 1), message[:game.GRID_WIDTH], 'text')
+
+    def full_draw(self, snake, items):
+        # Only used when a round starts or the terminal is resized
+        self.stdscr.erase()
+        if self.level in [Level.MEDIUM, Level.HARD]:
+            top = UI_ROWS
+            for x in range(game.GRID_WIDTH + 1):
+                self.put((x, top), WALL_CHAR, 'wall')
+                self.put((x, game.GRID_HEIGHT), WALL_CHAR, 'wall')
+            for y in range(top, game.GRID_HEIGHT + 1):
+                self.put((0, y), WALL_CHAR, 'wall')
+                self.put((game.GRID_WIDTH, y), WALL_CHAR, 'wall')
+        if game.ARENA:
+            for cell in game.ARENA.wall_cells(game.level_topology(self.level).area):
+                self.put(cell, WALL_CHAR, 'wall')
+        self.shown_score = None
+        self.snake_cells = list(snake.positions)
+        for i, cell in enumerate(self.snake_cells):
+            self.put(cell, HEAD_CHAR if i == 0 else BODY_CHAR, 'snake')
+        self.item_cells = {}
+        self.draw_items(snake, items)
+        self.draw_score(snake.score)
+
+    def draw_score(self, score):
+        if score != self.shown_score:
+            self.stdscr.move(0, 0)
+            self.stdscr.clrtoeol()
+            self.put((0, 0), f'Score: {score}   Level: {self.level.name}', 'text')
+            self.shown_score = score
+
+    def draw_items(self, snake, items):
+        # Items are drawn on top of the snake, like in the window
+        shown = self.item_cells
+        current = {item.cell: item.kind for item in items.map.values()}
+        for cell in shown.keys() - current.keys():
+            if cell not in snake.positions:
+                self.put(cell, EMPTY_CHAR)
+        for cell, kind in current.items():
+            if shown.get(cell) != kind or cell == snake.positions[0]:
+                self.put(cell, ITEM_CHARS[kind], kind)
+        self.item_cells = current
+
+    def update(self, snake, items):
+        old_head = self.snake_cells[0]
+        new_head = snake.positions[0]
+        # Cells the snake left: the tail, or more after shrinking
+        for cell in self.snake_cells[len(snake.positions) - 1:]:
+            if cell not in snake.positions:
+                self.put(cell, EMPTY_CHAR)
+        if len(snake.positions) > 1:
+            self.put(old_head, BODY_CHAR, 'snake')
+        self.put(new_head, HEAD_CHAR, 'snake')
+        self.draw_items(snake, items)
+        self.snake_cells = list(snake.positions)
+        self.draw_score(snake.score)
+
+def choose_level(stdscr):
+    stdscr.erase()
+    lines = ['Snake Ventures', '', '1  Easy', '2  Medium', '3  Hard', '', 'q  Quit']
+    for row, line in enumerate(lines):
+        stdscr.addstr(row + 1, 2, line)
+    stdscr.refresh()
+    stdscr.timeout(-1)
+    while True:
+        key = stdscr.getch()
+        if key in (ord('1'), ord('2'), ord('3')):
+            return Level(key - ord('0'))
+        if key in (ord('q'), 27):
+            return None
+
+def play(stdscr, level, demo=False):
+    # Returns 'restart', 'menu' or 'quit'
+    rows, cols = stdscr.getmaxyx()
+    fit_board(rows, cols)
+    game.prepare_arena(level)
+    snake = Snake(level)
+    items = Items(level)
+    view = TerminalView(stdscr, level)
+    view.full_draw(snake, items)
+    stdscr.refresh()
+
+    tick = 1.0 / snake_speed(snake)
+    next_tick = time.monotonic() + tick
+    paused = False
+
+    while True:
+        stdscr.timeout(max(0, int((next_tick - time.monotonic()) * 1000)))
+        key = stdscr.getch()
+        if key == curses.KEY_RESIZE:
+            view.full_draw(snake, items)
+        elif key in (ord('p'), 27):
+            paused = not paused
+            view.status('PAUSED - p to resume, m for menu' if paused else '')
+        elif key == ord('m') and paused:
+            return 'menu'
+        elif key == ord('q'):
+            return 'quit'
+        elif key in KEY_DIRECTIONS and not paused:
+            direction = KEY_DIRECTIONS[key]
+            if direction != (-snake.direction[0], -snake.direction[1]):
+                snake.direction = direction
+
+        if paused:
+            stdscr.refresh()
+            next_tick = time.monotonic() + tick
+            continue
+        if time.monotonic() < next_tick:
+            continue
+        next_tick += tick
+
+        if demo:
+            autopilot(snake, items)
+        if not snake.update():
+            view.status(f'GAME OVER - score {snake.score}. SPACE restart, m menu, q quit')
+            stdscr.refresh()
+            stdscr.timeout(-1)
+            while True:
+                key = stdscr.getch()
+                if key == ord(' '):
+                    return 'restart'
+                if key == ord('m'):
+                    return 'menu'
+                if key == ord('q'):
+                    return 'quit'
+
+        # Same item rules as the window
+        item = items.eat(snake)
+        if item is not None:
+            use_item(snake, item)
+        items.update(snake)
+        tick = 1.0 / snake_speed(snake)
+
+        view.update(snake, items)
+        stdscr.refresh()
+
+def run(stdscr, level=None, demo=False):
+    curses.curs_set(0)
+    stdscr.keypad(True)
+    while True:
+        chosen = level or choose_level(stdscr)
+        if chosen is None:
+            return
+        result = play(stdscr, chosen, demo)
+        while result == 'restart':
+            result = play(stdscr, chosen, demo)
+        if result == 'quit':
+            return
+        level = None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Snake Ventures in the terminal')
+    parser.add_argument('--level', choices=['easy', 'medium', 'hard'],
+                        help='skip the level menu')
+    parser.add_argument('--demo', action='store_true',
+                        help='let a simple bot steer the snake')
+    game.add_arena_arguments(parser)
+    args = parser.parse_args()
+    game.apply_arena_arguments(parser, args)
+    os.environ.setdefault('ESCDELAY', '25')  # Make ESC usable as the pause key
+    start_level = Level[args.level.upper()] if args.level else None
+    curses.wrapper(run, start_level, args.demo)
+    sys.exit(0)
@@ -0,0 +1,101 @@
+from array import array
+
+# What happens when the snake leaves the play area through an edge
+WALL = 'wall'  # The move is fatal
+WRAP = 'wrap'  # The snake comes back in through the opposite edge
+
+# Move directions, in table order
+DIRECTIONS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+class Topology:
+    # Move rules for one grid size, worked out once into integer tables:
+    # neighbors[cell * 4 + direction] is the cell a move ends on, or -1 when
+    # the move is fatal, and legal[cell] says whether the snake may be there.
+    # Cells are numbered y * width + x over the whole grid, UI rows included.
+    def __init__(self, width, height, area, edges, blocked=()):
+        # area: (left, top, right, bottom) of the play area, right/bottom
+        # exclusive. edges: WALL or WRAP for 'left', 'right', 'top', 'bottom'.
+        # blocked: cells inside the area the snake can't enter (obstacles).
+        self.width = width
+        self.height = height
+        self.area = area
+        self.edges = edges
+        self.cells = [(x, y) for y in range(height) for x in range(width)]
+
+        left, top, right, bottom = area
+        self.legal = bytearray(width * height)
+        for y in range(max(0, top), min(height, bottom)):
+            for x in range(max(0, left), min(width, right)):
+                self.legal[y * width + x] = 1
+        for x, y in blocked:
+            if 0 <= x < width and 0 <= y < height:
+                self.legal[y * width + x] = 0
+
+        self.neighbors = array('i', [-1]) * (width * height * len(DIRECTIONS))
+        for cell, (x, y) in enumerate(self.cells):
+            if not self.legal[cell]:
+                continue
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                target = self.wrap(x + dx, y + dy)
+                if target is not None and self.legal[target[1] * width + target[0]]:
+                    self.neighbors[cell * 4 + d] = target[1] * width + target[0]
+
+    def wrap(self, x, y):
+        # Position after crossing an edge, or None through a wall
+        left, top, right, bottom = self.area
+        for outside, edge, axis, low, high in ((x < left, 'left', 0, left, right),
+                                               (x >= right, 'right', 0, left, right),
+                                               (y < top, 'top', 1, top, bottom),
+                                               (y >= bottom, 'bottom', 1, top, bottom)):
+            if outside:
+                if self.edges[edge] != WRAP:
+                    return None
+                if axis == 0:
+                    x = low + (x - low) % (high - low)
+                else:
+                    y = low + (y - low) % (high - low)
+        return (x, y)
+
+    def index(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def is_legal(self, cell):
+        x, y = cell
+        return 0 <= x < self.width and 0 <= y < self.height and bool(self.legal[y * self.width + x])
+
+    def move(self, cell, direction):
+        # The cell a move ends on, or None when it's fatal
+        x, y = cell
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            # Left outside by a shrinking window: the edges bring it back in
+            # or end the game, as if the board had crossed the snake
+            cell = self.wrap(x, y)
+            if cell is None:
+                return None
+            x, y = cell
+        target = self.neighbors[(y * self.width + x) * 4 + DIRECTION_INDEX[direction]]
+        return self.cells[target] if target >= 0 else None
+
+    def with_obstacles(self, blocked):
+        # Same edges with extra cells masked out
+        blocked = set(blocked) | {cell for i, cell in enumerate(self.cells)
+                                  if not self.legal[i] and self.in_area(cell)}
+        return Topology(self.width, self.height, self.area, self.edges, blocked)
+
+    def in_area(self, cell):
+        left, top, right, bottom = self.area
+        return left <= cell[0] < right and top <= cell[1] < bottom
+
+def bounded(width, height, area):
+    return Topology(width, height, area, dict(left=WALL, right=WALL, top=WALL, bottom=WALL))
+
+def torus(width, height, area):
+    return Topology(width, height, area, dict(left=WRAP, right=WRAP, top=WRAP, bottom=WRAP))
+
+def cylinder(width, height, area):
+    # Wraps left to right, walled at the top and bottom
+    return Topology(width, height, area, dict(left=WRAP, right=WRAP, top=WALL, bottom=WALL))
+
+def masked(topology, blocked):
+    return topology.with_obstacles(blocked)
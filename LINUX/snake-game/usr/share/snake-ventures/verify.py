@@ -0,0 +1,239 @@
+import os
+import sys
+import time
+import random
+import signal
+import sqlite3
+import argparse
+from functools import lru_cache
+from multiprocessing import Pool
+
+import main as game
+from replays import Replay, GRID
+from topology import DIRECTIONS
+from scores import DEFAULT_PATH, REPLAY_DIR
+
+# Verifier settings
+CHUNK_SIZE = 64         # Replays handed to a worker at a time
+MAX_MOVES = 1000000     # Longest game re-simulated, whatever is claimed
+MAX_BOARD = (512, 512)  # Largest board a window could make, in cells
+TOPOLOGY_CACHE = 64     # Move tables a worker keeps; the game itself keeps 8
+CLAIMED = ('score', 'moves', 'cause', 'length')
+
+# Boards of common windows and screens, in cells, for --bench games that
+# resize: the smaller ones can leave the snake outside the board
+SCREEN_BOARDS = [(40, 30), (51, 38), (64, 40), (80, 45), (96, 54), (128, 72), (72, 45)]
+
+class Simulation:
+    # A single-player game on the rules of GameScene.step, less the drawing.
+    # The snake, the items and their seeded RNG are the game's own, so a
+    # replay plays out exactly as it did on the kiosk.
+    def __init__(self, level, seed, width, height):
+        self.level = game.Level(level)
+        self.snake = game.Snake(self.level, (width, height))
+        self.items = game.Items(self.level, random.Random(seed), (width, height))
+        self.moves = 0
+        self.cause = None  # 'wall' or 'self' once the snake died
+
+    def resize(self, width, height):
+        self.snake.grid = self.items.grid = (width, height)
+
+    def topology(self):
+        return game.build_level_topology(self.level, *self.snake.grid, game.ARENA)
+
+    def step(self):
+        # One move; False once the snake died
+        snake = self.snake
+        self.moves += 1
+        if not snake.update():
+            head = snake.get_head_position()
+            self.cause = 'wall' if self.topology().move(head, snake.direction) is None else 'self'
+            return False
+        item = self.items.eat(snake)
+        if item is not None:
+            game.use_item(snake, item)
+        self.items.update(snake)
+        return True
+
+    def result(self):
+        return dict(score=self.snake.score, moves=self.moves, cause=self.cause, length=self.snake.length)
+
+def board_size_ok(width, height):
+    smallest = (game.MIN_WINDOW_WIDTH // game.GRID_SIZE, game.MIN_WINDOW_HEIGHT // game.GRID_SIZE)
+    return smallest[0] <= width <= MAX_BOARD[0] and smallest[1] <= height <= MAX_BOARD[1]
+
+def play_replay(replay, limit):
+    # (result, None) for how the replay ends, or (None, problem) for a
+    # replay no game could have made. Plays at most limit moves.
+    if not board_size_ok(replay.width, replay.height) or replay.level not in (level.value for level in game.Level):
+        return None, 'impossible level or board size'
+    sim = Simulation(replay.level, replay.seed, replay.width, replay.height)
+    events = replay.events
+    index = 0
+    while sim.moves < limit:
+        if index < len(events) and events[index][0] < sim.moves:
+            return None, 'events out of order'
+        while index < len(events) and events[index][0] == sim.moves:
+            move, kind, a, b = events[index]
+            index += 1
+            if kind == GRID:
+                if not board_size_ok(a, b):
+                    return None, f'impossible board size at move {move}'
+                sim.resize(a, b)
+            else:
+                # May be straight back: two turns between moves pass GameScene.turn
+                sim.snake.direction = DIRECTIONS[a]
+        if not sim.step():
+            if index < len(events):
+                return None, f'goes on after the snake died at move {sim.moves}'
+            return sim.result(), None
+    return None, f'snake still alive after {limit} moves'
+
+def start_worker():
+    # Replays come in any order of level and board size, so a worker keeps
+    # more move tables than the game does rather than build them again
+    game.build_level_topology = lru_cache(maxsize=TOPOLOGY_CACHE)(game.build_level_topology.__wrapped__)
+    # main's pygame.init() lets SDL catch SIGTERM, which would keep the
+    # pool from ever stopping its workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def check(job):
+    # Pool worker: (key, problems) for one (key, replay file, claim); no
+    # problems means the claim holds
+    key, data, claim = job
+    try:
+        replay = Replay.decode(data)
+        if 'level' in claim and claim['level'] != replay.level:
+            return key, [f"level {replay.level}, claimed {claim['level']}"]
+        result, problem = play_replay(replay, min(claim['moves'], MAX_MOVES))
+    except ValueError as e:
+        return key, [str(e)]
+    except Exception as e:  # A crafted replay must not take the whole batch down
+        return key, [f'replay failed: {type(e).__name__}: {e}']
+    if problem:
+        return key, [problem]
+    return key, [f'{field} {result[field]}, claimed {claim[field]}'
+                 for field in CLAIMED if field in claim and claim[field] != result[field]]
+
+def verify(jobs, processes=None):
+    # Re-simulates (key, replay file, claim) jobs across a process pool and
+    # yields (key, problems) as they finish, in any order. A claim holds
+    # score, moves (counting the fatal one), cause and length as stored by
+    # scores.ScoreStore; whatever it leaves out is not checked.
+    with Pool(processes, start_worker) as pool:
+        yield from pool.imap_unordered(check, jobs, CHUNK_SIZE)
+
+def bot_game(seed):
+    # Pool worker for --bench: a game by a simple bot that goes for the food
+    # and then, after a while, for the top wall. (replay file, claim)
+    rng = random.Random(seed)
+    level = rng.choice(list(game.Level)).value
+    width, height = game.GRID_WIDTH, game.GRID_HEIGHT
+    replay = Replay(level, rng.getrandbits(32), width, height)
+    sim = Simulation(level, replay.seed, width, height)
+    budget = rng.randrange(50, 1500)
+    resize_at = rng.randrange(budget) if rng.random() < 0.2 else None
+    while True:
+        if sim.moves == resize_at:
+            width, height = rng.choice(SCREEN_BOARDS)
+            replay.resize(width, height)
+            sim.resize(width, height)
+        if sim.moves < budget:
+            steer(sim, rng)
+        elif sim.snake.direction != (0, 1):
+            sim.snake.direction = (0, -1)
+        else:
+            sim.snake.direction = (1, 0)  # Up next move
+        replay.move(sim.snake.direction)
+        if not sim.step():
+            return replay.encode(), dict(sim.result(), level=level)
+
+def steer(sim, rng):
+    snake = sim.snake
+    head = snake.get_head_position()
+    topology = sim.topology()
+    body = set(snake.positions)
+    back = (-snake.direction[0], -snake.direction[1])
+    options = [(direction, cell) for direction, cell in
+               ((direction, topology.move(head, direction)) for direction in DIRECTIONS if direction != back)
+               if cell is not None and cell not in body]
+    if not options:
+        return
+    food = sim.items.food_cells()
+    if food and rng.random() > 0.1:
+        x, y = food[0]
+        snake.direction = min(options, key=lambda option: abs(option[1][0] - x) + abs(option[1][1] - y))[0]
+    else:
+        snake.direction = rng.choice(options)[0]
+
+def tamper(claim, rng):
+    claim = dict(claim)
+    field = rng.choice(CLAIMED)
+    if field == 'cause':
+        claim['cause'] = 'self' if claim['cause'] == 'wall' else 'wall'
+    else:
+        claim[field] += rng.choice((-1, 1, 5, 50)) if claim[field] > 50 else rng.choice((1, 5, 50))
+    return claim
+
+def bench(args):
+    # Bot games, a share of them with a doctored claim, verified against
+    # the clock: every doctored claim and only those must be flagged
+    rng = random.Random(args.seed)
+    with Pool(args.processes, start_worker) as pool:
+        games = pool.map(bot_game, [rng.getrandbits(64) for _ in range(args.bench)], CHUNK_SIZE)
+    doctored = set()
+    jobs = []
+    for key, (data, claim) in enumerate(games):
+        if rng.random() < args.tamper:
+            doctored.add(key)
+            claim = tamper(claim, rng)
+        jobs.append((key, data, claim))
+    moves = sum(claim['moves'] for _, claim in games)
+    started = time.perf_counter()
+    flagged = {key: problems for key, problems in verify(jobs, args.processes) if problems}
+    elapsed = time.perf_counter() - started
+    print(f'{len(jobs)} replays ({moves / len(jobs):.0f} moves on average) verified in {elapsed:.2f} s '
+          f'on {args.processes or os.cpu_count()} processes: {len(jobs) / elapsed * 60:.0f} per minute')
+    print(f'{len(flagged)} flagged, {len(doctored)} doctored')
+    wrong = doctored.symmetric_difference(flagged)
+    for key in sorted(wrong)[:10]:
+        print(f'  game {key}: {"missed" if key in doctored else flagged[key]}')
+    return 1 if wrong else 0
+
+def verify_store(args):
+    # Every game with a replay in the local score store
+    connection = sqlite3.connect(args.db)
+    rows = connection.execute('SELECT id, level, score, length, moves, cause, replay FROM games '
+                              'WHERE replay IS NOT NULL').fetchall()
+    connection.close()
+
+    def jobs():
+        for id, level, score, length, moves, cause, digest in rows:
+            try:
+                with open(os.path.join(args.replay_dir, digest + '.svr'), 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                print(f'game {id}: {e}')
+                continue
+            yield id, data, dict(level=level, score=score, length=length, moves=moves, cause=cause)
+
+    flagged = 0
+    for id, problems in verify(jobs(), args.processes):
+        if problems:
+            flagged += 1
+            print(f"game {id}: {'; '.join(problems)}")
+    print(f'{len(rows)} games with replays, {flagged} flagged')
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures replay verifier: plays replays again and checks '
+                                                 'the claimed score, moves and cause of death')
+    parser.add_argument('--db', default=DEFAULT_PATH, help='score store whose games to check')
+    parser.add_argument('--replay-dir', default=REPLAY_DIR)
+    parser.add_argument('--processes', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--bench', metavar='GAMES', type=int,
+                        help='check this many bot games instead, with --tamper of them doctored')
+    parser.add_argument('--tamper', type=float, default=0.05, metavar='SHARE')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    sys.exit(bench(args) if args.bench else verify_store(args))
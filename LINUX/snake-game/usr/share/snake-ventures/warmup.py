@@ -0,0 +1,23 @@
+import time
+from collections import deque
+
+class AssetWarmup:
+    # Runs small asset-building tasks in the spare time at the end of frames,
+    # on the main thread (fonts and surfaces are not safe to build elsewhere)
+    def __init__(self):
+        self.tasks = deque()
+
+    @property
+    def done(self):
+        return not self.tasks
+
+    def add(self, tasks):
+        self.tasks.extend(tasks)
+
+    def run_until(self, deadline):
+        # deadline is a time.perf_counter() value; at least one task always runs
+        # so warm-up can't starve on a machine that never has spare time
+        while self.tasks:
+            self.tasks.popleft()()
+            if time.perf_counter() >= deadline:
+                break
@@ -0,0 +1,203 @@
+import asyncio
+import argparse
+import threading
+
+import pygame
+
+import main as game
+from main import (Level, UI_COLORS, SNAKE_COLORS, ITEM_COLORS, UI_HEIGHT, get_font, resize_window,
+                  limit_frame_rate, quit_game)
+from scenes import Scene, SceneManager
+from renderer import create_renderer
+from widgets import Label
+from mirror import Mirror
+from protocol import MSG_KEYFRAME, MSG_DELTA, ProtocolError, read_frame, decode_keyframe, decode_delta
+from spectate import DEFAULT_SPECTATE_PORT
+from sharedboard import SharedBoardReader, DEFAULT_NAME, HEAD, BODY, value_kind
+
+# Viewer settings
+RETRY_DELAY = 2.0  # Seconds between attempts to reach a game that isn't streaming
+
+class Stream:
+    # The spectator stream of one game, read on a thread of its own into a
+    # Mirror. A lobby screen keeps watching across games and restarts: when
+    # the game goes away it tries again every RETRY_DELAY seconds.
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.mirror = Mirror()
+        self.lock = threading.Lock()
+        self.version = 0  # Goes up with every frame, for the window to notice
+        self.connected = False
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            self.connected = True
+            try:
+                while True:
+                    payload = await read_frame(reader)
+                    with self.lock:
+                        if payload[0] == MSG_KEYFRAME:
+                            # Joining, a new game, or catching up after falling behind
+                            self.mirror.load(decode_keyframe(payload)[0])
+                        elif payload[0] == MSG_DELTA:
+                            tick, _, moves, changes = decode_delta(payload)
+                            self.mirror.apply(tick, moves, changes)
+                        self.version += 1
+            except (ProtocolError, OSError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+                with self.lock:
+                    self.mirror = Mirror()
+                    self.connected = False
+                    self.version += 1
+
+class WatchScene(Scene):
+    # Draws the mirrored board scaled to fit the window, whatever size the
+    # player's window was
+    def __init__(self, manager, stream):
+        super().__init__(manager)
+        self.stream = stream
+        self.version = None
+        self.label = Label(get_font(36), '', (255, 255, 255), topleft=(10, 10))
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.manager.quit(),
+            pygame.K_q: lambda event: self.manager.quit()
+        }
+
+    def update(self, dt):
+        if self.stream.version != self.version:
+            self.version = self.stream.version
+            self.dirty = True
+
+    def status(self, mirror):
+        if not self.stream.connected:
+            return 'Waiting for a game to watch'
+        if mirror.tick is None:
+            return 'Waiting for the next game'
+        snake = mirror.snakes[0]
+        text = f"Score: {snake['score']}  Level: {mirror.level.name}"
+        return text if snake['alive'] else text + '  Game over'
+
+    def draw(self, renderer):
+        with self.stream.lock:
+            mirror = self.stream.mirror
+            level = mirror.level if mirror.tick is not None else Level.EASY
+            colors = UI_COLORS[level]
+            renderer.clear(colors['background'])
+            renderer.rect(colors['ui_background'], (0, 0, game.WINDOW_WIDTH, UI_HEIGHT))
+            self.label.set_text(self.status(mirror))
+            self.label.draw(renderer)
+            if mirror.tick is None:
+                return
+            size = max(1, min(game.WINDOW_WIDTH // mirror.width, (game.WINDOW_HEIGHT - UI_HEIGHT) // mirror.height))
+            left = (game.WINDOW_WIDTH - size * mirror.width) // 2
+            top = UI_HEIGHT
+
+            def cell_rect(index):
+                x, y = mirror.to_cell(index)
+                return (left + x * size, top + y * size, size, size)
+
+            renderer.rect(colors['boundary'], (left, top, size * mirror.width, size * mirror.height), 1)
+            for cell, (kind, _) in mirror.items.items():
+                renderer.rect(ITEM_COLORS[kind], cell_rect(cell))
+            head_color, body_color = SNAKE_COLORS[level]
+            for snake in mirror.snakes.values():
+                for index, cell in enumerate(snake['cells']):
+                    renderer.rect(head_color if index == 0 else body_color, cell_rect(cell))
+
+class SharedWatchScene(Scene):
+    # Draws a board another process keeps in shared memory. The cell values
+    # are an 8-bit image already: one copy out of the segment, a palette and
+    # a scale, however many cells changed.
+    def __init__(self, manager, board):
+        super().__init__(manager)
+        self.board = board
+        self.sequence = None
+        self.label = Label(get_font(36), '', (255, 255, 255), topleft=(10, 10))
+        self.key_handlers = {
+            pygame.K_ESCAPE: lambda event: self.manager.quit(),
+            pygame.K_q: lambda event: self.manager.quit()
+        }
+
+    def update(self, dt):
+        sequence = self.board.sequence()
+        if sequence != self.sequence:
+            self.sequence = sequence
+            self.dirty = True
+
+    def palette(self, level):
+        colors = [UI_COLORS[level]['background']] * 256
+        colors[BODY], colors[HEAD] = SNAKE_COLORS[level][1], SNAKE_COLORS[level][0]
+        for value in range(HEAD + 1, 256):
+            kind = value_kind(value)
+            if kind is not None:
+                colors[value] = ITEM_COLORS[kind]
+        return colors
+
+    def draw(self, renderer):
+        try:
+            header, grid = self.board.read()
+        except TimeoutError:
+            # The game stopped halfway through a move; the board won't change again
+            header, grid = None, b''
+        width, height = (header['width'], header['height']) if header else (0, 0)
+        level = Level(header['level']) if width else Level.EASY
+        colors = UI_COLORS[level]
+        renderer.clear(colors['background'])
+        renderer.rect(colors['ui_background'], (0, 0, game.WINDOW_WIDTH, UI_HEIGHT))
+        if not width:
+            self.label.set_text('Waiting for a game to watch' if header else 'The game stopped')
+            self.label.draw(renderer)
+            return
+        text = f"Score: {header['score']}  Level: {level.name}"
+        self.label.set_text(text if header['alive'] else text + '  Game over')
+        self.label.draw(renderer)
+        size = max(1, min(game.WINDOW_WIDTH // width, (game.WINDOW_HEIGHT - UI_HEIGHT) // height))
+        image = pygame.image.frombuffer(grid, (width, height), 'P')
+        image.set_palette(self.palette(level))
+        image = pygame.transform.scale(image, (width * size, height * size))
+        left = (game.WINDOW_WIDTH - width * size) // 2
+        renderer.dynamic_image('board', image, (left, UI_HEIGHT), [image.get_rect()])
+        renderer.rect(colors['boundary'], (left, UI_HEIGHT, width * size, height * size), 1)
+
+def watch(renderer, scene_type, source):
+    def on_resize(width, height):
+        resize_window(width, height, renderer)
+
+    manager = SceneManager(renderer, on_resize=on_resize)
+    manager.push(scene_type(manager, source))
+    manager.run(limit_frame_rate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Snake Ventures spectator screen: watch a game started with --spectate')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_SPECTATE_PORT)
+    parser.add_argument('--shared', metavar='NAME', nargs='?', const=DEFAULT_NAME,
+                        help='watch a game on this machine through its shared memory board (--shared-board) '
+                             'instead of over the network')
+    parser.add_argument('--renderer', choices=['auto', 'texture', 'software', 'null'], default='auto')
+    args = parser.parse_args()
+    if args.shared:
+        try:
+            scene_type, source = SharedWatchScene, SharedBoardReader(args.shared)
+        except FileNotFoundError:
+            parser.error(f'no shared board {args.shared!r}; is the game running with --shared-board?')
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        scene_type, source = WatchScene, Stream(args.host, args.port)
+        source.start()
+    renderer = create_renderer(game.WINDOW_WIDTH, game.WINDOW_HEIGHT, 'Snake Ventures spectator', args.renderer)
+    watch(renderer, scene_type, source)
+    quit_game()
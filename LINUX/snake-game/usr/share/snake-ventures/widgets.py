@@ -0,0 +1,201 @@
+import pygame
+
+# Visual states every widget can be drawn in
+NORMAL = 'normal'
+HOVERED = 'hovered'
+PRESSED = 'pressed'
+STATES = (NORMAL, HOVERED, PRESSED)
+
+WHITE = (255, 255, 255)
+MENU_ITEM_PADDING = 20   # Padding around menu text for hover/click effects
+MAX_OUTLINE_RINGS = 3    # The hover outline grows by 2 pixels per ring
+
+class Widget:
+    # Retained-mode UI element. Each visual state is rendered once into an image
+    # the renderer caches; drawing is a single blit and only a state change
+    # reports the widget's area as dirty.
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+        self.state = NORMAL
+        self.dirty_rect = None  # Set when the look changes, cleared when drawn
+
+    @property
+    def bounds(self):
+        # Area covered by the widget's images
+        return self.rect
+
+    def hit(self, pos):
+        return self.rect.collidepoint(pos)
+
+    def set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.dirty_rect = self.bounds
+            return True
+        return False
+
+    def hover(self, pos):
+        self.set_state(HOVERED if self.hit(pos) else NORMAL)
+
+    def handle_event(self, event):
+        # Returns True when the widget was clicked
+        if event.type == pygame.MOUSEMOTION:
+            if self.state != PRESSED or not self.hit(event.pos):
+                self.hover(event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if self.hit(event.pos):
+                self.set_state(PRESSED)
+                return True
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.hover(event.pos)
+        return False
+
+    def appearance(self):
+        # Everything besides size and state that changes the rendered image
+        return ()
+
+    def image_key(self, state):
+        return (type(self).__name__, self.bounds.size, state) + self.appearance()
+
+    def render(self, state):
+        # Returns a surface the size of bounds showing the widget in this state
+        raise NotImplementedError
+
+    def prepare(self, renderer):
+        # Warm-up: build the image of every state without drawing
+        for state in STATES:
+            renderer.prepare_sprite(self.image_key(state), lambda state=state: self.render(state))
+
+    def draw(self, renderer):
+        state = self.state
+        renderer.sprite(self.image_key(state), lambda: self.render(state), self.bounds.topleft)
+        self.dirty_rect = None
+
+class Label(Widget):
+    # Static text; looks the same in every state
+    def __init__(self, font, text, color, **anchor):
+        self.font = font
+        self.text = text
+        self.color = color
+        self.anchor = anchor
+        super().__init__(self.layout())
+
+    def layout(self):
+        rect = pygame.Rect((0, 0), self.font.size(self.text))
+        for name, value in self.anchor.items():
+            setattr(rect, name, value)
+        return rect
+
+    def set_text(self, text):
+        if text != self.text:
+            old = self.rect
+            self.text = text
+            self.rect = self.layout()
+            self.dirty_rect = old.union(self.rect)
+
+    def appearance(self):
+        return (self.font, self.text, tuple(self.color))
+
+    def image_key(self, state):
+        return super().image_key(NORMAL)
+
+    def render(self, state):
+        return self.font.render(self.text, True, self.color)
+
+class Button(Widget):
+    # Filled button with a white outline and centered label
+    def __init__(self, x, y, width, height, text, font, colors):
+        super().__init__((x, y, width, height))
+        self.text = text
+        self.font = font
+        self.colors = colors  # Background color per state
+
+    def appearance(self):
+        return (self.font, self.text) + tuple(self.colors[state] for state in STATES)
+
+    def render(self, state):
+        image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        image.fill(self.colors[state])
+        pygame.draw.rect(image, WHITE, image.get_rect(), 1)
+        text = self.font.render(self.text, True, WHITE)
+        image.blit(text, text.get_rect(center=image.get_rect().center))
+        return image
+
+class MenuItem(Widget):
+    # Text with a rounded outline around the padded hit area while hovered
+    def __init__(self, value, font, text, color, outline_color, center, padding=MENU_ITEM_PADDING):
+        self.value = value
+        self.font = font
+        self.text = text
+        self.color = color
+        self.outline_color = outline_color
+        self.text_rect = pygame.Rect((0, 0), font.size(text))
+        self.text_rect.center = center
+        self.outline_rings = MAX_OUTLINE_RINGS
+        super().__init__(self.text_rect.inflate(padding * 2, padding * 2))
+
+    @property
+    def bounds(self):
+        # Room for the widest outline
+        return self.rect.inflate((MAX_OUTLINE_RINGS - 1) * 2, (MAX_OUTLINE_RINGS - 1) * 2)
+
+    def set_outline_rings(self, rings):
+        if rings != self.outline_rings:
+            self.outline_rings = rings
+            if self.state != NORMAL:
+                self.dirty_rect = self.bounds
+
+    def appearance(self):
+        return (self.font, self.text, tuple(self.color), tuple(self.outline_color), self.outline_rings)
+
+    def render(self, state):
+        bounds = self.bounds
+        image = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        if state != NORMAL:
+            hover_rect = self.rect.move(-bounds.x, -bounds.y)
+            for i in range(self.outline_rings):  # Create a subtle glow effect
+                pygame.draw.rect(image, self.outline_color, hover_rect.inflate(i*2, i*2), 2, border_radius=10)
+        image.blit(self.font.render(self.text, True, self.color),
+                   (self.text_rect.x - bounds.x, self.text_rect.y - bounds.y))
+        return image
+
+class MenuList:
+    # Column of menu items sharing one hit test; clicking picks an item's value
+    def __init__(self, font, entries, center_x, start_y, spacing, outline_color=WHITE):
+        # entries: (value, text, color) from top to bottom
+        self.items = [MenuItem(value, font, text, color, outline_color, (center_x, start_y + spacing * i))
+                      for i, (value, text, color) in enumerate(entries)]
+
+    def item_at(self, pos):
+        for item in self.items:
+            if item.hit(pos):
+                return item
+        return None
+
+    def hover(self, pos):
+        for item in self.items:
+            item.hover(pos)
+
+    def handle_event(self, event):
+        # Returns the value of the clicked item, if any
+        clicked = None
+        for item in self.items:
+            if item.handle_event(event):
+                clicked = item.value
+        return clicked
+
+    def set_outline_rings(self, rings):
+        for item in self.items:
+            item.set_outline_rings(rings)
+
+    @property
+    def dirty_rects(self):
+        return [item.dirty_rect for item in self.items if item.dirty_rect]
+
+    def prepare(self, renderer):
+        for item in self.items:
+            item.prepare(renderer)
+
+    def draw(self, renderer):
+        for item in self.items:
+            item.draw(renderer)
@@ -0,0 +1,173 @@
+import random
+from collections import deque
+
+# Large-world settings
+CHUNK_SIZE = 32        # Cells per chunk side
+FOOD_NEARBY = 12       # Food kept around the camera at any time
+FOOD_MARGIN = 20       # Cells beyond the view where food may spawn...
+FOOD_FORGET = 80       # ...and how far out it is dropped again
+
+# Cell contents
+EMPTY = 0
+SNAKE = 1
+FOOD = 2
+
+class Chunk:
+    # CHUNK_SIZE x CHUNK_SIZE cells plus the set of cells in use, so drawing a
+    # chunk only visits what is actually on it
+    def __init__(self):
+        self.cells = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        self.occupied = set()
+
+class ChunkedBoard:
+    # Sparse board for worlds far bigger than the window. Chunks are created
+    # when something is put on them and dropped once they are empty again, so
+    # memory follows what's on the board, not the world size.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.chunks = {}
+        self.listeners = []  # Called as listener(x, y, old, new) for every change
+
+    def get(self, x, y):
+        chunk = self.chunks.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+        if chunk is None:
+            return EMPTY
+        return chunk.cells[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE]
+
+    def set(self, x, y, value):
+        key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        index = (y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE
+        chunk = self.chunks.get(key)
+        if self.listeners:
+            old = EMPTY if chunk is None else chunk.cells[index]
+            for listener in self.listeners:
+                listener(x, y, old, value)
+        if value == EMPTY:
+            if chunk is not None:
+                chunk.cells[index] = EMPTY
+                chunk.occupied.discard(index)
+                if not chunk.occupied:
+                    del self.chunks[key]
+            return
+        if chunk is None:
+            chunk = self.chunks[key] = Chunk()
+        chunk.cells[index] = value
+        chunk.occupied.add(index)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def cells_in(self, left, top, width, height):
+        # Yields (x, y, value) for every non-empty cell in the area, visiting
+        # only the chunks that overlap it
+        right = min(left + width, self.width)
+        bottom = min(top + height, self.height)
+        for cy in range(max(0, top) // CHUNK_SIZE, (bottom - 1) // CHUNK_SIZE + 1):
+            for cx in range(max(0, left) // CHUNK_SIZE, (right - 1) // CHUNK_SIZE + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    continue
+                for index in chunk.occupied:
+                    x = cx * CHUNK_SIZE + index % CHUNK_SIZE
+                    y = cy * CHUNK_SIZE + index // CHUNK_SIZE
+                    if left <= x < right and top <= y < bottom:
+                        yield x, y, chunk.cells[index]
+
+class Camera:
+    # Window onto the world, in cells, kept centered on a target and clamped
+    # to the world edges (plus margin cells outside them)
+    def __init__(self, world_width, world_height, width, height, margin=0):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.margin = margin
+        self.x = 0
+        self.y = 0
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def follow(self, cell):
+        self.x = self.clamp(cell[0] - self.width // 2, self.world_width - self.width)
+        self.y = self.clamp(cell[1] - self.height // 2, self.world_height - self.height)
+
+    def clamp(self, value, highest):
+        lowest = -self.margin
+        highest += self.margin
+        if highest < lowest:
+            # World smaller than the view: keep it centered
+            return (highest + lowest) // 2
+        return max(lowest, min(value, highest))
+
+    @property
+    def view(self):
+        return (self.x, self.y, self.width, self.height)
+
+class WorldSnake:
+    # Snake on a ChunkedBoard. The board doubles as the self-collision test,
+    # so a move costs the same whatever the length.
+    def __init__(self, board, start, wrap, head_color, body_color):
+        self.board = board
+        self.wrap = wrap  # Easy wraps around the world edges, the others die there
+        self.positions = deque([start])
+        self.direction = (1, 0)
+        self.length = 1
+        self.score = 0
+        self.head_color = head_color
+        self.body_color = body_color
+        board.set(start[0], start[1], SNAKE)
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def update(self):
+        x, y = self.positions[0]
+        new = (x + self.direction[0], y + self.direction[1])
+        if self.wrap:
+            new = (new[0] % self.board.width, new[1] % self.board.height)
+        elif not self.board.in_bounds(*new):
+            return False
+        # Like the windowed game, running into the current tail cell counts
+        if self.board.get(*new) == SNAKE:
+            return False
+        self.positions.appendleft(new)
+        self.board.set(new[0], new[1], SNAKE)
+        if len(self.positions) > self.length:
+            tail = self.positions.pop()
+            self.board.set(tail[0], tail[1], EMPTY)
+        return True
+
+class FoodField:
+    # Keeps a handful of food near the camera instead of filling the whole
+    # world, so the food count doesn't grow with the world either
+    def __init__(self, board, food_color, rng=None):
+        self.board = board
+        self.food_color = food_color
+        self.rng = rng or random.Random()
+        self.items = set()
+
+    def eat(self, cell):
+        # True when there was food on cell
+        if cell not in self.items:
+            return False
+        self.items.discard(cell)
+        return True
+
+    def refill(self, view):
+        left, top, width, height = view
+        # Drop food the camera has left far behind
+        for cell in [cell for cell in self.items
+                     if not (left - FOOD_FORGET <= cell[0] < left + width + FOOD_FORGET and
+                             top - FOOD_FORGET <= cell[1] < top + height + FOOD_FORGET)]:
+            self.items.discard(cell)
+            self.board.set(cell[0], cell[1], EMPTY)
+        attempts = 0
+        while len(self.items) < FOOD_NEARBY and attempts < FOOD_NEARBY * 10:
+            attempts += 1
+            x = self.rng.randint(max(0, left - FOOD_MARGIN), min(self.board.width, left + width + FOOD_MARGIN) - 1)
+            y = self.rng.randint(max(0, top - FOOD_MARGIN), min(self.board.height, top + height + FOOD_MARGIN) - 1)
+            if self.board.get(x, y) == EMPTY:
+                self.items.add((x, y))
+                self.board.set(x, y, FOOD)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The game modules live in the package tree and run headless here
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'snake-game', 'usr', 'share', 'snake-ventures'))
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+
+import pytest
+
+import leaderboard
+from leaderboard import LeaderboardClient
+from leaderboardserver import LeaderboardServer
+from replays import Replay
+
+@pytest.fixture
+def server(monkeypatch):
+    # Quick batches and retries, against a server on a free port
+    monkeypatch.setattr(leaderboard, 'BATCH_DELAY', 0.05)
+    monkeypatch.setattr(leaderboard, 'RETRY_BASE', 0.05)
+    server = LeaderboardServer(port=0)
+    server.start()
+    yield server
+    if server.up:
+        server.stop()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+def score(points, replay=None):
+    return dict(mode='classic', level=1, score=points, length=points + 1, moves=10 * points, cause='wall',
+                seconds=1.0, played=time.time(), replay=replay)
+
+def client_for(server, tmp_path):
+    return LeaderboardClient(f'http://127.0.0.1:{server.port}/v1', 'kiosk', str(tmp_path / 'outbox.json'),
+                             str(tmp_path))
+
+def test_scores_wait_in_the_outbox_for_the_next_run(server, tmp_path):
+    server.stop()
+    client = client_for(server, tmp_path)
+    for points in range(3):
+        client.submit(score(points))
+    wait_for(lambda: client.failures)
+    client.close()
+    with open(tmp_path / 'outbox.json') as f:
+        assert [item['score'] for item in json.load(f)] == [0, 1, 2]
+
+    server.start()
+    client = client_for(server, tmp_path)
+    wait_for(lambda: len(server.scores) == 3)
+    client.close()
+    assert sorted(item['score'] for item in server.scores.values()) == [0, 1, 2]
+    assert not os.path.exists(tmp_path / 'outbox.json')
+
+def test_scores_and_replays_go_out_once_the_server_is_back(server, tmp_path):
+    replay = Replay(1, 7, 70, 42, [(0, 1, 3, 0)])
+    digest = replay.digest()
+    with open(tmp_path / f'{digest}.svr', 'wb') as f:
+        f.write(replay.encode())
+    server.stop()
+    client = client_for(server, tmp_path)
+    client.submit(score(5, digest))
+    client.submit(score(6))
+    wait_for(lambda: client.failures >= 2)  # Retried while down
+    assert os.path.exists(tmp_path / 'outbox.json')
+
+    server.start()
+    wait_for(lambda: digest in server.replays)
+    client.close()
+    assert sorted(item['score'] for item in server.scores.values()) == [5, 6]
+    assert server.replays[digest] == replay.encode()
+    assert not client.pending and not os.path.exists(tmp_path / 'outbox.json')
@@ -0,0 +1,54 @@
+import pytest
+
+import main as game
+import arenagen
+import levelpack
+from levelpack import LevelPack, write_pack
+
+@pytest.fixture
+def opened(monkeypatch):
+    # Every pack opened while the test runs
+    packs = []
+
+    class TrackedPack(LevelPack):
+        def __init__(self, *args):
+            super().__init__(*args)
+            packs.append(self)
+
+    for module in (game, arenagen, levelpack):
+        monkeypatch.setattr(module, 'LevelPack', TrackedPack)
+    return packs
+
+def test_load_arena_closes_the_pack(tmp_path, opened):
+    path = str(tmp_path / 'arenas.svlp')
+    write_pack(path, [arenagen.generate('rooms', 1, 40, 24), arenagen.generate('maze', 2, 40, 24)])
+    for choice in ('2', '2', '1'):
+        arena = game.load_arena(choice, path)
+        assert arena.width == 40 and arena.walls
+    assert len(opened) == 3 and all(pack.data.closed for pack in opened)
+    with pytest.raises(ValueError):
+        game.load_arena('nowhere', path)
+    assert opened[-1].data.closed
+
+def test_cached_generated_arena_closes_the_pack(tmp_path, opened, monkeypatch):
+    monkeypatch.setattr(arenagen, 'CACHE_DIR', str(tmp_path))
+    made = arenagen.load_generated('scatter', 3, 40, 24)
+    cached = arenagen.load_generated('scatter', 3, 40, 24)
+    assert cached.walls == made.walls
+    assert len(opened) == 1 and opened[0].data.closed  # The first call found no cache to open
+
+def test_pack_that_fails_to_open_is_unmapped(tmp_path, monkeypatch):
+    path = tmp_path / 'not-a-pack.svlp'
+    path.write_bytes(b'x' * 64)
+    mapped = []
+    real_mmap = levelpack.mmap.mmap
+
+    def mmap(*args, **kwargs):
+        data = real_mmap(*args, **kwargs)
+        mapped.append(data)
+        return data
+
+    monkeypatch.setattr(levelpack.mmap, 'mmap', mmap)
+    with pytest.raises(ValueError):
+        LevelPack(str(path))
+    assert mapped and mapped[0].closed
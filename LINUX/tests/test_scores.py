@@ -0,0 +1,34 @@
+import sqlite3
+
+import pytest
+
+import main as game
+from main import Level, BattleScene, GameOverScene
+from scenes import SceneManager
+from renderer import create_renderer
+from scores import ScoreStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ScoreStore([level.value for level in Level], str(tmp_path / 'scores.db'), str(tmp_path / 'replays'))
+    monkeypatch.setattr(game, 'SCORES', store)
+    return store
+
+def test_battle_game_over_is_recorded(store):
+    pytest.importorskip('numpy')
+    manager = SceneManager(create_renderer(game.WINDOW_WIDTH, game.WINDOW_HEIGHT, 'test', 'null'))
+    scene = BattleScene(manager, Level.MEDIUM, 3, (40, 40))
+    manager.push(scene)
+    # Straight up into the wall, if no bot gets there first
+    for _ in range(200):
+        scene.turn((0, -1))
+        scene.update(scene.tick_ms)
+        if manager.top is not scene:
+            break
+    assert isinstance(manager.top, GameOverScene)
+    assert store.best[('battle', Level.MEDIUM.value)] == scene.snake.score
+    store.close()  # Waits for the writer
+    connection = sqlite3.connect(store.path)
+    rows = connection.execute('SELECT mode, level, score, length, moves, cause, replay FROM games').fetchall()
+    connection.close()
+    assert rows == [('battle', Level.MEDIUM.value, scene.snake.score, scene.snake.length, scene.moves, None, None)]
@@ -0,0 +1,70 @@
+import os
+import time
+from multiprocessing import resource_tracker
+
+import pytest
+
+from items import FOOD_ITEM, SHRINK_ITEM
+from mirror import Mirror
+from protocol import ALIVE
+from sharedboard import SharedBoard, SharedBoardReader, BODY, HEAD, item_value
+
+WIDTH, HEIGHT = 10, 6
+
+def mirror_grid(mirror):
+    # What the shared board should hold for a mirrored board
+    grid = bytearray(mirror.width * mirror.height)
+    for cell, (kind, _) in mirror.items.items():
+        grid[cell] = item_value(kind)
+    for snake in mirror.snakes.values():
+        for index, cell in enumerate(snake['cells']):
+            grid[cell] = HEAD if index == 0 else BODY
+    return bytes(grid)
+
+def test_item_on_freed_tail_cell_survives():
+    state = dict(seed=0, level=1, width=WIDTH, height=HEIGHT, now=0,
+                 snakes=[dict(id=0, alive=True, direction=3, length=3, score=0, boost=0, cells=[23, 22, 21])],
+                 items=[(25, FOOD_ITEM, None)])
+    board = SharedBoard(f'sv-test-{os.getpid()}')
+    try:
+        reader = SharedBoardReader(board.shm.name)
+        # The reader dropped the segment from this process's tracker, which
+        # still has to see the writer unlink it
+        resource_tracker.register(board.shm._name, 'shared_memory')
+        mirror = Mirror()
+        mirror.load(dict(state, tick=0))
+        board.keyframe(state)
+        assert reader.read()[1] == mirror_grid(mirror)
+        # The tail leaves 21 and 22 (a shrink), and new items turn up right there
+        moves = [(0, ALIVE, 3, 24, 2, 2, 1)]
+        changes = [(21, FOOD_ITEM), (22, SHRINK_ITEM)]
+        mirror.apply(1, moves, changes)
+        board.publish(moves, changes, None)
+        grid = reader.read()[1]
+        assert grid[21] == item_value(FOOD_ITEM) and grid[22] == item_value(SHRINK_ITEM)
+        assert grid == mirror_grid(mirror)
+        # Eating: the item goes, the head takes its cell and new food turns up
+        moves = [(0, ALIVE, 3, 25, 0, 3, 2)]
+        changes = [(25, None), (50, FOOD_ITEM)]
+        mirror.apply(2, moves, changes)
+        board.publish(moves, changes, None)
+        grid = reader.read()[1]
+        assert grid[25] == HEAD and grid[50] == item_value(FOOD_ITEM)
+        assert grid == mirror_grid(mirror)
+        reader.close()
+    finally:
+        board.close()
+
+def test_read_gives_up_on_a_writer_that_died_mid_update():
+    board = SharedBoard(f'sv-test-{os.getpid()}')
+    try:
+        reader = SharedBoardReader(board.shm.name)
+        resource_tracker.register(board.shm._name, 'shared_memory')
+        board.begin()  # And never end()
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            reader.read(0.05)
+        assert time.monotonic() - started < 1
+        reader.close()
+    finally:
+        board.close()
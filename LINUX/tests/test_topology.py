@@ -0,0 +1,36 @@
+import pytest
+
+import main as game
+from main import Level, Snake
+from renderer import create_renderer
+
+@pytest.fixture
+def renderer():
+    # Windows resized by a test go back to the size every other test expects
+    renderer = create_renderer(game.WINDOW_WIDTH, game.WINDOW_HEIGHT, 'test', 'null')
+    size = game.WINDOW_WIDTH, game.WINDOW_HEIGHT
+    yield renderer
+    game.resize_window(*size, renderer)
+
+def snake_at(level, head, renderer):
+    game.resize_window(1400, 850, renderer)
+    snake = Snake(level)
+    snake.positions = [head]
+    snake.direction = (1, 0)
+    game.resize_window(800, 600, renderer)  # 40 x 30 cells: the head is now off the board
+    return snake
+
+def test_snake_outside_a_shrunken_board_wraps_on_easy(renderer):
+    snake = snake_at(Level.EASY, (65, 20), renderer)
+    assert snake.update()
+    assert snake.get_head_position() == (26, 20)
+    snake = snake_at(Level.EASY, (65, 38), renderer)
+    assert snake.update()
+    assert snake.get_head_position() == (26, 10)  # Back in below the UI rows, which are 0 and 1
+
+@pytest.mark.parametrize('level', [Level.MEDIUM, Level.HARD])
+@pytest.mark.parametrize('head', [(65, 20), (65, 38), (10, 38)])
+def test_snake_outside_a_shrunken_board_dies_behind_walls(level, head, renderer):
+    snake = snake_at(level, head, renderer)
+    assert not snake.update()
+    assert snake.positions == [head]
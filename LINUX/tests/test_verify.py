@@ -0,0 +1,51 @@
+import pytest
+
+import main as game
+from main import Level
+from replays import Replay, TURN
+from verify import MAX_MOVES, play_replay, check
+
+def replay_of(level, turns, width=70, height=42, seed=1):
+    # turns: (count, direction) for that many moves, or ('grid', width,
+    # height) where the window was resized
+    replay = Replay(level.value, seed, width, height)
+    for turn in turns:
+        if turn[0] == 'grid':
+            replay.resize(*turn[1:])
+        else:
+            for _ in range(turn[0]):
+                replay.move(turn[1])
+    return replay
+
+@pytest.mark.parametrize('level, turns, moves', [
+    # Past x 40 on the big board, then off the shrunken one into the wall
+    (Level.MEDIUM, [(30, (1, 0)), ('grid', 40, 30), (1, (1, 0))], 31),
+    # Wrapped back in from x 47, then up into the UI bar
+    (Level.EASY, [(30, (1, 0)), ('grid', 40, 30), (1, (1, 0)), (21, (0, -1))], 52),
+])
+def test_replay_with_a_shrunken_board_verifies(level, turns, moves):
+    assert (game.GRID_WIDTH, game.GRID_HEIGHT) == (70, 42)
+    replay = replay_of(level, turns)
+    result, problem = play_replay(replay, MAX_MOVES)
+    assert problem is None
+    assert result['moves'] == moves and result['cause'] == 'wall'
+    assert check(('game', replay.encode(), dict(result, level=level.value))) == ('game', [])
+
+def honest_claim(replay):
+    result, problem = play_replay(replay, MAX_MOVES)
+    assert problem is None
+    return dict(result, level=replay.level)
+
+@pytest.mark.parametrize('field, value', [('score', 1), ('moves', 1), ('length', 1), ('cause', 'self')])
+def test_doctored_claim_is_flagged(field, value):
+    replay = replay_of(Level.MEDIUM, [(5, (1, 0)), (30, (0, -1))])
+    claim = honest_claim(replay)
+    assert claim['cause'] == 'wall'
+    claim[field] = value if field == 'cause' else claim[field] + value
+    _, problems = check(('game', replay.encode(), claim))
+    assert len(problems) == 1 and problems[0].startswith(f'{field} ')
+
+def test_events_out_of_order_are_flagged():
+    replay = Replay(Level.MEDIUM.value, 1, 70, 42, [(0, TURN, 3, 0), (5, TURN, 0, 0), (3, TURN, 1, 0)])
+    assert play_replay(replay, MAX_MOVES) == (None, 'events out of order')
+    assert check(('game', replay.encode(), dict(moves=100))) == ('game', ['events out of order'])
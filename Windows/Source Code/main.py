@@ -5,6 +5,9 @@ import os
 import math
 from typing import List, Tuple
 from enum import Enum
+from functools import lru_cache
+
+from topology import Topology, bounded, WALL, WRAP
 
 # Initialize Pygame
 pygame.init()
@@ -68,6 +71,20 @@ SPEED_EASY = 10
 SPEED_MEDIUM = 8
 SPEED_HARD = 10
 
+def level_topology(level):
+    # Move rules for the current grid size (same rules as the Linux version)
+    return build_level_topology(level, GRID_WIDTH, GRID_HEIGHT)
+
+@lru_cache(maxsize=8)
+def build_level_topology(level, width, height):
+    ui_rows = UI_HEIGHT // GRID_SIZE
+    if level in [Level.MEDIUM, Level.HARD]:
+        # Walled in; the thin boundary covers the first column and row
+        return bounded(width, height, (1, ui_rows + 1, width, height))
+    # Easy wraps around every edge except the top one, which borders the UI bar
+    return Topology(width, height, (0, ui_rows, width, height),
+                    dict(left=WRAP, right=WRAP, top=WALL, bottom=WRAP))
+
 class Title:
     def __init__(self):
         self.font = pygame.font.Font(None, TITLE_FONT_SIZE)
@@ -216,34 +233,11 @@ class Snake:
         return self.positions[0]
 
     def update(self):
-        cur = self.get_head_position()
-        x, y = self.direction
-        new = (cur[0] + x, cur[1] + y)
-
-        # Check UI area collision
-        if new[1] < UI_HEIGHT // GRID_SIZE:
+        # Walls and wrapping come from the level's precomputed move table
+        new = level_topology(self.level).move(self.get_head_position(), self.direction)
+        if new is None:
             return False
 
-        # Check boundary collision for Medium and Hard levels
-        if self.level in [Level.MEDIUM, Level.HARD]:
-            # Calculate exact boundary positions
-            left_boundary = BOUNDARY_THICKNESS
-            right_boundary = GRID_WIDTH - BOUNDARY_THICKNESS
-            top_boundary = (UI_HEIGHT // GRID_SIZE) + BOUNDARY_THICKNESS
-            bottom_boundary = GRID_HEIGHT - BOUNDARY_THICKNESS
-
-            # Check if the snake's new position would intersect with the boundary
-            if (new[0] <= left_boundary or 
-                new[0] >= right_boundary or 
-                new[1] <= top_boundary or 
-                new[1] >= bottom_boundary):
-                return False
-        else:
-            # Wrap around for Easy level, but respect UI area
-            new = (new[0] % GRID_WIDTH, 
-                   max(UI_HEIGHT // GRID_SIZE, 
-                       ((new[1] - (UI_HEIGHT // GRID_SIZE)) % (GRID_HEIGHT - (UI_HEIGHT // GRID_SIZE))) + (UI_HEIGHT // GRID_SIZE)))
-
         if new in self.positions[3:]:  # Snake collides with itself
             return False
         self.positions.insert(0, new)